@@ -88,7 +88,6 @@ toInput.oninput = () => controlToInput(toSlider, fromInput, toInput, toSlider);
 
 
 document.addEventListener("DOMContentLoaded", async () => {
-    const db = await initDatabase();
     const pageSize = 50; // Number of rows per page
     let currentPage = 1;
 
@@ -106,7 +105,7 @@ document.addEventListener("DOMContentLoaded", async () => {
     document.getElementById("apply-filters").addEventListener("click", () => {
         const filters = getFilters();
         currentPage = 1; // Reset to the first page
-        updateTable(db, filters, currentPage, pageSize);
+        showPage(filters, currentPage, pageSize);
     });
 
 
@@ -129,21 +128,26 @@ document.addEventListener("DOMContentLoaded", async () => {
     document.getElementById("apply-filters").addEventListener("click", () => {
         const filters = getFilters();
         currentPage = 1; // Reset to the first page
-        updateTable(db, filters, currentPage, pageSize);
+        showPage(filters, currentPage, pageSize);
     });
 
     document.getElementById("prev-page").addEventListener("click", () => {
         if (currentPage > 1) {
             currentPage--;
             const filters = getFilters();
-            updateTable(db, filters, currentPage, pageSize);
+            showPage(filters, currentPage, pageSize);
         }
     });
 
     document.getElementById("next-page").addEventListener("click", () => {
         currentPage++;
         const filters = getFilters();
-        updateTable(db, filters, currentPage, pageSize);
+        showPage(filters, currentPage, pageSize);
+    });
+
+    document.getElementById("view").addEventListener("change", () => {
+        currentPage = 1;
+        showPage(getFilters(), currentPage, pageSize);
     });
 
     // Add to document.addEventListener("DOMContentLoaded", async () => {
@@ -169,7 +173,7 @@ document.addEventListener("DOMContentLoaded", async () => {
     });
 
 // Initial table load
-updateTable(db, getFilters(), currentPage, pageSize);
+showPage(getFilters(), currentPage, pageSize);
 });
 
 const allItems = [
@@ -261,6 +265,7 @@ function getFilters() {
     });
 
     return {
+        view: document.getElementById("view").value,
         minions: minionTypes,
         sort: { column: sortColumn, order: sortOrder },
         timescales: timescales,
@@ -272,22 +277,162 @@ function getFilters() {
     };
 }
 
-async function initDatabase() {
-    const SQL = await initSqlJs({ locateFile: file => `https://cdnjs.cloudflare.com/ajax/libs/sql.js/1.6.2/${file}` });
-    let db_path = "";
+function dataPath(file) {
     if (window.location.pathname == "/") { // localhost
-        db_path = "/data/sheep_minion_combinations.db"
+        return "/data/" + file
     } else { // server
-        db_path = window.location.pathname + "/data/sheep_minion_combinations.db"
+        return window.location.pathname + "/data/" + file
+    }
+}
+
+let sqlDatabase = null;
+
+function initSqlDatabase() {
+    if (!sqlDatabase) {
+        sqlDatabase = (async () => {
+            const SQL = await initSqlJs({ locateFile: file => `https://cdnjs.cloudflare.com/ajax/libs/sql.js/1.6.2/${file}` });
+            const response = await fetch(dataPath("sheep_minion_combinations.db"));
+            const buffer = await response.arrayBuffer();
+            return new SQL.Database(new Uint8Array(buffer));
+        })();
+    }
+    return sqlDatabase;
+}
+
+let database = null;
+
+// the sharded columnar copy (see columnar.js) only needs its manifest up front, the sqlite file is only
+// downloaded when there is no sharded copy
+function initDatabase() {
+    if (!database) {
+        database = (async () => {
+            try {
+                return await loadShardedTable(dataPath("sheep_minion_combinations"));
+            } catch (e) {
+                console.log(`${e}, loading the sqlite database instead`);
+            }
+            return await initSqlDatabase();
+        })();
+    }
+    return database;
+}
+
+const FULL_TABLE = "MinionSimulationResult";
+
+// the columnar tables the filters need (the shards of the selected minions and timescales, or a summary
+// view's own small file, see SUMMARY_TABLES in simulate.py), or the sqlite database
+async function loadTables(filters) {
+    const db = await initDatabase();
+    if (!(db instanceof ShardedTable)) {
+        return db;
+    }
+    if (filters.view !== FULL_TABLE) {
+        return [await db.summary(filters.view)];
+    }
+    return await db.tables({ minion: filters.minions, seconds: filters.timescales });
+}
+
+async function showPage(filters, page, pageSize) {
+    updateTable(await loadTables(filters), filters, page, pageSize);
+}
+
+// a summary table has the best row of every minion, timescale and set of upgrades, filtering it by anything
+// else would leave out groups instead of finding their best row that passes
+function summaryFilters(filters) {
+    return { ...filters, fuels: [], unselectedItems: [], minCost: undefined, maxCost: undefined };
+}
+
+// the same rows as the query updateTable builds, straight from the columns of one or more tables
+// (ties in the sort column are in id order)
+function queryColumnar(tables, filters, page, pageSize) {
+    const offset = (page - 1) * pageSize;
+    const matches = [];
+    tables.forEach(table => {
+        const values = filters.sort ? table.column(filters.sort.column) : null;
+        const ids = table.column("id");
+        filterColumnar(table, filters).forEach(i => matches.push({ table: table, row: i, value: values && values[i], id: ids[i] }));
+    });
+
+    if (filters.sort) {
+        const direction = filters.sort.order.toUpperCase() === "DESC" ? -1 : 1;
+        matches.sort((a, b) => (a.value - b.value) * direction || a.id - b.id);
+    } else {
+        matches.sort((a, b) => a.id - b.id);
+    }
+
+    return {
+        columns: tables.length > 0 ? tables[0].columnNames : [],
+        values: matches.slice(offset, offset + pageSize).map(match => match.table.row(match.row)),
+    };
+}
+
+// the rows of a table that pass the filters, in order
+function filterColumnar(table, filters) {
+    const conditions = [];
+
+    // like sql, null is never in the list and never != anything
+    // dictionary columns are checked once per dictionary value instead of once per row
+    const where = (name, test) => {
+        const codes = table.codes(name);
+        if (codes) {
+            const keep = codes.dictionary.map(value => value !== null && test(value));
+            conditions.push(i => keep[codes.indexes[i]]);
+        } else {
+            const values = table.column(name);
+            conditions.push(i => values[i] !== null && test(values[i]));
+        }
+    };
+    const oneOf = list => value => list.some(x => String(x) === String(value));
+
+    if (filters.minions && filters.minions.length > 0) {
+        where("minion", oneOf(filters.minions));
     }
-    const response = await fetch(db_path);
-    const buffer = await response.arrayBuffer();
-    return new SQL.Database(new Uint8Array(buffer));
+
+    if (filters.timescales && filters.timescales.length > 0) {
+        where("seconds", oneOf(filters.timescales));
+    }
+
+    if (filters.fuels && filters.fuels.length > 0) {
+        where("fuel", oneOf(filters.fuels));
+    }
+
+    filters.unselectedItems.forEach((item) => {
+        where("item_1", value => value !== item);
+        where("item_2", value => value !== item);
+    });
+
+    if (!filters.upgrades.includes("Mithril Infusion")) { where("mithril_infusion", value => value == 0); }
+    if (!filters.upgrades.includes("Free Will")) { where("free_will", value => value == 0); }
+    if (!filters.upgrades.includes("Postcard")) { where("postcard", value => value == 0); }
+    if (!filters.upgrades.includes("Beacon")) { where("beacon_boost_percent", value => value == 0); }
+    if (!filters.upgrades.includes("Pet Bonus")) { where("pet_bonus_percent", value => value == 0); }
+    if (!filters.upgrades.includes("Crystal")) { where("crystal_bonus_percent", value => value == 0); }
+
+    if (filters.minCost !== undefined && filters.maxCost !== undefined) {
+        where("minion_cost_total", value => filters.minCost <= value && value <= filters.maxCost);
+    }
+
+    const matches = [];
+    for (let i = 0; i < table.rows; i++) {
+        if (conditions.every(condition => condition(i))) {
+            matches.push(i);
+        }
+    }
+    return matches;
 }
 
 function updateTable(db, filters, page, pageSize) {
+    if (filters.view !== FULL_TABLE) {
+        filters = summaryFilters(filters);
+    }
+
+    if (Array.isArray(db)) {
+        renderTable(queryColumnar(db, filters, page, pageSize));
+        return;
+    }
+
     const offset = (page - 1) * pageSize;
-    let query = "SELECT * FROM MinionSimulationResult WHERE 1=1";
+    let query = `SELECT * FROM ${filters.view} WHERE 1=1`;
 
     if (filters.minions && filters.minions.length > 0) {
         query += ` AND minion IN ('${filters.minions.join("','")}')`;
@@ -365,6 +510,20 @@ function fmtSeconds(seconds) {
     // }
 }
 
+// the estimate of when the first item stops fitting (seconds_until_full), null if it never does.
+// it's not what Inv. Full? is worked out from, so it's marked as an estimate
+function fmtFullAfter(seconds) {
+    if (seconds === null) {
+        return "never";
+    } else if (seconds < 3600) {
+        return `~${Math.ceil(seconds / 60)}m`;
+    } else if (seconds < 86400) {
+        return `~${(seconds / 3600).toFixed(1)}h`;
+    } else {
+        return `~${(seconds / 86400).toFixed(1)}d`;
+    }
+}
+
 
 function renderTable(result) {
     const e = { target: document.getElementById("show-calculations") };
@@ -397,7 +556,7 @@ function renderTable(result) {
         const tr = document.createElement("tr");
         let i = 0;
         const showCalculations = document.getElementById("show-calculations").checked;
-        const calculationIndexes = [16, 17, 18, 19, 20, 21, 22, 23, 24];
+        const calculationIndexes = [16, 17, 18, 19, 20, 21, 22, 23, 24, 37];
 
         const showOtherProfits = document.getElementById("show-profits").checked;
         const profitIndexes = [25, 27, 28]
@@ -425,6 +584,8 @@ function renderTable(result) {
                 td.textContent = cell === 0 ? "" : "T"
             } else if (i == 11 || i == 12 || i == 13 || i == 15) {
                 td.textContent = cell == 0 ? "" : cell + "%"
+            } else if (i == 37) {
+                td.textContent = fmtFullAfter(cell);
             } else if (i >= 34) {
                 td.textContent = fmtMoney(cell);
             } else if (i == 16 || i == 17 || i == 18) {
@@ -0,0 +1,143 @@
+// Reader for the columnar results files python/columnar.py writes: the shards and summaries in data/sheep_minion_combinations/,
+// which manifest.json there lists (see export_sharded).
+// Blocks are viewed as typed arrays straight out of the downloaded buffer, nothing gets parsed per row.
+// Columns are decoded the first time they are used.
+
+const COLUMNAR_MAGIC = "MSRCOL\x00\x01";
+
+const COLUMNAR_TYPES = {
+    uint8: Uint8Array,
+    int8: Int8Array,
+    uint16: Uint16Array,
+    int16: Int16Array,
+    uint32: Uint32Array,
+    int32: Int32Array,
+    int64: BigInt64Array,
+    float64: Float64Array,
+};
+
+class ColumnarTable {
+    constructor(buffer) {
+        const bytes = new Uint8Array(buffer);
+        const magic = new TextDecoder().decode(bytes.subarray(0, COLUMNAR_MAGIC.length));
+        if (magic !== COLUMNAR_MAGIC) {
+            throw new Error("Not a columnar results file (or a different version)");
+        }
+        const headerLength = new DataView(buffer).getUint32(COLUMNAR_MAGIC.length, true);
+        const headerStart = COLUMNAR_MAGIC.length + 4;
+        const header = JSON.parse(new TextDecoder().decode(bytes.subarray(headerStart, headerStart + headerLength)));
+
+        this.buffer = buffer;
+        this.start = headerStart + headerLength;
+        this.rows = header.rows;
+        this.specs = header.columns;
+        this.columnNames = header.columns.map(spec => spec.name);
+        this.decoded = {};
+    }
+
+    spec(name) {
+        const spec = this.specs.find(spec => spec.name === name);
+        if (!spec) {
+            throw new Error(`No column ${name}`);
+        }
+        return spec;
+    }
+
+    view(type, offset, length) {
+        const values = new COLUMNAR_TYPES[type](this.buffer, this.start + offset, length);
+        // int64 only shows up for huge coin values, plain numbers are good enough for showing them
+        return type === "int64" ? Float64Array.from(values, Number) : values;
+    }
+
+    // dictionary columns: the dictionary index of every row, and the dictionary
+    codes(name) {
+        const spec = this.spec(name);
+        if (spec.encoding !== "dictionary") {
+            return null;
+        }
+        const dictionary = spec.values || Array.from(this.view(spec.dictionary.type, spec.dictionary.offset, spec.dictionary.length));
+        return { indexes: this.view(spec.type, spec.offset, this.rows), dictionary: dictionary };
+    }
+
+    // every value of a column, booleans as 0/1 like sql.js returns them
+    column(name) {
+        if (name in this.decoded) {
+            return this.decoded[name];
+        }
+        const spec = this.spec(name);
+        let values;
+        if (spec.encoding === "constant") {
+            const value = typeof spec.value === "boolean" ? Number(spec.value) : spec.value;
+            values = new Array(this.rows).fill(value);
+        } else if (spec.encoding === "sequence") {
+            values = new Float64Array(this.rows);
+            for (let i = 0; i < this.rows; i++) values[i] = spec.start + i;
+        } else if (spec.encoding === "bitmap") {
+            const bits = this.view("uint8", spec.offset, Math.ceil(this.rows / 8));
+            values = new Uint8Array(this.rows);
+            for (let i = 0; i < this.rows; i++) values[i] = (bits[i >> 3] >> (i & 7)) & 1;
+        } else if (spec.encoding === "plain") {
+            values = this.view(spec.type, spec.offset, this.rows);
+        } else {
+            const { indexes, dictionary } = this.codes(name);
+            values = spec.values ? new Array(this.rows) : new Float64Array(this.rows);
+            for (let i = 0; i < this.rows; i++) values[i] = dictionary[indexes[i]];
+        }
+        this.decoded[name] = values;
+        return values;
+    }
+
+    // one row in column order, like a row of sql.js's db.exec(...)[0].values
+    row(i) {
+        return this.columnNames.map(name => this.column(name)[i]);
+    }
+}
+
+async function loadColumnar(path) {
+    const response = await fetch(path);
+    if (!response.ok) {
+        throw new Error(`Couldn't load ${path}: ${response.status}`);
+    }
+    return new ColumnarTable(await response.arrayBuffer());
+}
+
+// The results split into one columnar file per minion and timescale, listed in manifest.json (see
+// export_sharded in python/columnar.py). A shard is only downloaded the first time a query needs it.
+class ShardedTable {
+    constructor(manifest, directory) {
+        this.manifest = manifest;
+        this.directory = directory;
+        this.loaded = {};
+    }
+
+    // the shards whose key is allowed by wanted: shard_by column -> allowed values (missing or empty: any)
+    matching(wanted) {
+        return this.manifest.shards.filter(shard => this.manifest.shard_by.every(column => {
+            const allowed = wanted[column];
+            return !allowed || allowed.length === 0 || allowed.some(value => String(value) === String(shard.key[column]));
+        }));
+    }
+
+    load(file) {
+        if (!(file in this.loaded)) {
+            this.loaded[file] = loadColumnar(`${this.directory}/${file}`);
+        }
+        return this.loaded[file];
+    }
+
+    async tables(wanted) {
+        return await Promise.all(this.matching(wanted).map(shard => this.load(shard.file)));
+    }
+
+    async summary(name) {
+        return await this.load(this.manifest.summaries[name].file);
+    }
+}
+
+async function loadShardedTable(directory) {
+    const response = await fetch(`${directory}/manifest.json`);
+    if (!response.ok) {
+        throw new Error(`Couldn't load ${directory}/manifest.json: ${response.status}`);
+    }
+    return new ShardedTable(await response.json(), directory);
+}
@@ -0,0 +1,703 @@
+from dataclasses import dataclass
+from math import inf
+
+import numpy as np
+
+import simulate
+from item_data import convert_to_compacted, convert_to_super_compacted, is_compactable, is_super_compactable
+from minion_data import MinionBase, MinionFuelType, MinionItemType, MinionStorageType
+from pricing import PriceVectors, QuantityMatrix
+from simulate import (
+    MINION_COUNT,
+    MinionHopperType,
+    MinionSimulationOutput,
+    compaction_forms,
+    compactors,
+    fuel_items_used,
+    get_price_vectors,
+    production_rates,
+    setup_inventory_fill,
+    setup_unloaded_minion_simulation,
+    simulate_unloaded_minion_setup,
+    sweep_profile,
+)
+
+
+# The batch engine: the same maths as simulate_unloaded_minion_output, but column-wise over many
+# configurations at once. Configurations are grouped by (minion, fuel, hopper, item_1, item_2) because
+# those decide which items get dropped/compacted; everything else (level, storage, upgrades, beacon,
+# seconds) is a column. Configurations of a group that only differ in cost are simulated once (see
+# _simulate_batch_group). Every float op is done in the same order as the scalar function so results
+# are identical.
+# The prices are simulate.skyblock_items (whatever is loaded when it runs), and simulate.py only imports
+# this module where it's used, since this one imports simulate.
+
+@dataclass
+class MinionSimulationBatch:
+    outputs: dict[str, np.ndarray] # output column -> one value per configuration
+    raw_item_drops: list[tuple[list[str], list[np.ndarray]]] # per configuration: (item names, amount columns) of its group
+    row_in_group: np.ndarray # which entry of the raw_item_drops columns is this configuration's (its speed class)
+    # the physical outputs that get priced, one row per configuration
+    inventory: QuantityMatrix
+    hopper_items: QuantityMatrix # only what a hopper sold
+    fuel_used: QuantityMatrix # fuel items burnt (not for fuels that last forever)
+    percentage_boost_is_float: np.ndarray
+    
+    def __len__(self):
+        return len(self.row_in_group)
+    
+    # configurations of the same speed class share their raw_item_drops/in_inventory/sold_to_hopper dicts
+    def to_outputs(self) -> list[MinionSimulationOutput]:
+        columns = {name: values.tolist() for name, values in self.outputs.items()}
+        seconds_until_full = columns["seconds_until_full"] # nan: never
+        rows = self.row_in_group.tolist()
+        
+        # a speed class is a row of a group's raw_item_drops columns
+        class_of: dict[tuple[int, int], int] = {}
+        first_rows = []
+        classes = []
+        for i in range(len(rows)):
+            key = (id(self.raw_item_drops[i]), rows[i])
+            if key not in class_of:
+                class_of[key] = len(first_rows)
+                first_rows.append(i)
+            classes.append(class_of[key])
+        
+        raw_item_drops = []
+        for i in first_rows:
+            names, amounts = self.raw_item_drops[i]
+            raw_item_drops.append({name: int(amount[rows[i]]) for name, amount in zip(names, amounts)})
+        inventory = self.inventory.to_dicts(first_rows)
+        hopper_items = self.hopper_items.to_dicts(first_rows)
+        
+        out = []
+        for i in range(len(rows)):
+            c = classes[i]
+            
+            percentage_boost = columns["percentage_boost"][i]
+            if not self.percentage_boost_is_float[i]:
+                percentage_boost = int(percentage_boost)
+            
+            out.append(MinionSimulationOutput(
+                seconds=columns["seconds"][i],
+                percentage_boost=percentage_boost,
+                raw_item_drops=raw_item_drops[c],
+                in_inventory=inventory[c],
+                sold_to_hopper=hopper_items[c],
+                hopper_coins=columns["hopper_coins"][i],
+                coins_if_inventory_sell_order_to_bz=columns["coins_if_inventory_sell_order_to_bz"][i],
+                coins_if_inventory_instant_sold_to_bz=columns["coins_if_inventory_instant_sold_to_bz"][i],
+                coins_if_inventory_sold_to_npc=columns["coins_if_inventory_sold_to_npc"][i],
+                coins_if_inventory_sold_optimally=columns["coins_if_inventory_sold_optimally"][i],
+                profit_24h_if_inventory_sell_order_to_bz=columns["profit_24h_if_inventory_sell_order_to_bz"][i],
+                profit_24h_if_inventory_instant_sold_to_bz=columns["profit_24h_if_inventory_instant_sold_to_bz"][i],
+                profit_24h_if_inventory_sold_to_npc=columns["profit_24h_if_inventory_sold_to_npc"][i],
+                profit_24h_if_inventory_sold_optimally=columns["profit_24h_if_inventory_sold_optimally"][i],
+                profit_24h_only_hopper=columns["profit_24h_only_hopper"][i],
+                APR_if_inventory_sell_order_to_bz=columns["APR_if_inventory_sell_order_to_bz"][i],
+                APR_only_hopper=columns["APR_only_hopper"][i],
+                cost_of_fuel=columns["cost_of_fuel"][i],
+                inventory_full=columns["inventory_full"][i],
+                fuel_empty=columns["fuel_empty"][i],
+                minion_cost_total=columns["minion_cost_total"][i],
+                minion_cost_non_recoverable=columns["minion_cost_non_recoverable"][i],
+                minion_cost_recoverable=columns["minion_cost_recoverable"][i],
+                seconds_until_full=None if seconds_until_full[i] != seconds_until_full[i] else int(seconds_until_full[i]),
+            ))
+        return out
+
+
+@dataclass
+class _BatchGroupDrops:
+    # the duration and upgrade independent part of one (minion, fuel, items) group
+    outputs_per_cycle: dict[str, float]
+    outputs_per_cycle_not_multiplied: dict[str, float]
+    outputs_per_day: dict[str, float]
+    outputs_per_cycle_without_fuel: dict[str, float]
+    fuel_speed_percentage: int
+    # speed changes from items in the order they are applied: ("add", x), ("multiply", x) or ("add_per_level", x)
+    item_speed_changes: list[tuple[str, float]]
+
+
+# returns None if the group uses something the batch engine doesn't model (scalar fallback)
+def compile_batch_group(minion: MinionBase, fuel: None | MinionFuelType, item_1: None | MinionItemType, item_2: None | MinionItemType) -> None | _BatchGroupDrops:
+    if fuel == None:
+        return None
+    
+    outputs_per_cycle:dict[str, float] = dict(minion.profile.drops_per_cycle)
+    outputs_per_cycle_not_multiplied:dict[str, float] = {}
+    outputs_per_day:dict[str, float] = {}
+    
+    fuel_speed_percentage = 0
+    multiplier = 1
+    if not fuel.special_case:
+        fuel_speed_percentage = fuel.percentage_boost
+    elif fuel.name == "Everburning Flame":
+        fuel_speed_percentage = 35
+        if minion.skill_type == "combat":
+            fuel_speed_percentage += 5
+    elif fuel.name == "Tasty Cheese":
+        multiplier = 2
+    elif fuel.name == "Catalyst":
+        multiplier = 3
+    elif fuel.name == "Hyper Catalyst":
+        multiplier = 4
+    
+    if multiplier != 1:
+        for item in outputs_per_cycle:
+            outputs_per_cycle[item] *= multiplier
+    
+    item_speed_changes = []
+    for item in [item_1, item_2]:
+        if item == None:
+            pass
+        elif not item.special_case:
+            if item.percentage_boost:
+                item_speed_changes.append(("add", item.percentage_boost))
+        elif item.name == "Diamond Spreading":
+            outputs_per_cycle_not_multiplied["Diamond"] = sum(outputs_per_cycle.values()) / 10
+        elif item.name == "Lesser Soulflow Engine":
+            item_speed_changes.append(("multiply", 0.5))
+            outputs_per_day["soulflow"] = 86400/180
+        elif item.name == "Soulflow Engine":
+            item_speed_changes.append(("multiply", 0.5))
+            outputs_per_day["Soulflow"] = 86400/90
+            if minion.name == "Voidling":
+                item_speed_changes.append(("add_per_level", 3))
+        elif item.name == "Corrupt Soil":
+            if "Corrupted Fragment" not in outputs_per_cycle:
+                outputs_per_cycle["Corrupted Fragment"] = 0
+            if "Sulphur" not in outputs_per_cycle:
+                outputs_per_cycle["Sulphur"] = 0
+            if minion.profile.has_drops:
+                outputs_per_cycle["Corrupted Fragment"] = 1
+                outputs_per_cycle["Sulphur"] = 1
+        elif item.name == "Berberis Fuel Injector":
+            item_speed_changes.append(("add", 15))
+            outputs_per_day["Lush Berberis"] = 86400/300
+        elif item.name == "Compactor" or item.name == "Super Compactor 3000":
+            pass
+        else:
+            # auto smelter & friends
+            return None
+    
+    # what is left once the fuel runs out
+    outputs_per_cycle_without_fuel = dict(outputs_per_cycle)
+    if multiplier != 1:
+        for item in outputs_per_cycle_without_fuel:
+            outputs_per_cycle_without_fuel[item] /= multiplier
+    
+    return _BatchGroupDrops(
+        outputs_per_cycle=outputs_per_cycle,
+        outputs_per_cycle_not_multiplied=outputs_per_cycle_not_multiplied,
+        outputs_per_day=outputs_per_day,
+        outputs_per_cycle_without_fuel=outputs_per_cycle_without_fuel,
+        fuel_speed_percentage=fuel_speed_percentage,
+        item_speed_changes=item_speed_changes,
+    )
+
+
+# column-wise version of MinionInventory.put_items_in_inventory for an inventory with `empty_slots` empty slots
+# (and no slots holding any of the items). returns (amount put in inventory, amount left over) per item
+def _put_items_in_empty_slots(empty_slots: np.ndarray, amounts: list[np.ndarray]) -> tuple[list[np.ndarray], list[np.ndarray], np.ndarray]:
+    empty_slots = empty_slots.copy()
+    remaining = [amount.copy() for amount in amounts]
+    placed = [np.zeros_like(amount) for amount in amounts]
+    
+    # one slot per item type if there's room for all of them
+    item_types = sum((amount > 0).astype(np.int64) for amount in amounts) if amounts else np.zeros_like(empty_slots)
+    initial = empty_slots >= item_types
+    for i in range(len(amounts)):
+        add = np.where(initial & (remaining[i] > 0), np.minimum(64, remaining[i]), 0)
+        placed[i] += add
+        remaining[i] -= add
+        empty_slots -= (add > 0)
+    
+    # distribute the rest proportionally
+    empty_slots_remaining = empty_slots.copy()
+    total_items_remaining = sum(remaining) if remaining else np.zeros_like(empty_slots)
+    for i in range(len(amounts)):
+        active = (total_items_remaining > 0) & (remaining[i] > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slots_for_item = np.rint((remaining[i] / total_items_remaining) * empty_slots_remaining)
+        slots_for_item = np.where(active, slots_for_item, 0).astype(np.int64)
+        slots_used = np.minimum(slots_for_item, empty_slots)
+        add = np.minimum(remaining[i], 64 * slots_used)
+        placed[i] += add
+        remaining[i] -= add
+        empty_slots -= -(-add // 64)
+    
+    return placed, remaining, empty_slots
+
+
+# (first row of each distinct row, which distinct row each row is) over a few equal length columns
+# same as np.unique(np.column_stack(columns), axis=0, ...) but a lot faster for short columns
+def _unique_rows(columns: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort(columns) # stable, so the first row of a run is the first occurrence
+    starts_run = np.zeros(len(order), dtype=bool)
+    starts_run[:1] = True
+    for column in columns:
+        sorted_column = column[order]
+        starts_run[1:] |= sorted_column[1:] != sorted_column[:-1]
+    inverse = np.empty_like(order)
+    inverse[order] = np.cumsum(starts_run) - 1
+    return order[starts_run], inverse
+
+
+
+
+# fuel bought plus the power crystals a beacon burns through
+def batch_cost_of_fuel(prices: PriceVectors, seconds: np.ndarray, fuel_used: QuantityMatrix, beacon_percent_boost: np.ndarray, crystal_cost_24hrs_per_minion: np.ndarray) -> np.ndarray:
+    cost_of_fuel = prices.price(fuel_used, "buy")
+    return np.where(beacon_percent_boost > 0, cost_of_fuel + crystal_cost_24hrs_per_minion * (seconds / 86400), cost_of_fuel)
+
+
+# price_unloaded_minion_output for many configurations at once: the item values are matrix products of
+# the quantity matrices with the price vectors, everything else is the same arithmetic on columns.
+# hopper_items only has the items a hopper sold, hopper_sell_percentage is 0 without a hopper
+def price_unloaded_minion_batch(prices: PriceVectors, seconds: np.ndarray, inventory: QuantityMatrix, hopper_items: QuantityMatrix, fuel_used: QuantityMatrix, hopper_sell_percentage: np.ndarray, beacon_percent_boost: np.ndarray, crystal_cost_24hrs_per_minion: np.ndarray, minion_cost_recoverable: np.ndarray, minion_cost_non_recoverable: np.ndarray) -> dict[str, np.ndarray]:
+    hopper_money = prices.price(hopper_items, "npc") * (hopper_sell_percentage / 100)
+    
+    cost_of_fuel = batch_cost_of_fuel(prices, seconds, fuel_used, beacon_percent_boost, crystal_cost_24hrs_per_minion)
+    
+    # CALCULATE PRICE OF INVENTORY
+    coins_if_inventory_sell_order_to_bz = prices.price(inventory, "order")
+    coins_if_inventory_instant_sold_to_bz = prices.price(inventory, "instant")
+    coins_if_inventory_sold_to_npc = prices.price(inventory, "npc")
+    coins_if_inventory_sold_optimally = prices.price(inventory, "best")
+    
+    profit_24h_if_inventory_sold_to_npc = np.trunc(((coins_if_inventory_sold_to_npc+hopper_money-cost_of_fuel) / seconds) * 86400).astype(np.int64)
+    profit_24h_if_inventory_instant_sold_to_bz = np.trunc(((coins_if_inventory_instant_sold_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400).astype(np.int64)
+    profit_24h_if_inventory_sell_order_to_bz = np.trunc(((coins_if_inventory_sell_order_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400).astype(np.int64)
+    profit_24h_if_inventory_sold_optimally = np.trunc(((coins_if_inventory_sold_optimally+hopper_money-cost_of_fuel) / seconds) * 86400).astype(np.int64)
+    profit_24h_only_hopper = np.trunc((hopper_money-cost_of_fuel) / seconds * 86400).astype(np.int64)
+    
+    minion_cost_total = minion_cost_recoverable + minion_cost_non_recoverable
+    
+    APR_if_inventory_sell_order_to_bz = ((profit_24h_if_inventory_instant_sold_to_bz * 365)/minion_cost_total) * 100
+    APR_only_hopper = ((profit_24h_only_hopper * 365)/minion_cost_total) * 100
+    
+    return {
+        "hopper_coins": np.trunc(hopper_money).astype(np.int64),
+        "coins_if_inventory_sell_order_to_bz": np.trunc(coins_if_inventory_sell_order_to_bz).astype(np.int64),
+        "coins_if_inventory_instant_sold_to_bz": np.trunc(coins_if_inventory_instant_sold_to_bz).astype(np.int64),
+        "coins_if_inventory_sold_to_npc": np.trunc(coins_if_inventory_sold_to_npc).astype(np.int64),
+        "coins_if_inventory_sold_optimally": np.trunc(coins_if_inventory_sold_optimally).astype(np.int64),
+        "profit_24h_if_inventory_sell_order_to_bz": profit_24h_if_inventory_sell_order_to_bz,
+        "profit_24h_if_inventory_instant_sold_to_bz": profit_24h_if_inventory_instant_sold_to_bz,
+        "profit_24h_if_inventory_sold_to_npc": profit_24h_if_inventory_sold_to_npc,
+        "profit_24h_if_inventory_sold_optimally": profit_24h_if_inventory_sold_optimally,
+        "profit_24h_only_hopper": profit_24h_only_hopper,
+        "APR_if_inventory_sell_order_to_bz": np.trunc(APR_if_inventory_sell_order_to_bz).astype(np.int64),
+        "APR_only_hopper": np.trunc(APR_only_hopper).astype(np.int64),
+        "cost_of_fuel": np.trunc(cost_of_fuel).astype(np.int64),
+        "minion_cost_total": np.trunc(minion_cost_total).astype(np.int64),
+        "minion_cost_recoverable": np.trunc(minion_cost_recoverable).astype(np.int64),
+        "minion_cost_non_recoverable": np.trunc(minion_cost_non_recoverable).astype(np.int64),
+    }
+
+
+# the per-configuration columns of a batch group that are known before anything is simulated
+@dataclass
+class _BatchGroupColumns:
+    levels: np.ndarray
+    storages: list[None | MinionStorageType]
+    mithril_infusion: np.ndarray
+    free_will: np.ndarray
+    postcard: np.ndarray
+    beacon_percent_boost: np.ndarray
+    seconds: np.ndarray
+    
+    minion_speed_percentage: np.ndarray # after the fuel ran out, if it does
+    fueled_speed_percentage: np.ndarray # while the fuel lasts
+    percentage_boost_is_float: bool
+    fuel_runs_out: np.ndarray
+    time_1: int # how long the fuel lasts (0 if it lasts forever)
+    seconds_per_cycle: np.ndarray
+    inventory_slots: np.ndarray # including storage
+
+
+def batch_group_columns(minion: MinionBase, fuel: MinionFuelType, group: _BatchGroupDrops, configurations: list[tuple]) -> _BatchGroupColumns:
+    levels = np.array([c[1] for c in configurations], dtype=np.int64)
+    storages = [c[6] for c in configurations]
+    mithril_infusion = np.array([c[7] for c in configurations], dtype=bool)
+    free_will = np.array([c[8] for c in configurations], dtype=bool)
+    postcard = np.array([c[9] for c in configurations], dtype=bool)
+    beacon_percent_boost = np.array([c[10] for c in configurations], dtype=np.int64)
+    pet_bonus_percent = np.array([c[11] for c in configurations], dtype=np.int64)
+    crystal_bonus_percent = np.array([c[12] for c in configurations], dtype=np.int64)
+    seconds = np.array([c[13] for c in configurations], dtype=np.int64)
+    
+    assert np.isin(beacon_percent_boost, [0, 10, 11]).all() # idc about lower level beacons
+    
+    # handle minion upgrades and fuel
+    minion_speed_percentage = 100 + 10*mithril_infusion + 10*free_will + 5*postcard + beacon_percent_boost + pet_bonus_percent + crystal_bonus_percent
+    minion_speed_percentage = minion_speed_percentage + group.fuel_speed_percentage
+    percentage_boost_is_float = False
+    for change, value in group.item_speed_changes:
+        if change == "add":
+            minion_speed_percentage = minion_speed_percentage + value
+        elif change == "multiply":
+            minion_speed_percentage = minion_speed_percentage * value
+            percentage_boost_is_float = True
+        elif change == "add_per_level":
+            minion_speed_percentage = minion_speed_percentage + value * levels
+    
+    # some fuel calculation
+    if fuel.duration_hours == None:
+        fuel_runs_out = np.zeros(len(configurations), dtype=bool)
+        time_1 = 0
+    else:
+        time_1 = (fuel.duration_hours * 60*60) * 64
+        fuel_runs_out = seconds > time_1
+    
+    seconds_per_action = np.array(minion.profile.seconds_per_action, dtype=np.float64)
+    seconds_per_cycle = seconds_per_action[levels-1] * 2
+    
+    # once the fuel runs out only the time after it ran out counts (same as the scalar function)
+    fueled_speed_percentage = minion_speed_percentage
+    minion_speed_percentage = np.where(fuel_runs_out, minion_speed_percentage - group.fuel_speed_percentage, minion_speed_percentage)
+    
+    inventory_slots = np.array(minion.profile.inventory_slots, dtype=np.int64)[levels-1]
+    inventory_slots += np.array([storage.inventory_slots if storage else 0 for storage in storages], dtype=np.int64)
+    
+    return _BatchGroupColumns(
+        levels=levels,
+        storages=storages,
+        mithril_infusion=mithril_infusion,
+        free_will=free_will,
+        postcard=postcard,
+        beacon_percent_boost=beacon_percent_boost,
+        seconds=seconds,
+        minion_speed_percentage=minion_speed_percentage,
+        fueled_speed_percentage=fueled_speed_percentage,
+        percentage_boost_is_float=percentage_boost_is_float,
+        fuel_runs_out=fuel_runs_out,
+        time_1=time_1,
+        seconds_per_cycle=seconds_per_cycle,
+        inventory_slots=inventory_slots,
+    )
+
+
+# drops (before compaction) of the given rows of a group
+def batch_item_drops(group: _BatchGroupDrops, columns: _BatchGroupColumns, rows: np.ndarray) -> dict[str, np.ndarray]:
+    seconds = columns.seconds[rows]
+    fuel_runs_out = columns.fuel_runs_out[rows]
+    time = np.where(fuel_runs_out, seconds - columns.time_1, seconds)
+    time_per_cycle = time / (columns.seconds_per_cycle[rows] / (columns.minion_speed_percentage[rows]/100))
+    
+    item_drops: dict[str, np.ndarray] = {}
+    for item in group.outputs_per_cycle:
+        per_cycle = np.where(fuel_runs_out, group.outputs_per_cycle_without_fuel[item], group.outputs_per_cycle[item])
+        item_drops[item] = np.floor(per_cycle * time_per_cycle).astype(np.int64)
+    for item in group.outputs_per_cycle_not_multiplied:
+        item_drops[item] = np.floor(group.outputs_per_cycle_not_multiplied[item] * time_per_cycle).astype(np.int64)
+    for item in group.outputs_per_day:
+        item_drops[item] = np.floor(group.outputs_per_day[item] * (seconds / 86400)).astype(np.int64)
+    return item_drops
+
+
+# seconds_until_full of every configuration of a group (nan if never), see solve_inventory_fill
+# until the first item doesn't fit every slot an item needs is there, so the first item that doesn't fit
+# is the (slots+1)th time any item needs a slot: all classes at once, with the same float ops as the scalar
+# solver. it doesn't depend on how long the minion runs, only on the speed, the cycle time and the slots
+def _batch_seconds_until_full(group: _BatchGroupDrops, columns: _BatchGroupColumns, item_1: MinionItemType, item_2: MinionItemType) -> np.ndarray:
+    first, member_of = _unique_rows([columns.fueled_speed_percentage, columns.seconds_per_cycle, columns.inventory_slots])
+    sweep_profile.count("fill timelines solved", len(first))
+    
+    speeds = columns.fueled_speed_percentage[first]
+    slots = columns.inventory_slots[first]
+    fuel_seconds = columns.time_1 or None
+    rates, rates_without_fuel = production_rates(group.outputs_per_cycle, group.outputs_per_cycle_without_fuel, group.outputs_per_cycle_not_multiplied, group.outputs_per_day, columns.seconds_per_cycle[first], speeds, speeds - group.fuel_speed_percentage)
+    
+    openings = [np.full((1, len(first)), inf)] # so there always is a (slots+1)th
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for item in rates:
+            rate = np.broadcast_to(np.asarray(rates[item], dtype=np.float64), first.shape)[None, :]
+            rate_without_fuel = np.broadcast_to(np.asarray(rates_without_fuel[item], dtype=np.float64), first.shape)[None, :]
+            for form, per_item, kept in compaction_forms(item, *compactors(item_1, item_2)):
+                # a slot more than every slot of the inventory can't be among the first slots+1
+                stacks = int(slots.max()) + 1 if kept is None else -(-kept // 64)
+                amount = ((64*np.arange(stacks) + 1) * per_item).astype(np.float64)[:, None]
+                seconds = np.where(rate > 0, amount / rate, inf)
+                if fuel_seconds is not None:
+                    made_while_fueled = rate * fuel_seconds
+                    after_fuel = np.where(rate_without_fuel > 0, fuel_seconds + (amount - made_while_fueled) / rate_without_fuel, inf)
+                    seconds = np.where(amount <= made_while_fueled, seconds, after_fuel)
+                openings.append(seconds)
+    
+    full = np.take_along_axis(np.sort(np.concatenate(openings), axis=0), slots[None, :], axis=0)[0]
+    seconds_until_full = np.where(np.isfinite(full), np.ceil(full), np.nan)
+    return seconds_until_full[member_of]
+
+
+# the price dependent part of a group that doesn't need a simulation, see price_minion_setup
+@dataclass
+class _BatchGroupCosts:
+    fuel_used: QuantityMatrix # fuel items burnt (not for fuels that last forever)
+    crystal_cost_24hrs_per_minion: np.ndarray
+    minion_cost_recoverable: np.ndarray
+    minion_cost_non_recoverable: np.ndarray
+
+
+def batch_group_costs(minion: MinionBase, fuel: MinionFuelType, hopper: None | MinionHopperType, item_1: MinionItemType, item_2: MinionItemType, columns: _BatchGroupColumns) -> _BatchGroupCosts:
+    skyblock_items = simulate.skyblock_items
+    n = len(columns.seconds)
+    beacon_percent_boost = columns.beacon_percent_boost
+    
+    fuel_used = QuantityMatrix.from_columns([], [], n, dtype=np.float64)
+    if fuel.duration_hours:
+        fuel_used = QuantityMatrix.from_columns([fuel.name], [columns.seconds.astype(np.float64) / float(fuel.duration_hours*60*60)], n, dtype=np.float64)
+    
+    crystal_cost_24hrs_per_minion = np.zeros(n)
+    if (beacon_percent_boost == 10).any():
+        crystal = skyblock_items.search_by_name("Power Crystal")
+        crystal_cost_24hrs_per_minion[beacon_percent_boost == 10] = (crystal.bz_sell_price / 2) / MINION_COUNT
+    if (beacon_percent_boost == 11).any():
+        crystal = skyblock_items.search_by_name("Scorched Power Crystal")
+        crystal_cost_24hrs_per_minion[beacon_percent_boost == 11] = (crystal.bz_sell_price / 2) / MINION_COUNT
+    
+    # minion cost, see price_minion_setup
+    zeros = np.zeros(n)
+    minion_cost_non_recoverable = np.array(minion.get_all_cumulative_level_costs(skyblock_items), dtype=np.float64)[columns.levels]
+    minion_cost_recoverable = 0
+    
+    if fuel.duration_hours == None:
+        item = skyblock_items.search_by_name(fuel.name)
+        if item.bz_sell_price == None:
+            skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable += item.lowest_price()
+    
+    if hopper: minion_cost_recoverable += skyblock_items.search_by_name(hopper.name).bz_sell_price
+    if item_1: minion_cost_recoverable += skyblock_items.search_by_name(item_1.name).bz_sell_price
+    if item_2: minion_cost_recoverable += skyblock_items.search_by_name(item_2.name).bz_sell_price
+    minion_cost_recoverable = zeros + minion_cost_recoverable
+    
+    storages = columns.storages
+    storage_names = {storage.name for storage in storages if storage}
+    storage_prices = {name: skyblock_items.search_by_name(f"{name} Storage").bz_sell_price for name in storage_names}
+    minion_cost_recoverable = minion_cost_recoverable + np.array([storage_prices[storage.name] if storage else 0 for storage in storages], dtype=np.float64)
+    if columns.mithril_infusion.any():
+        minion_cost_non_recoverable = minion_cost_non_recoverable + np.where(columns.mithril_infusion, skyblock_items.search_by_name("Mithril Infusion").bz_sell_price, 0)
+    if columns.free_will.any():
+        minion_cost_non_recoverable = minion_cost_non_recoverable + np.where(columns.free_will, skyblock_items.search_by_name("Free Will").bz_sell_price, 0)
+    if columns.postcard.any():
+        item = skyblock_items.search_by_name("Postcard")
+        skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable = minion_cost_recoverable + np.where(columns.postcard, item.lowest_price() / MINION_COUNT, 0)
+    if (beacon_percent_boost > 0).any():
+        item = skyblock_items.search_by_name("Beacon V")
+        skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable = minion_cost_recoverable + np.where(beacon_percent_boost > 0, item.lowest_price() / MINION_COUNT, 0)
+    
+    return _BatchGroupCosts(
+        fuel_used=fuel_used,
+        crystal_cost_24hrs_per_minion=crystal_cost_24hrs_per_minion,
+        minion_cost_recoverable=minion_cost_recoverable,
+        minion_cost_non_recoverable=minion_cost_non_recoverable,
+    )
+
+
+# returns None if the group needs the scalar fallback after all
+def _simulate_batch_group(minion: MinionBase, fuel: MinionFuelType, hopper: None | MinionHopperType, item_1: MinionItemType, item_2: MinionItemType, group: _BatchGroupDrops, configurations: list[tuple]) -> None | dict:
+    with sweep_profile.stage("drops"):
+        columns = batch_group_columns(minion, fuel, group, configurations)
+    seconds = columns.seconds
+    
+    # within a group the drops and the inventory only depend on the speed, the cycle time, how long it runs
+    # and how many slots there are. upgrades, beacons and storages that add up to the same of those only
+    # change the costs, so each of these speed classes is simulated once and fanned out to its configurations
+    first, member_of = _unique_rows([columns.minion_speed_percentage, columns.seconds_per_cycle, seconds, columns.inventory_slots])
+    classes = len(first)
+    sweep_profile.count("speed classes simulated", classes)
+    
+    with sweep_profile.stage("drops"):
+        item_drops = batch_item_drops(group, columns, first)
+        raw_item_drops = {item: amount.copy() for item, amount in item_drops.items()}
+    
+    # generate compacted drops (compacted items go in the inventory first)
+    with sweep_profile.stage("compaction"):
+        compacted_item_drops: dict[str, np.ndarray] = {}
+        if item_1.name == "Compactor" or item_2.name == "Compactor":
+            for item in item_drops:
+                if is_compactable(item):
+                    compacted = convert_to_compacted(item)
+                    compacted_item_drops[compacted.output_item] = item_drops[item] // compacted.input_count
+                    item_drops[item] = item_drops[item] % compacted.input_count
+        
+        if item_1.name == "Super Compactor 3000" or item_1.name == "Dwarven Super Compactor 3000" or item_2.name == "Super Compactor 3000" or item_2.name == "Dwarven Super Compactor 3000":
+            for item in item_drops:
+                if is_super_compactable(item):
+                    super_compacted = convert_to_super_compacted(item)
+                    amt_made = item_drops[item] // super_compacted.input_count
+                    compacted_item_drops[super_compacted.output_item] = amt_made
+                    item_drops[item] = item_drops[item] % super_compacted.input_count
+                    
+                    compact_2 = super_compacted.output_item
+                    if is_super_compactable(compact_2):
+                        super_compacted_2 = convert_to_super_compacted(compact_2)
+                        made = amt_made > 0
+                        previous = compacted_item_drops.get(super_compacted_2.output_item, np.zeros_like(amt_made))
+                        compacted_item_drops[super_compacted_2.output_item] = np.where(made, compacted_item_drops[compact_2] // super_compacted_2.input_count, previous)
+                        compacted_item_drops[compact_2] = np.where(made, compacted_item_drops[compact_2] % super_compacted_2.input_count, compacted_item_drops[compact_2])
+    
+    # put items into inventory
+    with sweep_profile.stage("inventory"):
+        compacted_names = list(compacted_item_drops)
+        item_names = list(item_drops)
+        placed_1, not_put_1, empty_slots = _put_items_in_empty_slots(columns.inventory_slots[first], list(compacted_item_drops.values()))
+        placed_2, not_put_2, _ = _put_items_in_empty_slots(empty_slots, list(item_drops.values()))
+        
+        # a slightly odd quirk of the scalar function: if both the compacted and the normal items overflow
+        # then nothing counts as overflow
+        overflow_1 = np.zeros(classes, dtype=bool)
+        for amount in not_put_1:
+            overflow_1 |= amount > 0
+        overflow_2 = np.zeros(classes, dtype=bool)
+        for amount in not_put_2:
+            overflow_2 |= amount > 0
+        use_overflow_1 = overflow_1 & ~overflow_2
+        use_overflow_2 = overflow_2 & ~overflow_1
+        inventory_full = (use_overflow_1 | use_overflow_2)[member_of]
+        
+        not_put_in_inventory = [np.where(use_overflow_1, amount, 0) for amount in not_put_1] + [np.where(use_overflow_2, amount, 0) for amount in not_put_2]
+    
+    with sweep_profile.stage("fill timeline"):
+        seconds_until_full = _batch_seconds_until_full(group, columns, item_1, item_2)
+    
+    names = compacted_names + item_names
+    # names shared between compacted and normal drops would change how slots get filled
+    if len(set(names)) != len(names):
+        return None
+    
+    class_inventory = QuantityMatrix.from_columns(names, placed_1 + placed_2, classes)
+    class_not_put_in_inventory = QuantityMatrix.from_columns(names, not_put_in_inventory, classes)
+    
+    n = len(configurations)
+    inventory = class_inventory.take(member_of)
+    hopper_items = class_not_put_in_inventory.take(member_of) if hopper != None else QuantityMatrix.from_columns([], [], n)
+    with sweep_profile.stage("pricing"):
+        prices = get_price_vectors()
+        prices.check_used(class_inventory)
+        prices.check_used(class_not_put_in_inventory)
+        
+        costs = batch_group_costs(minion, fuel, hopper, item_1, item_2, columns)
+        
+        hopper_sell_percentage = np.full(n, hopper.sell_percentage if hopper != None else 0)
+        outputs = {
+            "seconds": seconds,
+            "percentage_boost": columns.minion_speed_percentage,
+            "inventory_full": inventory_full,
+            "fuel_empty": columns.fuel_runs_out,
+            "seconds_until_full": seconds_until_full,
+        }
+        outputs.update(price_unloaded_minion_batch(prices, seconds, inventory, hopper_items, costs.fuel_used, hopper_sell_percentage, columns.beacon_percent_boost, costs.crystal_cost_24hrs_per_minion, costs.minion_cost_recoverable, costs.minion_cost_non_recoverable))
+    
+    return {
+        "outputs": outputs,
+        "raw_item_drops": [(list(raw_item_drops), list(raw_item_drops.values()))] * n,
+        "inventory": inventory,
+        "hopper_items": hopper_items,
+        "fuel_used": costs.fuel_used,
+        "row_in_group": member_of,
+        "percentage_boost_is_float": np.full(n, columns.percentage_boost_is_float),
+    }
+
+
+# the scalar result of a configuration with seconds_until_full worked out, like the batch engine has it
+def _simulate_with_fill_estimate(configuration: tuple) -> MinionSimulationOutput:
+    setup = setup_unloaded_minion_simulation(*configuration[:13])
+    output = simulate_unloaded_minion_setup(setup, configuration[13])
+    output.seconds_until_full = setup_inventory_fill(setup).seconds_until_full()
+    return output
+
+
+# same shape as _simulate_batch_group, from scalar results
+def _batch_from_outputs(configurations: list[tuple], simulation_outputs: list[MinionSimulationOutput]) -> dict:
+    def items(d: dict[str, int]) -> tuple[list[str], list[np.ndarray]]:
+        return list(d), [np.array([amount], dtype=np.int64) for amount in d.values()]
+    
+    outputs = {}
+    for name in ["seconds", "percentage_boost", "hopper_coins", "coins_if_inventory_sell_order_to_bz", "coins_if_inventory_instant_sold_to_bz", "coins_if_inventory_sold_to_npc", "coins_if_inventory_sold_optimally", "profit_24h_if_inventory_sell_order_to_bz", "profit_24h_if_inventory_instant_sold_to_bz", "profit_24h_if_inventory_sold_to_npc", "profit_24h_if_inventory_sold_optimally", "profit_24h_only_hopper", "APR_if_inventory_sell_order_to_bz", "APR_only_hopper", "cost_of_fuel", "inventory_full", "fuel_empty", "minion_cost_total", "minion_cost_recoverable", "minion_cost_non_recoverable"]:
+        outputs[name] = np.array([getattr(sim, name) for sim in simulation_outputs])
+    outputs["seconds_until_full"] = np.array([np.nan if sim.seconds_until_full is None else sim.seconds_until_full for sim in simulation_outputs], dtype=np.float64)
+    
+    return {
+        "outputs": outputs,
+        "raw_item_drops": [items(sim.raw_item_drops) for sim in simulation_outputs],
+        "inventory": QuantityMatrix.from_dicts([sim.in_inventory for sim in simulation_outputs]),
+        "hopper_items": QuantityMatrix.from_dicts([sim.sold_to_hopper for sim in simulation_outputs]),
+        "fuel_used": QuantityMatrix.from_dicts([fuel_items_used(c[2], c[13]) for c in configurations], dtype=np.float64),
+        "row_in_group": np.zeros(len(simulation_outputs), dtype=np.int64),
+        "percentage_boost_is_float": np.array([isinstance(sim.percentage_boost, float) for sim in simulation_outputs], dtype=bool),
+    }
+
+
+# the batch group of a configuration: (minion, fuel, hopper, item_1, item_2) names
+def batch_group_key(configuration: tuple) -> tuple:
+    minion, _, fuel, hopper, item_1, item_2 = configuration[:6]
+    return (minion.name, fuel.name if fuel else None, hopper.name if hopper else None, item_1.name if item_1 else None, item_2.name if item_2 else None)
+
+
+# configurations: tuples of simulate_unloaded_minion_output's arguments (without minionInventory)
+# (minion, minion_level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent, seconds)
+# results are in the same order as the configurations and identical to calling the scalar function on each one
+def simulate_unloaded_minion_output_batch(configurations: list[tuple]) -> MinionSimulationBatch:
+    groups: dict[tuple, list[int]] = {}
+    for i, c in enumerate(configurations):
+        key = batch_group_key(c)
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(i)
+    
+    n = len(configurations)
+    outputs: dict[str, np.ndarray] = {}
+    raw_item_drops: list = [None] * n
+    group_indexes: list[np.ndarray] = []
+    group_results: list[dict] = []
+    row_in_group = np.zeros(n, dtype=np.int64)
+    percentage_boost_is_float = np.zeros(n, dtype=bool)
+    
+    for indexes in groups.values():
+        minion, _, fuel, hopper, item_1, item_2 = configurations[indexes[0]][:6]
+        group_configurations = [configurations[i] for i in indexes]
+        
+        group = compile_batch_group(minion, fuel, item_1, item_2)
+        if group is not None:
+            result = _simulate_batch_group(minion, fuel, hopper, item_1, item_2, group, group_configurations)
+            if result is None:
+                group = None
+        
+        if group is None:
+            # scalar fallback
+            sweep_profile.count("scalar fallback configurations", len(group_configurations))
+            with sweep_profile.stage("scalar fallback"):
+                result = _batch_from_outputs(group_configurations, [_simulate_with_fill_estimate(c) for c in group_configurations])
+        
+        index_array = np.array(indexes, dtype=np.int64)
+        for name, values in result["outputs"].items():
+            if name not in outputs:
+                outputs[name] = np.zeros(n, dtype=np.float64 if name == "percentage_boost" else values.dtype)
+            outputs[name][index_array] = values
+        
+        row_in_group[index_array] = result["row_in_group"]
+        percentage_boost_is_float[index_array] = result["percentage_boost_is_float"]
+        for j, i in enumerate(indexes):
+            raw_item_drops[i] = result["raw_item_drops"][j]
+        group_indexes.append(index_array)
+        group_results.append(result)
+    
+    # the quantity matrices are stacked group after group, put their rows back in configuration order
+    order = np.argsort(np.concatenate(group_indexes), kind="stable") if group_indexes else np.zeros(0, dtype=np.int64)
+    
+    return MinionSimulationBatch(
+        outputs=outputs,
+        raw_item_drops=raw_item_drops,
+        row_in_group=row_in_group,
+        inventory=QuantityMatrix.concat([result["inventory"] for result in group_results]).take(order),
+        hopper_items=QuantityMatrix.concat([result["hopper_items"] for result in group_results]).take(order),
+        fuel_used=QuantityMatrix.concat([result["fuel_used"] for result in group_results]).take(order),
+        percentage_boost_is_float=percentage_boost_is_float,
+    )
+
+
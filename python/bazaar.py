@@ -1,7 +1,16 @@
-import requests
+import argparse
+import gzip
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
+
+# requests is only imported when something gets fetched, importing this module never touches the network
+if TYPE_CHECKING:
+    import requests
 
 @dataclass
 class OrderSummary:
@@ -53,15 +62,190 @@ class SBItem:
             return self.auction_average_buy_price
         raise ValueError(f"Item '{self.name}' has no price data")
 
+ITEMS_URL = "https://api.hypixel.net/v2/resources/skyblock/items"
+BAZAAR_URL = "https://api.hypixel.net/v2/skyblock/bazaar"
+
+SNAPSHOT_DIR = "data/price_snapshots"
+
+# coflnet, for items that aren't on the bazaar. COFLNET_URL points it somewhere else (like a local stand-in server)
+AUCTION_BASE_URL = os.environ.get("COFLNET_URL", "https://sky.coflnet.com")
+AUCTION_CACHE_PATH = "data/auction_prices.json"
+
+
+# The raw items and bazaar responses from one point in time, so runs can be repeated without the network.
+# Saved as gzipped json named after the bazaar's lastUpdated.
+@dataclass
+class PriceSnapshot:
+    last_updated: int # bazaar lastUpdated, ms since epoch
+    items: dict # raw ITEMS_URL response
+    bazaar: dict # raw BAZAAR_URL response
+
+    @staticmethod
+    def fetch() -> "PriceSnapshot":
+        import requests
+        
+        bazaar = requests.get(BAZAAR_URL).json()
+        items = requests.get(ITEMS_URL).json()
+        return PriceSnapshot(last_updated=bazaar["lastUpdated"], items=items, bazaar=bazaar)
+
+    @staticmethod
+    def load(path: str) -> "PriceSnapshot":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return PriceSnapshot(last_updated=data["lastUpdated"], items=data["items"], bazaar=data["bazaar"])
+
+    def save(self, directory: str = SNAPSHOT_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"snapshot-{self.last_updated}.json.gz")
+        # write then rename so a half written snapshot is never picked up
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"lastUpdated": self.last_updated, "items": self.items, "bazaar": self.bazaar}, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        return path
+
+    def age_minutes(self) -> float:
+        return (time.time() - self.last_updated / 1000) / 60
+
+
+# saved snapshots, oldest first
+def list_snapshots(directory: str = SNAPSHOT_DIR) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.startswith("snapshot-") and name.endswith(".json.gz")]
+    names.sort(key=lambda name: int(name[len("snapshot-"):-len(".json.gz")]))
+    return [os.path.join(directory, name) for name in names]
+
+
+# the snapshot at path, or else the newest saved one (if it's no older than max_age_minutes).
+# the network is only used with fetch=True, and the fetched snapshot gets saved
+def load_price_snapshot(path: Optional[str] = None, max_age_minutes: Optional[float] = None, fetch: bool = False, directory: str = SNAPSHOT_DIR) -> PriceSnapshot:
+    if fetch:
+        snapshot = PriceSnapshot.fetch()
+        print(f"Fetched prices, saved to {snapshot.save(directory)}")
+        return snapshot
+    
+    if path is not None:
+        return PriceSnapshot.load(path)
+    
+    snapshots = list_snapshots(directory)
+    if not snapshots:
+        raise ValueError(f"No price snapshots in {directory}, fetch one first")
+    
+    snapshot = PriceSnapshot.load(snapshots[-1])
+    if max_age_minutes is not None and snapshot.age_minutes() > max_age_minutes:
+        raise ValueError(f"Newest price snapshot {snapshots[-1]} is {snapshot.age_minutes():.0f} minutes old (max {max_age_minutes}), fetch a new one")
+    return snapshot
+
+
+# average active auction prices by sb_id, saved to disk. entries older than max_age_minutes are ignored
+class AuctionPriceCache:
+    def __init__(self, path: str = AUCTION_CACHE_PATH, max_age_minutes: float = 60):
+        self.path = path
+        self.max_age_minutes = max_age_minutes
+        self.prices: dict[str, dict] = {} # sb_id -> {"price": int, "fetched_at": unix time}
+        self.hits = 0
+        self.misses = 0 # not there or too old
+        if os.path.exists(path):
+            with open(path) as f:
+                self.prices = json.load(f)
+
+    def get(self, sb_id: str) -> Optional[int]:
+        entry = self.prices.get(sb_id)
+        if entry is None or (time.time() - entry["fetched_at"]) / 60 > self.max_age_minutes:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["price"]
+
+    def put(self, sb_id: str, price: int):
+        self.prices[sb_id] = {"price": price, "fetched_at": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.prices, f, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+
+
+# a requests.Session per thread (a Session isn't thread safe, its cookies and redirect state are shared),
+# all mounting one adapter so they still share one connection pool, with room for a connection per thread
+class _SessionPool:
+    def __init__(self, pool_size: int):
+        from requests.adapters import HTTPAdapter
+        
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.local = threading.local()
+        self.sessions: list["requests.Session"] = []
+        self.lock = threading.Lock()
+    
+    def session(self) -> "requests.Session":
+        session = getattr(self.local, "session", None)
+        if session is None:
+            import requests
+            
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+    
+    def __enter__(self) -> "_SessionPool":
+        return self
+    
+    def __exit__(self, *exc_info):
+        # closing a session closes its adapters, so this closes the shared one too
+        for session in self.sessions:
+            session.close()
+        self.adapter.close()
+
+
+def fetch_auction_average(session: "requests.Session", item: SBItem, base_url: str = AUCTION_BASE_URL) -> int:
+    response = session.get(f"{base_url}/api/auctions/tag/{item.sb_id}/active/overview", timeout=30)
+    if response.status_code != 200:
+        raise ValueError(f"Failed to fetch auction data for item '{item.name}'")
+    data = response.json()
+    if not data:
+        # nothing on the auction house right now
+        raise ValueError(f"Failed to fetch auction data for item '{item.name}'")
+    
+    total = 0
+    
+    for auction in data:
+        total += auction["price"]
+    
+    return int(total / len(data))
+
+
 class SkyblockItems:
-    def __init__(self, only_bazaar=True):
-        self.bazaar_data = self.fetch_bazaar_data()
-        self.items = self.fetch_items(only_bazaar)
-        self.items_cache: dict[str, SBItem] = {}
-
-    def fetch_items(self, only_bazaar=True) -> List[SBItem]:
-        response = requests.get("https://api.hypixel.net/v2/resources/skyblock/items")
-        data = response.json()
+    # the prices of snapshot (see load_price_snapshot), or fetched live with fetch=True. never both, and never
+    # the network by accident
+    def __init__(self, only_bazaar=True, snapshot: Optional[PriceSnapshot] = None, fetch: bool = False):
+        if (snapshot is None) == (not fetch):
+            raise ValueError("SkyblockItems needs either a price snapshot or fetch=True")
+        if fetch:
+            snapshot = PriceSnapshot.fetch()
+        self.last_updated = snapshot.last_updated
+        self.bazaar_data = self.parse_bazaar_data(snapshot.bazaar)
+        self.items = self.parse_items(snapshot.items, only_bazaar)
+        self.build_indexes()
+
+    # name and sb_id -> item. the first item wins, like the linear scans these replace did
+    # (some display names are used by more than one item)
+    def build_indexes(self):
+        self.items_by_name: dict[str, SBItem] = {}
+        self.items_by_sb_id: dict[str, SBItem] = {}
+        # how resolve went: found in the index it tried first, only in the other one, or not at all
+        # (simulate.py --profile reports these)
+        self.lookup_hits = 0
+        self.lookup_fallbacks = 0
+        self.lookup_misses = 0
+        for item in self.items:
+            self.items_by_name.setdefault(item.name, item)
+            self.items_by_sb_id.setdefault(item.sb_id, item)
+
+    def parse_items(self, data: dict, only_bazaar=True) -> List[SBItem]:
         items = [
             SBItem(
                 name=item["name"],
@@ -82,10 +266,7 @@ class SkyblockItems:
         
         return items
 
-    def fetch_bazaar_data(self) -> BazaarResponse:
-        response = requests.get("https://api.hypixel.net/v2/skyblock/bazaar")
-        data = response.json()
-        
+    def parse_bazaar_data(self, data: dict) -> BazaarResponse:
         products = {
             k: Product(
                 product_id=v["product_id"],
@@ -97,54 +278,106 @@ class SkyblockItems:
         }
         return BazaarResponse(success=data["success"], lastUpdated=data["lastUpdated"], products=products)
 
+    # minion_data and item_data mostly use display names ("Enchanted Clay") but some use sb ids ("CLAY_BALL")
+    def resolve(self, key: str) -> Optional[SBItem]:
+        first, second = (self.items_by_sb_id, self.items_by_name) if "_" in key else (self.items_by_name, self.items_by_sb_id)
+        item = first.get(key)
+        if item is not None:
+            self.lookup_hits += 1
+            return item
+        item = second.get(key)
+        if item is not None:
+            self.lookup_fallbacks += 1
+        else:
+            self.lookup_misses += 1
+        return item
+
     def search_by_name(self, name: str) -> SBItem:
-        # performance optimization
-        # really we should fix it in minion_data, not here but wtvr
-        if name in self.items_cache:
-            return self.items_cache[name]
-        
-        if "_" in name:
-            return self.search_by_sb_id(name)
-        
-        item = next((item for item in self.items if item.name == name), None)
+        item = self.resolve(name)
         if item is None:
             raise ValueError(f"Item with name '{name}' not found")
-        
-        self.items_cache[name] = item
-        
         return item
 
     def search_by_sb_id(self, sb_id: str) -> Optional[SBItem]:
-        return next((item for item in self.items if item.sb_id == sb_id), None)
+        return self.items_by_sb_id.get(sb_id)
 
     def export_to_json(self, filepath: str):
         with open(filepath, 'w') as f:
             json.dump([item.__dict__ for item in self.items], f, indent=4)
     
-    def attempt_fetch_auction_data(self, item: SBItem):
-        if item.auction_average_buy_price is not None:
-            return
-        assert item.bz_buy_price == None
+    # sets auction_average_buy_price on every item that doesn't have one yet, from the cache or else
+    # fetched concurrently over one connection pool. the prices that could be fetched are cached even if
+    # some couldn't, then the ones that failed are raised together
+    def fetch_auction_prices(self, items: list[SBItem], cache: Optional[AuctionPriceCache] = None, workers: int = 8, base_url: str = AUCTION_BASE_URL):
+        if cache is None:
+            cache = AuctionPriceCache()
         
-        response = requests.get(f"https://sky.coflnet.com/api/auctions/tag/{item.sb_id}/active/overview")
-        data = response.json()
+        missing = []
+        for item in items:
+            if item.auction_average_buy_price is not None or item in missing:
+                continue
+            price = cache.get(item.sb_id)
+            if price is None:
+                missing.append(item)
+            else:
+                item.auction_average_buy_price = price
         
-        if response.status_code != 200:
-            raise ValueError(f"Failed to fetch auction data for item '{item.name}'")
-        
-        total = 0
+        if not missing:
+            return
         
-        for auction in data:
-            total += auction["price"]
+        failed = []
+        with _SessionPool(workers) as sessions, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(lambda item: fetch_auction_average(sessions.session(), item, base_url), item): item for item in missing}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    price = future.result()
+                except Exception as e:
+                    failed.append((item, e))
+                    continue
+                item.auction_average_buy_price = price
+                cache.put(item.sb_id, price)
+                print(f"Fetched auction data for '{item.name}' (${item.auction_average_buy_price}) from cofl.net")
+        cache.save()
         
-        avg = int(total / len(data))
-        item.auction_average_buy_price = avg
+        if failed:
+            failed.sort(key=lambda failure: missing.index(failure[0]))
+            raise ValueError("Failed to fetch auction data for " + ", ".join(f"'{item.name}'" for item, _ in failed)) from failed[0][1]
+    
+    def attempt_fetch_auction_data(self, item: SBItem):
+        if item.auction_average_buy_price is not None:
+            return
+        assert item.bz_buy_price == None
         
-        print(f"Fetched auction data for '{item.name}' (${item.auction_average_buy_price}) from cofl.net")
+        self.fetch_auction_prices([item])
     
     
 
-# Example usage:
-skyblock_items = SkyblockItems()
-# item = skyblock_items.search_by_name("Farm Armor Chestplate")
-skyblock_items.export_to_json("data/sb_items.json")
\ No newline at end of file
+# ============== CLI ==============
+# cli.py fetch-prices (or running this file): a new snapshot and the bazaar items with their prices
+
+ITEMS_JSON_PATH = "data/sb_items.json"
+
+
+def add_fetch_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--directory", default=SNAPSHOT_DIR, help=f"where to save the snapshot (default: {SNAPSHOT_DIR})")
+    parser.add_argument("--items-json", default=ITEMS_JSON_PATH, help=f"also write the bazaar items and their prices here, '' for no (default: {ITEMS_JSON_PATH})")
+
+
+def fetch_prices(args: argparse.Namespace) -> SkyblockItems:
+    skyblock_items = SkyblockItems(snapshot=load_price_snapshot(fetch=True, directory=args.directory))
+    # item = skyblock_items.search_by_name("Farm Armor Chestplate")
+    if args.items_json:
+        skyblock_items.export_to_json(args.items_json)
+        print(f"Saved {len(skyblock_items.items)} items to {args.items_json}.")
+    return skyblock_items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and save a new price snapshot")
+    add_fetch_arguments(parser)
+    fetch_prices(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
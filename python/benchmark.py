@@ -0,0 +1,212 @@
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import simulate
+from loaded import run_loaded_minion
+from bazaar import PriceSnapshot, SkyblockItems
+from minion_data import MINIONS, STORAGES
+from simulate import MinionInventory, generate_configurations, result_values, save_results, simulate_shard, simulate_unloaded_minion_output, sweep_configurations, sweep_shards
+
+
+# Benchmarks of the simulator's hot paths, offline: prices come from the fixture in benchmark_fixture/
+# (a price snapshot and the auction prices), so results only change when the code does.
+# Results can be saved as a baseline (--save-baseline) and later runs are compared against it: anything
+# more than --threshold slower than the baseline is a regression (and the exit status is 1).
+# Timings are per machine, so the baseline isn't committed.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixture")
+BASELINE_PATH = "data/benchmark_baseline.json"
+
+
+def load_fixture_prices() -> SkyblockItems:
+    items = SkyblockItems(only_bazaar=False, snapshot=PriceSnapshot.load(os.path.join(FIXTURE_DIR, "snapshot.json.gz")))
+    with open(os.path.join(FIXTURE_DIR, "auction_prices.json")) as f:
+        for sb_id, price in json.load(f).items():
+            items.search_by_sb_id(sb_id).auction_average_buy_price = price
+    return items
+
+
+@dataclass
+class Benchmark:
+    run: Callable[[], object]
+    number: int = 1 # calls per round
+    ops: int = 1 # configurations, rows or inventory fills done by one call
+
+
+# ============== BENCHMARKS ==============
+# each of these does its setup and returns the Benchmark, so setup isn't timed (see BENCHMARKS)
+
+def bench_scalar_simulation() -> Benchmark:
+    # every 911th configuration of the sweep, so every minion, fuel and item is in there
+    sample = [configuration for id, configuration in sweep_configurations() if id % 911 == 0]
+    return Benchmark(lambda: [simulate_unloaded_minion_output(*configuration) for configuration in sample], ops=len(sample))
+
+
+# 124 days on a loaded island, for every 911th configuration of the sweep
+def bench_loaded_simulation() -> Benchmark:
+    setups = [simulate.setup_unloaded_minion_simulation(*configuration[:13]) for id, configuration in sweep_configurations() if id % 911 == 0]
+    return Benchmark(lambda: [run_loaded_minion(setup, 124 * 86400) for setup in setups], ops=len(setups))
+
+
+INVENTORY_SCENARIOS = {
+    # (slots, storage, items)
+    "partial": (15, None, [["Enchanted Clay", 100], ["Clay", 500]]),
+    "full": (15, None, [["Enchanted Clay", 640], ["Clay", 320]]),
+    "overflow": (15, STORAGES[-1], [["Enchanted Slimeball", 5000], ["Slimeball", 3000], ["Enchanted Slime Block", 700]]),
+}
+
+
+def bench_inventory(scenario: str) -> Callable[[], Benchmark]:
+    slots, storage, items = INVENTORY_SCENARIOS[scenario]
+    def setup() -> Benchmark:
+        return Benchmark(lambda: MinionInventory(slots, storage).put_items_in_inventory(items), number=2000)
+    return setup
+
+
+def bench_configurations() -> Benchmark:
+    count = sum(1 for minion in MINIONS for _ in generate_configurations(minion))
+    return Benchmark(lambda: sum(1 for minion in MINIONS for _ in generate_configurations(minion)), ops=count)
+
+
+# the shards of the first minion
+def _subset_shards() -> list:
+    return [shard for shard in sweep_shards() if shard.minion_index == 0]
+
+
+def bench_sweep_subset() -> Benchmark:
+    shards = _subset_shards()
+    rows = sum(len(simulate_shard(shard)) for shard in shards)
+    return Benchmark(lambda: [simulate_shard(shard) for shard in shards], ops=rows)
+
+
+def bench_db_write() -> Benchmark:
+    rows = [row for shard in _subset_shards() for row in result_values(simulate_shard(shard))]
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    results_path = os.path.join(directory, "results.db")
+    cache_path = os.path.join(directory, "cache.db")
+    def run():
+        for path in (results_path, cache_path):
+            if os.path.exists(path):
+                os.remove(path)
+        save_results(iter(rows), results_path, cache_path)
+    return Benchmark(run, ops=len(rows))
+
+
+BENCHMARKS: dict[str, Callable[[], Benchmark]] = {
+    "simulate_unloaded_minion_output": bench_scalar_simulation,
+    "run_loaded_minion (124 days)": bench_loaded_simulation,
+    "put_items_in_inventory (partial)": bench_inventory("partial"),
+    "put_items_in_inventory (full)": bench_inventory("full"),
+    "put_items_in_inventory (overflow)": bench_inventory("overflow"),
+    "generate_configurations": bench_configurations,
+    f"sweep ({simulate.SWEEP_MINIONS[0].name})": bench_sweep_subset,
+    f"save_results ({simulate.SWEEP_MINIONS[0].name})": bench_db_write,
+}
+
+
+# ============== RUNNING ==============
+
+def measure(benchmark: Benchmark, rounds: int) -> dict:
+    benchmark.run() # warm up (price vectors, compiled groups)
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(benchmark.number):
+            benchmark.run()
+        times.append((time.perf_counter() - start) / benchmark.number)
+    best = min(times)
+    return {"seconds": best, "median_seconds": statistics.median(times), "per_op_seconds": best / benchmark.ops, "ops": benchmark.ops, "rounds": rounds}
+
+
+def run_benchmarks(rounds: int, only: Optional[list[str]] = None) -> dict[str, dict]:
+    simulate.skyblock_items = load_fixture_prices()
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and not any(part in name for part in only):
+            continue
+        # save_results prints every chunk
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            results[name] = measure(setup(), rounds)
+        print(f"{name}: {format_seconds(results[name]['seconds'])}")
+    return results
+
+
+# names of the benchmarks that got slower than the baseline by more than threshold (0.2 = 20%)
+def regressions(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    return [name for name, result in results.items() if name in baseline and result["seconds"] > baseline[name]["seconds"] * (1 + threshold)]
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, factor in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= factor:
+            return f"{seconds / factor:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
+
+
+def format_report(results: dict[str, dict], baseline: Optional[dict[str, dict]], threshold: float) -> str:
+    slow = regressions(results, baseline or {}, threshold)
+    lines = [f"{'benchmark':<40} {'per call':>10} {'per op':>10} {'ops':>7} {'vs baseline':>12}"]
+    for name, result in results.items():
+        change = ""
+        if baseline and name in baseline:
+            change = f"{result['seconds'] / baseline[name]['seconds']:.2f}x"
+            if name in slow:
+                change += " SLOWER"
+        lines.append(f"{name:<40} {format_seconds(result['seconds']):>10} {format_seconds(result['per_op_seconds']):>10} {result['ops']:>7} {change:>12}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulator offline, against fixed prices")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per benchmark, the fastest counts (default: 5)")
+    parser.add_argument("--only", action="append", help="only benchmarks with this in their name (can be repeated)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline to compare against (default: {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="how much slower than the baseline is a regression (default: 0.2)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rounds, args.only)
+    report = {"created": time.time(), "python": sys.version.split()[0], "platform": platform.platform(), "results": results}
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print()
+    print(format_report(results, baseline, args.threshold))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved to {args.json}.")
+
+    if args.save_baseline:
+        if baseline:
+            # keep the benchmarks that weren't run this time
+            report["results"] = dict(baseline, **results)
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved baseline to {args.baseline}.")
+    elif baseline:
+        slow = regressions(results, baseline, args.threshold)
+        if slow:
+            raise SystemExit(f"{len(slow)} regression(s): {', '.join(slow)}")
+
+
+if __name__ == "__main__":
+    main()
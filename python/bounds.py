@@ -0,0 +1,157 @@
+import numpy as np
+
+from batch import batch_cost_of_fuel, batch_group_columns, batch_group_costs, batch_group_key, batch_item_drops, compile_batch_group
+from item_data import convert_to_compacted, convert_to_super_compacted, is_compactable, is_super_compactable
+from minion_data import STORAGES, MinionStorageType
+from pricing import PriceVectors
+from simulate import BEACON_PERCENT_BOOSTS, MinionHopperType, get_price_vectors
+
+
+# Upper bounds on the profit/APR columns, for skipping configurations that can't be among the best
+# without simulating them (see optimize.py). They're worked out from the batch engine's drops and costs
+# (batch.py) without filling any inventories.
+
+# profit/APR columns -> which inventory price they use (None: only the hopper counts)
+# yes, APR_if_inventory_sell_order_to_bz is worked out from the instant sell profit
+METRIC_INVENTORY_PRICES = {
+    "profit_24h_if_inventory_sell_order_to_bz": "order",
+    "profit_24h_if_inventory_instant_sold_to_bz": "instant",
+    "profit_24h_if_inventory_sold_to_npc": "npc",
+    "profit_24h_if_inventory_sold_optimally": "best",
+    "profit_24h_only_hopper": None,
+    "APR_if_inventory_sell_order_to_bz": "instant",
+    "APR_only_hopper": None,
+}
+
+
+# the most one of each item can be worth in the end: sold from the inventory or by the hopper, either as
+# itself or as its share of anything it can be compacted into. also the most one of each can be worth
+# only counting the hopper, and the most one stack of 64 in the inventory can be worth (a full inventory
+# passes everything else on to the hopper). inf if a price is missing (so nothing with it gets skipped,
+# and the simulation raises like it would without bounds)
+def _unit_value_bounds(prices: PriceVectors, items: list[str], inventory_price: None | str, hopper: None | MinionHopperType, compactor: bool, super_compactor: bool) -> tuple[list[float], list[float], float]:
+    values = []
+    hopper_values = []
+    stack_value = 0.0
+    for item in items:
+        value = 0.0
+        hopper_value = 0.0
+        forms = [(item, 1)]
+        while forms:
+            form, units = forms.pop()
+            inventory_value = 0.0
+            if inventory_price is not None:
+                inventory_value = float(prices.vector(inventory_price, [form])[0])
+            sold_value = 0.0
+            if hopper != None:
+                sold_value = float(prices.vector("npc", [form])[0]) * (hopper.sell_percentage / 100)
+            value = max(value, inventory_value / units, sold_value / units)
+            hopper_value = max(hopper_value, sold_value / units)
+            stack_value = max(stack_value, inventory_value * 64)
+            if np.isnan(inventory_value) or np.isnan(sold_value):
+                value = hopper_value = stack_value = np.inf
+    
+            if compactor and is_compactable(form):
+                compacted = convert_to_compacted(form)
+                forms.append((compacted.output_item, units * compacted.input_count))
+            if super_compactor and is_super_compactable(form):
+                super_compacted = convert_to_super_compacted(form)
+                forms.append((super_compacted.output_item, units * super_compacted.input_count))
+        values.append(value)
+        hopper_values.append(hopper_value)
+    return values, hopper_values, stack_value
+
+
+# what upper_bound_unloaded_minion_batch is worked out from, per configuration: the most its drops can be
+# worth, the cost of its fuel, its minion cost and how long it runs. money is inf for configurations the
+# batch engine doesn't model
+def _upper_bound_parts(configurations: list[tuple], metric: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    inventory_price = METRIC_INVENTORY_PRICES[metric]
+    
+    groups: dict[tuple, list[int]] = {}
+    for i, c in enumerate(configurations):
+        key = batch_group_key(c)
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(i)
+    
+    prices = get_price_vectors()
+    money = np.full(len(configurations), np.inf)
+    cost_of_fuel = np.zeros(len(configurations))
+    minion_cost_total = np.zeros(len(configurations))
+    seconds = np.array([c[13] for c in configurations], dtype=np.int64)
+    for indexes in groups.values():
+        minion, _, fuel, hopper, item_1, item_2 = configurations[indexes[0]][:6]
+        group = compile_batch_group(minion, fuel, item_1, item_2)
+        if group is None:
+            continue
+    
+        columns = batch_group_columns(minion, fuel, group, [configurations[i] for i in indexes])
+        item_drops = batch_item_drops(group, columns, np.arange(len(indexes)))
+        costs = batch_group_costs(minion, fuel, hopper, item_1, item_2, columns)
+        cost_of_fuel[indexes] = batch_cost_of_fuel(prices, columns.seconds, costs.fuel_used, columns.beacon_percent_boost, costs.crystal_cost_24hrs_per_minion)
+        minion_cost_total[indexes] = costs.minion_cost_recoverable + costs.minion_cost_non_recoverable
+    
+        compactor = item_1.name == "Compactor" or item_2.name == "Compactor"
+        super_compactor = any(item.name in ("Super Compactor 3000", "Dwarven Super Compactor 3000") for item in (item_1, item_2))
+        unit_values, hopper_values, stack_value = _unit_value_bounds(prices, list(item_drops), inventory_price, hopper, compactor, super_compactor)
+    
+        # every drop at its best, or a full inventory and every drop sold by the hopper
+        with np.errstate(invalid="ignore"):
+            group_money = np.zeros(len(indexes))
+            full_money = columns.inventory_slots * stack_value
+            for amount, unit_value, hopper_value in zip(item_drops.values(), unit_values, hopper_values):
+                group_money += np.where(amount > 0, amount * unit_value, 0)
+                full_money = full_money + np.where(amount > 0, amount * hopper_value, 0)
+        money[indexes] = np.minimum(group_money, full_money)
+    
+    return money, cost_of_fuel, minion_cost_total, seconds
+
+
+# the bound itself. for a single configuration both minion costs are its own, for a block the cheapest and
+# the dearest one (a negative profit is the highest APR with the highest cost)
+def _upper_bound(metric: str, money: np.ndarray, cost_of_fuel: np.ndarray, seconds: np.ndarray, lowest_minion_cost: np.ndarray, highest_minion_cost: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # room for rounding, the real total is summed up in a different order
+        money = money * (1 + 1e-9) + 1e-6
+        
+        bound = np.trunc(((money - cost_of_fuel) / seconds) * 86400)
+        if metric.startswith("APR"):
+            minion_cost_total = np.where(bound >= 0, lowest_minion_cost, highest_minion_cost)
+            bound = np.where(minion_cost_total > 0, np.trunc(((bound * 365) / minion_cost_total) * 100), np.inf)
+    return np.where(np.isnan(bound), np.inf, bound)
+
+
+# an upper bound on the metric column (a METRIC_INVENTORY_PRICES key) of each configuration, without
+# filling any inventories: every drop is valued at its _unit_value_bounds (the inventory can only hold,
+# compact or pass on to the hopper what was dropped), the costs are the real ones.
+# inf for configurations the batch engine doesn't model
+def upper_bound_unloaded_minion_batch(configurations: list[tuple], metric: str) -> np.ndarray:
+    money, cost_of_fuel, minion_cost_total, seconds = _upper_bound_parts(configurations, metric)
+    return _upper_bound(metric, money, cost_of_fuel, seconds, minion_cost_total, minion_cost_total)
+
+
+# the block of a configuration: the configurations that only differ from it by storage, upgrades and beacon
+def sweep_block_key(configuration: tuple) -> tuple:
+    return batch_group_key(configuration) + (configuration[1], configuration[13])
+
+
+# one upper bound for every configuration of each configuration's block (see sweep_block_key), from three
+# configurations instead of all of them: the fastest one (every upgrade and the strongest beacon, the most
+# drops), the cheapest one (nothing, the lowest fuel and minion cost) and the dearest one. the upgrades only
+# add speed and costs, so nothing in the block can beat its bound. looser than upper_bound_unloaded_minion_batch,
+# but most blocks are far enough off the best ones that it doesn't matter
+def upper_bound_unloaded_minion_blocks(configurations: list[tuple], metric: str) -> np.ndarray:
+    def variant(c: tuple, storage: None | MinionStorageType, upgrades: bool, beacon_percent_boost: int) -> tuple:
+        return c[:6] + (storage, upgrades, upgrades, upgrades, beacon_percent_boost) + c[11:]
+    
+    # all in one go, the variants of a configuration are in the same batch group
+    n = len(configurations)
+    strongest_beacon = max(BEACON_PERCENT_BOOSTS)
+    variants = [variant(c, None, False, 0) for c in configurations]
+    for storage in STORAGES:
+        variants += [variant(c, storage, True, strongest_beacon) for c in configurations]
+    money, cost_of_fuel, minion_cost_total, seconds = _upper_bound_parts(variants, metric)
+    
+    dearest = minion_cost_total[n:].reshape(len(STORAGES), n)
+    return _upper_bound(metric, money[n:].reshape(len(STORAGES), n).max(axis=0), cost_of_fuel[:n], seconds[:n], minion_cost_total[:n], dearest.max(axis=0))
@@ -0,0 +1,36 @@
+import argparse
+import importlib
+import sys
+from typing import Optional
+
+
+# One entry point for the scripts: python python/cli.py <command> [options]
+# Only the module of the command that runs gets imported (and its options are only known then), so
+# --help and a mistyped command don't load numpy, sqlalchemy or requests.
+
+# command -> (module, function adding its options, function running it, description)
+COMMANDS = {
+    "simulate": ("simulate", "add_sweep_arguments", "run", "simulate every minion combination, save the results db and the website's shards"),
+    "fetch-prices": ("bazaar", "add_fetch_arguments", "fetch_prices", "fetch and save a new price snapshot"),
+    "export": ("columnar", "add_export_arguments", "export", "write the website's sharded copy of a results db"),
+    "serve": ("service", "add_serve_arguments", "serve", "answer single setup simulations over local HTTP/JSON"),
+}
+
+
+def main(argv: Optional[list[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = "\n".join(f"  {name:<14} {command[3]}" for name, command in COMMANDS.items())
+    parser = argparse.ArgumentParser(prog="cli.py", description="Hypixel minion calculator", epilog=f"commands:\n{commands}\n\ncli.py <command> --help shows the options of a command", formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="one of: " + ", ".join(COMMANDS))
+    parser.add_argument("options", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module_name, add_arguments, run, description = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    command_parser = argparse.ArgumentParser(prog=f"cli.py {args.command}", description=description)
+    getattr(module, add_arguments)(command_parser)
+    getattr(module, run)(command_parser.parse_args(args.options))
+
+
+if __name__ == "__main__":
+    main()
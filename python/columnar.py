@@ -0,0 +1,308 @@
+import argparse
+import heapq
+from itertools import islice
+import json
+import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+from sqlalchemy import Boolean, Integer, Table
+
+from results_db import count_results, read_results, shard_keys
+
+
+# Compact columnar copy of a results table, for the website (columnar.js reads it) and for scripts.
+# sql.js has to download the whole sqlite file and every row there stores every value (and the
+# same few minion/fuel/item names) again, so instead every column is stored once as a block:
+#   strings and low cardinality numbers: a dictionary + the narrowest index per row
+#   booleans: one bit per row
+#   everything else: the narrowest numeric type that fits
+#   a column that has one value (the trimmed item columns) or counts up (id): no block at all
+#
+# File layout (all little endian):
+#   8 bytes magic, uint32 header length, header json, padding, blocks
+# the header has the row count and per column its encoding, type and where its block starts.
+# Every block starts at a multiple of 8 so the browser can view them as typed arrays without copying.
+#
+# The website gets the results sharded (export_sharded): one such file per minion and timescale, and a
+# manifest.json listing them, so it only downloads the shards its filters need.
+
+MAGIC = b"MSRCOL\x00\x01"
+ALIGNMENT = 8
+# rows are turned into columns this many at a time
+CHUNK_SIZE = 5000
+
+INTEGER_TYPES = ["uint8", "int8", "uint16", "int16", "uint32", "int32", "int64"]
+INDEX_TYPES = ["uint8", "uint16", "uint32"]
+
+
+def _narrowest_type(values: np.ndarray, types: list[str]) -> str:
+    if len(values) == 0:
+        return types[0]
+    low, high = values.min(), values.max()
+    for name in types:
+        info = np.iinfo(name)
+        if info.min <= low and high <= info.max:
+            return name
+    raise ValueError(f"Values from {low} to {high} don't fit any of {types}")
+
+
+class _BlockWriter:
+    def __init__(self):
+        self.blocks: list[bytes] = []
+        self.size = 0
+
+    def add(self, array: np.ndarray) -> int:
+        offset = self.size
+        data = array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes()
+        data += b"\x00" * (-len(data) % ALIGNMENT)
+        self.blocks.append(data)
+        self.size += len(data)
+        return offset
+
+
+def _encode_numbers(blocks: _BlockWriter, values: np.ndarray) -> dict:
+    if len(values) and (values == values[0]).all():
+        return {"encoding": "constant", "value": values[0].item()}
+    if values.dtype.kind == "i" and len(values) and (values == values[0] + np.arange(len(values))).all():
+        return {"encoding": "sequence", "start": int(values[0])}
+
+    if values.dtype.kind == "f":
+        plain_type = "float64"
+    else:
+        plain_type = _narrowest_type(values, INTEGER_TYPES)
+    plain_bytes = np.dtype(plain_type).itemsize * len(values)
+
+    dictionary, indexes = np.unique(values, return_inverse=True)
+    index_type = _narrowest_type(indexes, INDEX_TYPES)
+    dictionary_type = plain_type if values.dtype.kind == "f" else _narrowest_type(dictionary, INTEGER_TYPES)
+    dictionary_bytes = np.dtype(index_type).itemsize * len(values) + np.dtype(dictionary_type).itemsize * len(dictionary)
+
+    if dictionary_bytes < plain_bytes:
+        return {
+            "encoding": "dictionary",
+            "type": index_type,
+            "offset": blocks.add(indexes.astype(index_type)),
+            "dictionary": {"type": dictionary_type, "offset": blocks.add(dictionary.astype(dictionary_type)), "length": len(dictionary)},
+        }
+    return {"encoding": "plain", "type": plain_type, "offset": blocks.add(values.astype(plain_type))}
+
+
+# strings, or anything with a None in it. the dictionary goes into the header
+def _encode_values(blocks: _BlockWriter, indexes: np.ndarray, dictionary: list) -> dict:
+    if len(dictionary) == 1:
+        return {"encoding": "constant", "value": dictionary[0]}
+    index_type = _narrowest_type(indexes, INDEX_TYPES)
+    return {"encoding": "dictionary", "type": index_type, "offset": blocks.add(indexes.astype(index_type)), "values": dictionary}
+
+
+# one column of write_columnar, collected a chunk of rows at a time as arrays instead of a list of every value.
+# a column turns into indexes into a dictionary of its values as soon as it has a None in it (or if it isn't
+# a bool or an int column to begin with)
+class _ColumnBuilder:
+    def __init__(self, column_type):
+        self.column_type = column_type
+        self.dictionary: Optional[dict] = None if isinstance(column_type, (Boolean, Integer)) else {}
+        self.floats = False
+        self.chunks: list[np.ndarray] = []
+
+    def add(self, values: list):
+        if self.dictionary is None and any(value is None for value in values):
+            self.dictionary = {}
+            self.chunks = [self._indexes(chunk.tolist()) for chunk in self.chunks]
+        if self.dictionary is not None:
+            self.chunks.append(self._indexes(values))
+        elif isinstance(self.column_type, Boolean):
+            self.chunks.append(np.array(values, dtype=bool))
+        # percentage_boost is declared an int but is a float for the multiplying items
+        elif self.floats or any(isinstance(value, float) for value in values):
+            self.floats = True
+            self.chunks.append(np.array(values, dtype=np.float64))
+        else:
+            self.chunks.append(np.array(values, dtype=np.int64))
+
+    def _indexes(self, values: list) -> np.ndarray:
+        return np.array([self.dictionary.setdefault(value, len(self.dictionary)) for value in values], dtype=np.int64)
+
+    def encode(self, blocks: _BlockWriter) -> dict:
+        values = np.concatenate(self.chunks) if self.chunks else np.array([], dtype=np.int64)
+        if self.dictionary is not None:
+            return _encode_values(blocks, values, list(self.dictionary))
+
+        if isinstance(self.column_type, Boolean):
+            if len(values) and (values == values[0]).all():
+                return {"encoding": "constant", "value": bool(values[0])}
+            return {"encoding": "bitmap", "offset": blocks.add(np.packbits(values, bitorder="little"))}
+        return _encode_numbers(blocks, values.astype(np.float64) if self.floats else values)
+
+
+# rows are dicts of column -> value, like BulkResultWriter takes. returns the file size
+def write_columnar(path: str, table: Table, rows: Iterator[dict]) -> int:
+    columns = {column.name: _ColumnBuilder(column.type) for column in table.columns}
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        for name, column in columns.items():
+            column.add([row[name] for row in chunk])
+        count += len(chunk)
+
+    blocks = _BlockWriter()
+    specs = []
+    for column in table.columns:
+        spec = {"name": column.name}
+        spec.update(columns[column.name].encode(blocks))
+        specs.append(spec)
+
+    header = json.dumps({"table": table.name, "rows": count, "columns": specs}, separators=(",", ":")).encode()
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for block in blocks.blocks:
+            f.write(block)
+    return len(MAGIC) + 4 + len(header) + blocks.size
+
+
+def export_columnar(results_path: str, table: Table, path: str) -> int:
+    return write_columnar(path, table, read_results(results_path, table))
+
+
+MANIFEST = "manifest.json"
+
+
+# one file per value of the shard_by columns, and the summary tables (results_db.SummaryTable.schema) as
+# one file each. directory is emptied of earlier shards first. returns the manifest.
+# keys: only these shard_by values changed (a refreshed part of the sweep), so only their shards are
+# written again, if the manifest there already has them all
+def export_sharded(results_path: str, table: Table, directory: str, shard_by: list[str], summaries: Optional[list[Table]] = None, keys: Optional[set[tuple]] = None) -> dict:
+    if keys is not None:
+        manifest = _update_shards(results_path, table, directory, shard_by, summaries, keys)
+        if manifest is not None:
+            return manifest
+    
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".col") or name == MANIFEST:
+            os.remove(os.path.join(directory, name))
+
+    # one shard at a time, streamed out of the db, so only one shard is ever held in memory
+    keys = shard_keys(results_path, table, shard_by)
+    manifest = {"table": table.name, "rows": sum(rows for _, rows in keys), "shard_by": shard_by, "shards": [], "summaries": {}}
+    for i, (key, rows) in enumerate(keys):
+        file = f"shard_{i:03}.col"
+        size = write_columnar(os.path.join(directory, file), table, read_results(results_path, table, where=dict(zip(shard_by, key))))
+        manifest["shards"].append({"key": dict(zip(shard_by, key)), "file": file, "rows": rows, "bytes": size})
+    _write_summaries(results_path, directory, summaries, manifest)
+    return manifest
+
+
+def _write_summaries(results_path: str, directory: str, summaries: Optional[list[Table]], manifest: dict):
+    for summary in summaries or []:
+        file = f"{summary.name}.col"
+        size = export_columnar(results_path, summary, os.path.join(directory, file))
+        manifest["summaries"][summary.name] = {"file": file, "bytes": size}
+
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+
+# export_sharded's keys. None if there's no manifest to update, or it is missing some of the keys
+def _update_shards(results_path: str, table: Table, directory: str, shard_by: list[str], summaries: Optional[list[Table]], keys: set[tuple]) -> Optional[dict]:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["shard_by"] != shard_by:
+        return None
+    shards = {tuple(shard["key"][column] for column in shard_by): shard for shard in manifest["shards"]}
+    if not keys <= set(shards):
+        return None
+
+    for key in keys:
+        shard = shards[key]
+        where = dict(zip(shard_by, key))
+        shard["rows"] = count_results(results_path, table, where)
+        shard["bytes"] = write_columnar(os.path.join(directory, shard["file"]), table, read_results(results_path, table, where=where))
+    manifest["rows"] = sum(shard["rows"] for shard in manifest["shards"])
+    _write_summaries(results_path, directory, summaries, manifest)
+    return manifest
+
+
+def read_columnar_header(data: bytes) -> tuple[dict, int]:
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a columnar results file (or a different version)")
+    header_length, = struct.unpack_from("<I", data, len(MAGIC))
+    start = len(MAGIC) + 4
+    return json.loads(data[start:start + header_length]), start + header_length
+
+
+def _decode_column(data: bytes, start: int, rows: int, spec: dict) -> np.ndarray:
+    encoding = spec["encoding"]
+    if encoding == "constant":
+        value = spec["value"]
+        return np.full(rows, value, dtype=object if value is None or isinstance(value, str) else None)
+    if encoding == "sequence":
+        return np.arange(spec["start"], spec["start"] + rows, dtype=np.int64)
+    if encoding == "bitmap":
+        return np.unpackbits(np.frombuffer(data, np.uint8, (rows + 7) // 8, start + spec["offset"]), count=rows, bitorder="little").astype(bool)
+
+    values = np.frombuffer(data, np.dtype(spec["type"]).newbyteorder("<"), rows, start + spec["offset"])
+    if encoding == "plain":
+        return values
+    if "values" in spec:
+        return np.array(spec["values"], dtype=object)[values]
+    dictionary = spec["dictionary"]
+    return np.frombuffer(data, np.dtype(dictionary["type"]).newbyteorder("<"), dictionary["length"], start + dictionary["offset"])[values]
+
+
+# column -> array of every row (strings and None as object arrays)
+def read_columnar(path: str) -> dict[str, np.ndarray]:
+    with open(path, "rb") as f:
+        data = f.read()
+    header, start = read_columnar_header(data)
+    return {spec["name"]: _decode_column(data, start, header["rows"], spec) for spec in header["columns"]}
+
+
+# row dicts with plain python values, like read_results gives
+def read_columnar_rows(path: str) -> Iterator[dict]:
+    columns = {name: values.tolist() for name, values in read_columnar(path).items()}
+    for row in zip(*columns.values()):
+        yield dict(zip(columns, row))
+
+
+# every row of a sharded export, in id order
+def read_sharded_rows(directory: str) -> Iterator[dict]:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    return heapq.merge(*(read_columnar_rows(os.path.join(directory, shard["file"])) for shard in manifest["shards"]), key=lambda row: row["id"])
+
+
+# the options of cli.py export (and of running this file)
+def add_export_arguments(parser: argparse.ArgumentParser):
+    from simulate import RESULTS_DB_PATH, SHARD_DIR
+
+    parser.add_argument("--db", default=RESULTS_DB_PATH, help=f"results database (default: {RESULTS_DB_PATH})")
+    parser.add_argument("--out", default=SHARD_DIR, help=f"directory for the shards (default: {SHARD_DIR})")
+
+
+def export(args: argparse.Namespace):
+    from simulate import export_web_data
+
+    export_web_data(args.db, args.out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the sharded columnar copy of a results database (what the website loads)")
+    add_export_arguments(parser)
+    export(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+from dataclasses import dataclass
+from math import ceil, floor
+from typing import Optional
+
+from item_data import COMPACTOR_MAP, SUPER_COMPACTOR_MAP, ItemCompactor, convert_to_smelted, is_smeltable
+from minion_data import MinionBase, MinionFuelType, MinionItemType, MinionStorageType
+from simulate import MinionHopperType, MinionSimulationOutput, UnloadedMinionSimulationSetup, fuel_effect, price_unloaded_minion_output, setup_unloaded_minion_simulation
+
+
+# The minion while its island is LOADED (you're standing next to it, or on a co-op member's loaded island).
+# Unlike the unloaded calculation, which works out the drops for the whole duration and then puts them in
+# the inventory all at once, this goes harvest by harvest (one spawn + one harvest action, a "cycle"):
+# - the drops of a harvest go into the inventory one item at a time, in the order the minion drops them
+# - a compactor works as soon as there's enough of an item, so compacted items show up when they're made
+# - corrupt soil gives one Corrupted Fragment and one Sulphur per kill whatever the fuel (the catalyst
+#   only multiplies them while unloaded)
+# - pet and crystal bonuses work
+# - when something doesn't fit, a hopper sells it and the minion keeps going; without a hopper it stops
+# Drops are the expected amounts (like the unloaded calculation), rounded down as they add up.
+#
+# A 124 day run is hundreds of thousands of harvests, so it doesn't go through them one by one. Between the
+# events that change anything (the fuel running out, an item getting compacted, the inventory filling up)
+# every harvest adds the same amounts, so it jumps straight to the next event: as many harvests as can't
+# possibly overflow the inventory are added in one go, and only harvests that might not fit are stepped
+# through. Once nothing fits anymore, the rest of the run goes to the hopper in one go as well.
+# The cost is O(events), not O(harvests).
+
+
+def _item_names(setup: UnloadedMinionSimulationSetup) -> set[str]:
+    return {item.name for item in (setup.item_1, setup.item_2) if item}
+
+
+# item -> what it gets compacted into
+def compaction_recipes(setup: UnloadedMinionSimulationSetup) -> dict[str, ItemCompactor]:
+    names = _item_names(setup)
+    recipes: dict[str, ItemCompactor] = {}
+    if "Compactor" in names:
+        recipes.update(COMPACTOR_MAP)
+    # a super compactor takes over the items both of them compact
+    if names & {"Super Compactor 3000", "Dwarven Super Compactor 3000"}:
+        recipes.update(SUPER_COMPACTOR_MAP)
+    return recipes
+
+
+# item -> expected amount per harvest, in the order they go into the inventory
+def harvest_drops(setup: UnloadedMinionSimulationSetup, multiplier: int, seconds_per_harvest: float) -> dict[str, float]:
+    minion = setup.minion
+    names = _item_names(setup)
+    smelt = "Auto Smelter" in names or "Dwarven Super Compactor" in names
+    drops: dict[str, float] = {}
+    for item, amount in minion.profile.drops_per_cycle:
+        if smelt and is_smeltable(item):
+            item = convert_to_smelted(item)
+        drops[item] = drops.get(item, 0) + amount * multiplier
+    minion_drops = sum(drops.values())
+
+    if "Corrupt Soil" in names and minion.profile.has_drops:
+        for item in ["Corrupted Fragment", "Sulphur"]:
+            drops[item] = drops.get(item, 0) + 1
+    if "Diamond Spreading" in names:
+        # one diamond for every 10 items the minion makes
+        drops["Diamond"] = drops.get("Diamond", 0) + minion_drops / 10
+    # the ones that come every few minutes (berberis, soulflow), as their share of a harvest
+    for item, per_day in setup.outputs_per_day.items():
+        drops[item] = drops.get(item, 0) + per_day * seconds_per_harvest / 86400
+    return drops
+
+
+# the inventory as item -> amount: every item takes as many slots as its stacks of 64 need
+class LoadedInventory:
+    def __init__(self, slots: int, recipes: dict[str, ItemCompactor]):
+        self.slots = slots
+        self.recipes = recipes
+        self.amounts: dict[str, int] = {}
+        self.used = 0 # slots
+
+    # how many more of item fit: the rest of its last stack and the empty slots
+    def space(self, item: str) -> int:
+        return -self.amounts.get(item, 0) % 64 + 64 * (self.slots - self.used)
+
+    # puts in as many as fit, one at a time, compacting whenever there's enough. returns how many didn't fit
+    def put(self, item: str, amount: int) -> int:
+        recipe = self.recipes.get(item)
+        count = self.amounts.get(item, 0)
+        while amount > 0:
+            take = min(amount, self.space(item))
+            if recipe:
+                take = min(take, recipe.input_count - count)
+            if take == 0:
+                break
+            self.used += ceil((count + take) / 64) - ceil(count / 64)
+            count += take
+            amount -= take
+            self.amounts[item] = count
+            if recipe and count == recipe.input_count:
+                # this empties at least one slot, so what it makes always fits
+                self.used -= ceil(count / 64)
+                count = 0
+                self.amounts[item] = 0
+                self.put(recipe.output_item, 1)
+        return amount
+
+    # the inventory after adding these amounts with nothing overflowing, without changing this one:
+    # (amounts, slots used then, the most slots it can have used on the way there)
+    def after(self, added: dict[str, int]) -> tuple[dict[str, int], int, int]:
+        amounts = dict(self.amounts)
+        for item, amount in added.items():
+            amounts[item] = amounts.get(item, 0) + amount
+        compacted = set()
+        pending = list(added)
+        for item in pending: # grows while compacting makes more items
+            recipe = self.recipes.get(item)
+            if recipe and amounts[item] >= recipe.input_count:
+                made, amounts[item] = divmod(amounts[item], recipe.input_count)
+                amounts[recipe.output_item] = amounts.get(recipe.output_item, 0) + made
+                compacted.add(item)
+                pending.append(recipe.output_item)
+        used, most = 0, 0
+        for item, count in amounts.items():
+            slots = ceil(count / 64)
+            used += slots
+            # anything that didn't get compacted only went up, a compacted item was at most a full batch
+            most += ceil(self.recipes[item].input_count / 64) if item in compacted else slots
+        return amounts, used, most
+
+    def items(self) -> dict[str, int]:
+        return {item: count for item, count in self.amounts.items() if count}
+
+
+# what happened during a loaded run, before anything is priced
+@dataclass
+class LoadedMinionRun:
+    seconds: int
+    harvests: int
+    events: int # jumps and single harvests it took
+    minion_speed_percentage: float
+    raw_item_drops: dict[str, int]
+    inventory_items: dict[str, int]
+    not_put_in_inventory: dict[str, int]
+    inventory_full: bool
+    inventory_full_after_seconds: Optional[float] # when the first item didn't fit
+    fuel_runs_out: bool
+    stopped: bool # full without a hopper, so the minion stopped
+
+
+# (seconds, speed percentage, drop multiplier) for the time with fuel and the time after it ran out
+def _fuel_periods(setup: UnloadedMinionSimulationSetup, seconds: int) -> list[tuple[float, float, int]]:
+    boost, multiplier = fuel_effect(setup.minion, setup.fuel)
+    speed = setup.minion_speed_percentage
+    fuel = setup.fuel
+    # ASSUMPTION: you always put in 64 fuel at a time
+    if fuel and fuel.duration_hours and seconds > fuel.duration_hours * 60*60 * 64:
+        fuel_seconds = fuel.duration_hours * 60*60 * 64
+        return [(fuel_seconds, speed, multiplier), (seconds - fuel_seconds, speed - boost, 1)]
+    return [(seconds, speed, multiplier)]
+
+
+# skip_events=False goes through every harvest one at a time (same results, for checking)
+def run_loaded_minion(setup: UnloadedMinionSimulationSetup, seconds: int, skip_events: bool = True) -> LoadedMinionRun:
+    slots = setup.minion.profile.inventory_slots[setup.minion_level-1] + (setup.storage.inventory_slots if setup.storage else 0)
+    inventory = LoadedInventory(slots, compaction_recipes(setup))
+    produced: dict[str, int] = {}
+    overflow: dict[str, int] = {}
+    carry: dict[str, float] = {} # what's left of each expected amount after rounding down
+    harvests, events = 0, 0
+    full_after = None
+    stopped = False
+    start = 0.0
+
+    periods = _fuel_periods(setup, seconds)
+    for period_seconds, speed, multiplier in periods:
+        seconds_per_harvest = setup.seconds_per_cycle / (speed/100)
+        period_harvests = floor(period_seconds / seconds_per_harvest)
+        rates = harvest_drops(setup, multiplier, seconds_per_harvest)
+        base = {item: carry.get(item, 0.0) for item in rates}
+
+        # how many of each item the first h harvests of this period drop
+        def dropped(h: int) -> dict[str, int]:
+            return {item: floor(base[item] + h*rate) - floor(base[item]) for item, rate in rates.items()}
+
+        def add(totals: dict[str, int], amounts: dict[str, int]):
+            for item, amount in amounts.items():
+                if amount:
+                    totals[item] = totals.get(item, 0) + amount
+
+        # the most harvests from h on that surely all fit: the most slots the inventory can have used on the way fits.
+        # that's exact while nothing gets compacted (everything only goes up), so this only stops short of a full
+        # inventory at a compaction, and those harvests get stepped through
+        def harvests_that_fit(h: int) -> int:
+            so_far = dropped(h)
+            def fits(n: int) -> bool:
+                return inventory.after({item: amount - so_far[item] for item, amount in dropped(h + n).items()})[2] <= slots
+            low, high = 0, 1
+            while high <= period_harvests - h and fits(high):
+                low, high = high, high * 2
+            high = min(high, period_harvests - h + 1)
+            while high - low > 1:
+                middle = (low + high) // 2
+                if fits(middle):
+                    low = middle
+                else:
+                    high = middle
+            return low
+
+        h = 0
+        while h < period_harvests and not stopped:
+            if skip_events and full_after is not None and all(inventory.space(item) == 0 for item in rates):
+                # nothing fits anymore and nothing can change that, the rest goes straight to the hopper
+                rest = {item: amount - done for (item, amount), done in zip(dropped(period_harvests).items(), dropped(h).values())}
+                add(produced, rest)
+                add(overflow, rest)
+                h = period_harvests
+                events += 1
+                break
+
+            n = harvests_that_fit(h) if skip_events else 0
+            if n:
+                so_far = dropped(h)
+                added = {item: amount - so_far[item] for item, amount in dropped(h + n).items()}
+                inventory.amounts, inventory.used, _ = inventory.after(added)
+                add(produced, added)
+                h += n
+                events += 1
+                continue
+
+            # a harvest that might not fit
+            so_far = dropped(h)
+            drops = {item: amount - so_far[item] for item, amount in dropped(h + 1).items()}
+            add(produced, drops)
+            h += 1
+            events += 1
+            for item, amount in drops.items():
+                left = inventory.put(item, amount) if amount else 0
+                if left:
+                    overflow[item] = overflow.get(item, 0) + left
+                    if full_after is None:
+                        full_after = start + h*seconds_per_harvest
+            if full_after is not None and setup.hopper is None:
+                stopped = True
+
+        harvests += h
+        start += period_seconds
+        carry = {item: base[item] + h*rate - floor(base[item] + h*rate) for item, rate in rates.items()}
+
+    fuel = setup.fuel
+    return LoadedMinionRun(
+        seconds=seconds,
+        harvests=harvests,
+        events=events,
+        minion_speed_percentage=periods[-1][1],
+        raw_item_drops=produced,
+        inventory_items=inventory.items(),
+        not_put_in_inventory=overflow,
+        inventory_full=full_after is not None,
+        inventory_full_after_seconds=full_after,
+        fuel_runs_out=fuel is None or len(periods) > 1,
+        stopped=stopped,
+    )
+
+
+# same prices and output as the unloaded calculation
+# seconds_until_full is when the first item didn't fit during this run (None if everything did)
+def price_loaded_minion_run(setup: UnloadedMinionSimulationSetup, run: LoadedMinionRun) -> MinionSimulationOutput:
+    output = price_unloaded_minion_output(setup.costs, setup.fuel, setup.hopper, setup.beacon_percent_boost, run.seconds, run.minion_speed_percentage, run.raw_item_drops, run.inventory_items, run.not_put_in_inventory, run.inventory_full, run.fuel_runs_out)
+    output.seconds_until_full = None if run.inventory_full_after_seconds is None else ceil(run.inventory_full_after_seconds)
+    return output
+
+
+def simulate_loaded_minion_setup(setup: UnloadedMinionSimulationSetup, seconds: int) -> MinionSimulationOutput:
+    return price_loaded_minion_run(setup, run_loaded_minion(setup, seconds))
+
+
+# same arguments as simulate_unloaded_minion_output (the pet and crystal bonuses do something here)
+def simulate_loaded_minion_output(minion: MinionBase, minion_level: int, fuel: None | MinionFuelType, hopper: None | MinionHopperType, item_1:None | MinionItemType, item_2:None | MinionItemType, storage: None | MinionStorageType, mithril_infusion: bool, free_will: bool, postcard:bool, beacon_percent_boost: int, pet_bonus_percent: int, crystal_bonus_percent: int, seconds: int) -> MinionSimulationOutput:
+    setup = setup_unloaded_minion_simulation(minion, minion_level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent)
+    return simulate_loaded_minion_setup(setup, seconds)
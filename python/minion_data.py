@@ -161,6 +161,57 @@ class MinionAction:
     drops: None | list[MinionDrop]
 
     
+# What the simulators need from a MinionBase, worked out once when the minion is made
+# (instead of walking the actions and level list for every simulated configuration).
+# Per level tuples are indexed by level-1.
+@dataclass(frozen=True, slots=True)
+class MinionProfile:
+    name: str
+    skill_type: str
+    # drops per cycle before any upgrades, in the order the actions list them
+    drops_per_cycle: tuple[tuple[str, float], ...]
+    has_drops: bool
+    seconds_per_action: tuple[int, ...]
+    inventory_slots: tuple[int, ...]
+    # (item, amount) that go into crafting each level, without the ones that are worth nothing
+    level_items: tuple[tuple[tuple[str, int], ...], ...]
+    
+    @staticmethod
+    def compile(minion: "MinionBase") -> "MinionProfile":
+        drops_per_cycle: dict[str, float] = {}
+        for action in minion.actions:
+            if action.drops:
+                for drop in action.drops:
+                    if drop.item not in drops_per_cycle:
+                        drops_per_cycle[drop.item] = 0
+                    drops_per_cycle[drop.item] += drop.amount * (drop.percentage/100)
+        
+        return MinionProfile(
+            name=minion.name,
+            skill_type=minion.skill_type,
+            drops_per_cycle=tuple(drops_per_cycle.items()),
+            has_drops=any(action.drops for action in minion.actions),
+            seconds_per_action=tuple(level.seconds_per_action for level in minion.levels),
+            inventory_slots=tuple(level.inventory_slots for level in minion.levels),
+            # technically pelt has value but its whatever
+            level_items=tuple(
+                tuple((item, amount) for item, amount in level.items.items() if "Wooden" not in item and "Pelts" not in item)
+                for level in minion.levels
+            ),
+        )
+    
+    # cost of crafting the minion up to each level at the given prices, costs[level] (costs[0] is 0)
+    # it's a running total so every level is the same sum the one-level-at-a-time version makes
+    def cumulative_level_costs(self, skyblock_items: SkyblockItems) -> tuple[float, ...]:
+        costs = [0]
+        cost = 0
+        for items in self.level_items:
+            for item, amount in items:
+                cost += skyblock_items.search_by_name(item).bz_sell_price * amount
+            costs.append(cost)
+        return tuple(costs)
+
+    
 class MinionBase:
     def __init__(self, name, skill_type, crystal_bonus_percentage:int, max_pet_bonus_percentage:int, non_minion_spawning_exists, non_minion_harvest_exists, levels:list[MinionLevelCost], actions:list[MinionAction]):
         self.name = name
@@ -175,23 +226,21 @@ class MinionBase:
         self.levels:list[MLC] = levels
         self.actions:list[MinionAction] = actions
         
-        self.__cumulative_level_costs = {}
+        self.profile = MinionProfile.compile(self)
+        
+        # (prices they were worked out with, costs)
+        self.__cumulative_level_costs: tuple[SkyblockItems, tuple[float, ...]] = (None, ())
+    
+    # all levels at once, redone when the prices change
+    def get_all_cumulative_level_costs(self, skyblock_items: SkyblockItems) -> tuple[float, ...]:
+        prices, costs = self.__cumulative_level_costs
+        if prices is not skyblock_items:
+            costs = self.profile.cumulative_level_costs(skyblock_items)
+            self.__cumulative_level_costs = (skyblock_items, costs)
+        return costs
         
     def get_cumulative_level_costs(self, level:int, skyblock_items: SkyblockItems):
-        if level not in self.__cumulative_level_costs:
-            cost = 0
-            for minion_level_info_object in self.levels[:level]:
-                
-                for item, amount in minion_level_info_object.items.items():
-                    if "Wooden" in item or "Pelts" in item:  
-                        # technically pelt has value but its whatever
-                        continue
-                    sb_item = skyblock_items.search_by_name(item)
-                    cost += sb_item.bz_sell_price * amount
-                        
-            self.__cumulative_level_costs[level] = cost
-            
-        return self.__cumulative_level_costs[level]
+        return self.get_all_cumulative_level_costs(skyblock_items)[level]
 
 
 ISLAND_MODIFIERS = ["Derpy", "Postcard", "Beacon"]
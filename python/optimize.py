@@ -0,0 +1,152 @@
+import argparse
+import heapq
+import json
+from typing import Optional
+
+from batch import simulate_unloaded_minion_output_batch
+from bounds import METRIC_INVENTORY_PRICES, sweep_block_key, upper_bound_unloaded_minion_blocks
+from simulate import SweepSpec, add_price_arguments, load_prices, simulation_result_row, sweep_configurations
+
+
+# Top-k mode: the best k configurations per (minion, seconds) by one of the profit/APR columns, without
+# simulating and storing the whole sweep.
+# Every block of configurations (same minion, level, fuel, hopper, items and seconds, see sweep_block_key)
+# gets one upper bound first, worked out from three of its configurations (see
+# upper_bound_unloaded_minion_blocks). Blocks are then simulated best bound first, in rounds (one
+# simulate_unloaded_minion_output_batch call each), and a block whose bound is below the k-th best value
+# found so far for its (minion, seconds) is skipped: nothing in it can make the top k.
+# Ties are broken by sweep row id (lower first), and only blocks that are strictly worse get skipped, so
+# the result is exactly brute_force_top_k's (--check compares the two).
+
+
+def _bucket(configuration: tuple) -> tuple[str, int]:
+    return configuration[0].name, configuration[13]
+
+
+# bucket -> [(id, configuration)], best first
+def _ranked(heaps: dict[tuple[str, int], list]) -> dict[tuple[str, int], list[tuple[int, tuple]]]:
+    return {bucket: [(-negative_id, configuration) for _, negative_id, configuration in sorted(heap, reverse=True)] for bucket, heap in sorted(heaps.items())}
+
+
+def _push(heap: list, k: int, value: int, id: int, configuration: tuple):
+    # min-heap of the best k as (value, -id): heap[0] is the k-th best
+    entry = (value, -id, configuration)
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, entry)
+
+
+def top_k(k: int, metric: str, minion_names: Optional[list[str]] = None) -> tuple[dict[tuple[str, int], list[tuple[int, tuple]]], int, int]:
+    blocks: dict[tuple, list[tuple[int, tuple]]] = {}
+    total = 0
+    for id, configuration in sweep_configurations(SweepSpec(minions=minion_names)):
+        key = sweep_block_key(configuration)
+        if key not in blocks:
+            blocks[key] = []
+        blocks[key].append((id, configuration))
+        total += 1
+    
+    members = list(blocks.values())
+    bounds = upper_bound_unloaded_minion_blocks([block[0][1] for block in members], metric).tolist()
+    
+    # every configuration of a block is in the same (minion, seconds)
+    buckets: dict[tuple[str, int], list[tuple[float, list]]] = {}
+    # worst first, so the best one is popped off the end
+    for bound, block in sorted(zip(bounds, members), key=lambda entry: entry[0]):
+        buckets.setdefault(_bucket(block[0][1]), []).append((bound, block))
+    
+    heaps: dict[tuple[str, int], list] = {bucket: [] for bucket in buckets}
+    
+    def simulate(chosen: list[tuple[int, tuple]]):
+        if not chosen:
+            return
+        batch = simulate_unloaded_minion_output_batch([c for _, c in chosen])
+        for (id, configuration), value in zip(chosen, batch.outputs[metric].tolist()):
+            _push(heaps[_bucket(configuration)], k, value, id, configuration)
+    
+    # rounds of up to 1, 2, 4, ... more blocks per (minion, seconds), as long as their bound is still good
+    # enough. the k-th best only goes up, so a (minion, seconds) that had nothing left to simulate is done
+    simulated = 0
+    per_round = 1
+    while buckets:
+        chosen = []
+        for bucket, bucket_blocks in list(buckets.items()):
+            heap = heaps[bucket]
+            taken = 0
+            while bucket_blocks and taken < per_round and (len(heap) < k or bucket_blocks[-1][0] >= heap[0][0]):
+                chosen.extend(bucket_blocks.pop()[1])
+                taken += 1
+            if not bucket_blocks or taken == 0:
+                del buckets[bucket]
+        simulate(chosen)
+        simulated += len(chosen)
+        per_round *= 2
+    
+    return _ranked(heaps), simulated, total
+
+
+# everything simulated and sorted
+def brute_force_top_k(k: int, metric: str, minion_names: Optional[list[str]] = None) -> dict[tuple[str, int], list[tuple[int, tuple]]]:
+    members = list(sweep_configurations(SweepSpec(minions=minion_names)))
+    batch = simulate_unloaded_minion_output_batch([c for _, c in members])
+    heaps: dict[tuple[str, int], list] = {}
+    for (id, configuration), value in zip(members, batch.outputs[metric].tolist()):
+        _push(heaps.setdefault(_bucket(configuration), []), k, value, id, configuration)
+    return _ranked(heaps)
+
+
+# full result rows (like the ones in the database) of the ranked configurations
+def ranked_rows(ranked: dict[tuple[str, int], list[tuple[int, tuple]]]) -> dict[tuple[str, int], list[dict]]:
+    members = [member for bucket_members in ranked.values() for member in bucket_members]
+    outputs = simulate_unloaded_minion_output_batch([c for _, c in members]).to_outputs() if members else []
+    rows = iter([simulation_result_row(id, configuration, sim) for (id, configuration), sim in zip(members, outputs)])
+    return {bucket: [next(rows) for _ in bucket_members] for bucket, bucket_members in ranked.items()}
+
+
+def describe(row: dict) -> str:
+    upgrades = [name for name, used in [("mithril infusion", row["mithril_infusion"]), ("free will", row["free_will"]), ("postcard", row["postcard"])] if used]
+    if row["beacon_boost_percent"]:
+        upgrades.append(f"beacon +{row['beacon_boost_percent']}%")
+    parts = [f"{row['minion']} {row['minion_level']}", row["fuel"], f"{row['item_1']} + {row['item_2']}", row["storagetype"] or "no storage", row["hopper"] or "no hopper"]
+    return " | ".join(str(part) for part in parts + [", ".join(upgrades) or "no upgrades"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the best minion setups per minion and time span without running the whole sweep")
+    parser.add_argument("--top", type=int, default=10, help="setups per minion and time span (default: 10)")
+    parser.add_argument("--metric", choices=list(METRIC_INVENTORY_PRICES), default="APR_if_inventory_sell_order_to_bz", help="column to rank by (default: APR_if_inventory_sell_order_to_bz)")
+    parser.add_argument("--minion", action="append", help="only this minion (can be repeated)")
+    parser.add_argument("--json", help="also write the result rows to this file")
+    parser.add_argument("--check", action="store_true", help="also simulate everything and make sure the result is the same")
+    add_price_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.top < 1:
+        raise SystemExit("--top has to be at least 1")
+    
+    load_prices(args)
+    
+    ranked, simulated, total = top_k(args.top, args.metric, args.minion)
+    rows = ranked_rows(ranked)
+    
+    for (minion, seconds), bucket_rows in rows.items():
+        print(f"{minion}, {seconds / 3600:g}h:")
+        for rank, row in enumerate(bucket_rows, start=1):
+            print(f"  {rank:>3}. {row[args.metric]:>12}  {describe(row)}")
+    print(f"Simulated {simulated} of {total} combinations.")
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([dict(row, rank=rank) for bucket_rows in rows.values() for rank, row in enumerate(bucket_rows, start=1)], f, indent=4)
+        print(f"Saved to {args.json}.")
+    
+    if args.check:
+        expected = brute_force_top_k(args.top, args.metric, args.minion)
+        if {bucket: [id for id, _ in members] for bucket, members in expected.items()} != {bucket: [id for id, _ in members] for bucket, members in ranked.items()}:
+            raise SystemExit("Top-k result differs from the brute force one!")
+        print("Same as brute force.")
+
+
+if __name__ == "__main__":
+    main()
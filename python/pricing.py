@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from math import nan
+from typing import Optional
+
+import numpy as np
+
+from bazaar import SkyblockItems
+
+
+# Item quantities of many configurations as a sparse (CSR) matrix: one row per configuration, one
+# column per item. Only positive amounts are stored, and the entries of a row keep the order the
+# items were added in (the order of the dicts the scalar simulation makes). dot() adds them up in
+# that order, so the totals are exactly the ones the scalar loops get.
+@dataclass
+class QuantityMatrix:
+    items: list[str] # column -> item name
+    indptr: np.ndarray # row i is data[indptr[i]:indptr[i+1]]
+    indices: np.ndarray
+    data: np.ndarray
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @staticmethod
+    def from_columns(items: list[str], columns: list[np.ndarray], rows: int, dtype=np.int64) -> "QuantityMatrix":
+        if not columns:
+            return QuantityMatrix([], np.zeros(rows + 1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=dtype))
+
+        dense = np.column_stack([np.broadcast_to(column, (rows,)) for column in columns]).astype(dtype, copy=False)
+        present = dense > 0
+        row, column = np.nonzero(present) # row major, so each row's entries are in column order
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(present.sum(axis=1), out=indptr[1:])
+        return QuantityMatrix(list(items), indptr, column.astype(np.int64), dense[row, column])
+
+    @staticmethod
+    def from_dicts(rows: list[dict[str, float]], dtype=np.int64) -> "QuantityMatrix":
+        columns: dict[str, int] = {}
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for item, amount in row.items():
+                if amount > 0:
+                    if item not in columns:
+                        columns[item] = len(columns)
+                    indices.append(columns[item])
+                    data.append(amount)
+            indptr.append(len(indices))
+        return QuantityMatrix(list(columns), np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64), np.array(data, dtype=dtype))
+
+    # rows of all the matrices after each other, with the columns merged by item name
+    @staticmethod
+    def concat(matrices: list["QuantityMatrix"]) -> "QuantityMatrix":
+        columns: dict[str, int] = {}
+        indptr, indices, data = [np.zeros(1, dtype=np.int64)], [], []
+        offset = 0
+        for matrix in matrices:
+            remap = np.array([columns.setdefault(item, len(columns)) for item in matrix.items], dtype=np.int64)
+            indices.append(remap[matrix.indices] if len(matrix.items) else matrix.indices)
+            data.append(matrix.data)
+            indptr.append(matrix.indptr[1:] + offset)
+            offset += len(matrix.data)
+        return QuantityMatrix(list(columns), np.concatenate(indptr), np.concatenate(indices), np.concatenate(data))
+
+    # the given rows, in the given order
+    def take(self, rows: np.ndarray) -> "QuantityMatrix":
+        lengths = np.diff(self.indptr)[rows]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        entries = np.repeat(self.indptr[rows] - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return QuantityMatrix(self.items, indptr, self.indices[entries], self.data[entries])
+
+    # one dict per row (or just the given rows)
+    def to_dicts(self, rows: Optional[list[int]] = None) -> list[dict[str, float]]:
+        indptr, indices, data = self.indptr.tolist(), self.indices.tolist(), self.data.tolist()
+        items = self.items
+        if rows is None:
+            rows = range(len(indptr) - 1)
+        return [{items[indices[j]]: data[j] for j in range(indptr[i], indptr[i + 1])} for i in rows]
+
+    # matrix @ vector, where vector has one value per column
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        total = np.zeros(len(self))
+        if len(self.data) == 0:
+            return total
+
+        products = self.data * vector[self.indices]
+        lengths = np.diff(self.indptr)
+        rows = np.repeat(np.arange(len(self)), lengths)
+        padded = np.zeros((len(self), lengths.max()))
+        padded[rows, np.arange(len(products)) - self.indptr[rows]] = products
+        # rows are short, so adding up column by column is cheap (and keeps the scalar order)
+        for j in range(padded.shape[1]):
+            total += padded[:, j]
+        return total
+
+
+# Per item price vectors for QuantityMatrix.dot, each item is looked up in SkyblockItems once.
+# npc/instant/order are what the scalar valuation uses (instant and order are 0 for items that aren't
+# on the bazaar), best is the best of the three per item, buy is the bazaar buy price (for fuel).
+# Prices that don't exist are nan and only show up in a result if an item with a missing price is used.
+class PriceVectors:
+    KINDS = ("npc", "instant", "order", "best", "buy")
+
+    def __init__(self, skyblock_items: SkyblockItems):
+        self.skyblock_items = skyblock_items
+        self.columns: dict[str, int] = {}
+        self.prices: dict[str, list[float]] = {kind: [] for kind in self.KINDS}
+        self.arrays: dict[str, np.ndarray] = {}
+
+    def _add(self, name: str):
+        try:
+            sb_item = self.skyblock_items.search_by_name(name)
+        except ValueError:
+            sb_item = None
+
+        npc = nan if sb_item is None or sb_item.npc_sell_price is None else sb_item.npc_sell_price
+        instant, order = 0, 0
+        if sb_item is not None and sb_item.bz_sell_price != None:
+            instant = sb_item.bz_sell_price
+            order = nan if sb_item.bz_buy_price is None else sb_item.bz_buy_price
+        buy = nan if sb_item is None or sb_item.bz_buy_price is None else sb_item.bz_buy_price
+
+        self.columns[name] = len(self.columns)
+        self.prices["npc"].append(npc)
+        self.prices["instant"].append(instant)
+        self.prices["order"].append(order)
+        # for amounts > 0, amount * max(prices) is exactly max(amount * price for each price)
+        self.prices["best"].append(nan if npc != npc or order != order else max(npc, instant, order))
+        self.prices["buy"].append(buy)
+        self.arrays = {}
+
+    def vector(self, kind: str, items: list[str]) -> np.ndarray:
+        for name in items:
+            if name not in self.columns:
+                self._add(name)
+        if kind not in self.arrays:
+            self.arrays[kind] = np.array(self.prices[kind], dtype=np.float64)
+        return self.arrays[kind][np.array([self.columns[name] for name in items], dtype=np.int64)]
+
+    # matrix @ price vector of the given kind
+    def price(self, matrix: QuantityMatrix, kind: str) -> np.ndarray:
+        return matrix.dot(self.vector(kind, matrix.items))
+
+    # raise like the scalar simulation would if a used item has no price
+    def check_used(self, matrix: QuantityMatrix, kind: str = "npc"):
+        vector = self.vector(kind, matrix.items)
+        for column in np.unique(matrix.indices).tolist():
+            if np.isnan(vector[column]):
+                name = matrix.items[column]
+                self.skyblock_items.search_by_name(name) # raises if it doesn't exist
+                raise TypeError(f"Item '{name}' has no price data")
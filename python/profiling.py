@@ -0,0 +1,132 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+try:
+    import resource # not on windows, the peak RSS is left out there
+except ImportError:
+    resource = None
+
+
+# Opt-in timers and counters for the stages of a sweep (simulate.py --profile).
+# Stage times are exclusive: while a nested stage runs its parent's clock is paused, so the stages add up
+# to the time spent in stages and nothing is counted twice. Worker processes keep their own profile and
+# hand it back with their rows (take/merge), so with --workers the stage times are summed over workers.
+# When it isn't started stage() and count() do nothing, the sweep doesn't pay for any of this.
+
+_NOT_PROFILING = nullcontext()
+
+
+class SweepProfile:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.started = None
+        self.reset()
+
+    def reset(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+        self._stack: list[str] = []
+        self._mark = 0.0
+
+    # trace_memory: also track the peak of python allocations with tracemalloc (slows everything down a lot)
+    def start(self, trace_memory: bool = False):
+        self.enabled = True
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.reset()
+        if trace_memory:
+            tracemalloc.start()
+
+    def _charge(self, now: float):
+        if self._stack:
+            name = self._stack[-1]
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NOT_PROFILING
+        return self._stage(name)
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # the timers and counters so far, and start over (worker processes send these back with their rows)
+    def take(self) -> dict:
+        taken = {"seconds": self.seconds, "calls": self.calls, "counters": self.counters}
+        stack = self._stack
+        self.reset()
+        self._stack = stack
+        self._mark = time.perf_counter()
+        return taken
+
+    def merge(self, taken: dict):
+        for field in ["seconds", "calls", "counters"]:
+            totals = getattr(self, field)
+            for name, value in taken[field].items():
+                totals[name] = totals.get(name, 0) + value
+
+    def report(self) -> dict:
+        staged = sum(self.seconds.values())
+        stages = {
+            name: {"seconds": round(seconds, 6), "calls": self.calls.get(name, 0), "share": round(seconds / staged, 4) if staged else 0.0}
+            for name, seconds in sorted(self.seconds.items(), key=lambda stage: -stage[1])
+        }
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 6) if self.started is not None else None,
+            "stages": stages,
+            "counters": dict(sorted(self.counters.items())),
+            "memory": memory_report(self.trace_memory),
+        }
+
+
+def _max_rss_bytes(who) -> Optional[int]:
+    if resource is None:
+        return None
+    # kilobytes on linux, bytes on macos
+    return resource.getrusage(who).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def memory_report(trace_memory: bool) -> dict:
+    memory = {
+        "peak_rss_bytes": _max_rss_bytes(resource.RUSAGE_SELF) if resource else None,
+        "peak_worker_rss_bytes": _max_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+        "tracemalloc_peak_bytes": None,
+    }
+    if trace_memory and tracemalloc.is_tracing():
+        memory["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    return memory
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    return "n/a" if not size else f"{size / 1e6:.1f} MB"
+
+
+def format_profile(report: dict) -> str:
+    lines = [f"Profile ({report['wall_seconds']:.2f}s wall):", f"  {'stage':<24} {'seconds':>9} {'share':>7} {'calls':>8}"]
+    for name, stage in report["stages"].items():
+        lines.append(f"  {name:<24} {stage['seconds']:>9.3f} {stage['share']:>7.1%} {stage['calls']:>8}")
+    if report["counters"]:
+        lines.append("  counters:")
+        for name, value in report["counters"].items():
+            lines.append(f"    {name:<34} {value:>10}")
+    memory = report["memory"]
+    lines.append(f"  peak RSS {_format_bytes(memory['peak_rss_bytes'])}, workers {_format_bytes(memory['peak_worker_rss_bytes'])}, tracemalloc peak {_format_bytes(memory['tracemalloc_peak_bytes'])}")
+    return "\n".join(lines)
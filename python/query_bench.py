@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+# Query plans and timings of the queries the website runs against the results db, to check that the
+# indexes (simulate.RESULT_INDEXES) are used and stay fast when the grid grows (--scale).
+# build_query is app.js's updateTable, DEFAULT_FILTERS is what index.html starts with.
+
+TABLE = "MinionSimulationResult"
+
+# what the page can sort by (index.html's sort-column) and filter on
+SORT_COLUMNS = ["profit_24h_if_inventory_instant_sold_to_bz", "profit_24h_only_hopper", "APR_if_inventory_sell_order_to_bz", "APR_only_hopper", "percentage_boost"]
+FILTER_COLUMNS = ["minion", "seconds", "fuel", "mithril_infusion", "free_will", "postcard", "beacon_boost_percent", "pet_bonus_percent", "crystal_bonus_percent", "minion_cost_total"]
+
+DEFAULT_FILTERS = {
+    "minions": [],
+    "sort": {"column": "profit_24h_if_inventory_instant_sold_to_bz", "order": "DESC"},
+    "timescales": [0, 604800, 10713600],
+    "upgrades": ["Mithril Infusion", "Postcard", "Beacon"],
+    "unselectedItems": [],
+    "fuels": ["Plasma Bucket", "Hamster Wheel", "Foul Flesh", "Tasty Cheese", "Catalyst", "Hyper Catalyst"],
+    "minCost": 5000000,
+    "maxCost": 400000000,
+}
+
+UPGRADE_COLUMNS = {
+    "Mithril Infusion": "mithril_infusion",
+    "Free Will": "free_will",
+    "Postcard": "postcard",
+    "Beacon": "beacon_boost_percent",
+    "Pet Bonus": "pet_bonus_percent",
+    "Crystal": "crystal_bonus_percent",
+}
+
+
+def _where(filters: dict) -> str:
+    query = " WHERE 1=1"
+    if filters["minions"]:
+        query += " AND minion IN ('%s')" % "','".join(filters["minions"])
+    if filters["timescales"]:
+        query += " AND seconds IN (%s)" % ",".join(str(seconds) for seconds in filters["timescales"])
+    if filters["fuels"]:
+        query += " AND fuel IN ('%s')" % "','".join(str(fuel) for fuel in filters["fuels"])
+    for item in filters["unselectedItems"]:
+        query += f" AND item_1 != '{item}' AND item_2 != '{item}'"
+    for upgrade, column in UPGRADE_COLUMNS.items():
+        if upgrade not in filters["upgrades"]:
+            query += f" AND {column} = 0"
+    if filters.get("minCost") is not None and filters.get("maxCost") is not None:
+        query += f" AND minion_cost_total BETWEEN {filters['minCost']} AND {filters['maxCost']}"
+    return query
+
+
+def build_query(filters: dict, page: int = 1, page_size: int = 50, table: str = TABLE) -> str:
+    return f"SELECT * FROM {table}{_where(filters)} ORDER BY {filters['sort']['column']} {filters['sort']['order']} LIMIT {page_size} OFFSET {(page - 1) * page_size}"
+
+
+# the summary views are best rows per minion, timescale and upgrades, so only those filters apply to them
+# (app.js's summaryFilters)
+def summary_filters(filters: dict) -> dict:
+    return dict(filters, fuels=[], unselectedItems=[], minCost=None, maxCost=None)
+
+
+def build_count_query(filters: dict) -> str:
+    return f"SELECT COUNT(*) FROM {TABLE}{_where(filters)}"
+
+
+# summary_tables: the page's other views (simulate.SUMMARY_TABLES)
+def bench_queries(summary_tables: list[str]) -> dict[str, str]:
+    queries = {}
+    for column in SORT_COLUMNS:
+        for order in ["DESC", "ASC"]:
+            queries[f"default, {column} {order}"] = build_query(dict(DEFAULT_FILTERS, sort={"column": column, "order": order}))
+    queries["default, page 20"] = build_query(DEFAULT_FILTERS, page=20)
+    queries["one minion"] = build_query(dict(DEFAULT_FILTERS, minions=["Clay"]))
+    queries["one minion, 1h"] = build_query(dict(DEFAULT_FILTERS, minions=["Clay"], timescales=[0, 3600]))
+    queries["two minions, items excluded"] = build_query(dict(DEFAULT_FILTERS, minions=["Slime", "Tarantula"], unselectedItems=["Flycatcher", "Corrupt Soil"]))
+    queries["one minion, one fuel, no upgrades"] = build_query(dict(DEFAULT_FILTERS, minions=["Clay"], fuels=["Catalyst"], upgrades=[0]))
+    queries["nothing matches"] = build_query(dict(DEFAULT_FILTERS, fuels=[0]))
+    queries["count"] = build_count_query(DEFAULT_FILTERS)
+    queries["count, one minion"] = build_count_query(dict(DEFAULT_FILTERS, minions=["Clay"]))
+    for table in summary_tables:
+        queries[f"{table} view"] = build_query(summary_filters(DEFAULT_FILTERS), table=table)
+    return queries
+
+
+# a copy of the db with every row repeated scale times (new ids), indexed and analyzed like the original
+def scaled_copy(path: str, scale: int, directory: str) -> str:
+    copy = os.path.join(directory, f"scaled_{scale}x.db")
+    shutil.copy(path, copy)
+    connection = sqlite3.connect(copy)
+    indexes = [row for row in connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (TABLE,))]
+    for name, _ in indexes:
+        connection.execute(f"DROP INDEX {name}")
+
+    columns = [row[1] for row in connection.execute(f"PRAGMA table_info({TABLE})") if row[1] != "id"]
+    rows, = connection.execute(f"SELECT MAX(id) + 1 FROM {TABLE}").fetchone()
+    for i in range(1, scale):
+        connection.execute(f"INSERT INTO {TABLE} (id, {', '.join(columns)}) SELECT id + {i * rows}, {', '.join(columns)} FROM {TABLE} WHERE id < {rows}")
+    for _, sql in indexes:
+        connection.execute(sql)
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+    return copy
+
+
+# uses_index is False for queries that scan the whole table
+def run_bench(path: str, repeat: int = 3) -> dict:
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    rows, = connection.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()
+    summary_tables = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND lower(name) != lower(?) AND name NOT LIKE 'sqlite_%'", (TABLE,))]
+    results = []
+    for name, query in bench_queries(summary_tables).items():
+        plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}")]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            returned = len(connection.execute(query).fetchall())
+            best = min(best, time.perf_counter() - start)
+        results.append({
+            "name": name,
+            "query": query,
+            "plan": plan,
+            "uses_index": not any(step == f"SCAN {TABLE}" for step in plan), # the summary tables are small enough to scan
+            "milliseconds": round(best * 1000, 3),
+            "rows": returned,
+        })
+    connection.close()
+    return {"database": path, "rows": rows, "size_bytes": os.path.getsize(path), "queries": results}
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{report['database']}: {report['rows']} rows, {report['size_bytes'] / 1e6:.1f} MB"]
+    for query in report["queries"]:
+        flag = "" if query["uses_index"] else "  <- full table scan"
+        lines.append(f"  {query['name']:<60} {query['milliseconds']:>9.2f} ms  {' | '.join(query['plan'])}{flag}")
+    return "\n".join(lines)
+
+
+def main():
+    from simulate import RESULTS_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Show the query plans and timings of the website's queries on the results database")
+    parser.add_argument("--db", default=RESULTS_DB_PATH, help=f"results database (default: {RESULTS_DB_PATH})")
+    parser.add_argument("--scale", type=int, default=1, help="also run them on a copy with every row repeated this many times")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query, the fastest counts (default: 3)")
+    parser.add_argument("--json", help="also write the report(s) to this file")
+    args = parser.parse_args()
+
+    reports = [run_bench(args.db, args.repeat)]
+    print(format_report(reports[0]))
+
+    if args.scale > 1:
+        with tempfile.TemporaryDirectory() as directory:
+            reports.append(run_bench(scaled_copy(args.db, args.scale, directory), args.repeat))
+            reports[-1]["database"] = f"{args.db} x{args.scale}"
+            print(format_report(reports[-1]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=4)
+        print(f"Saved to {args.json}.")
+
+
+if __name__ == "__main__":
+    main()
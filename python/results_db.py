@@ -0,0 +1,195 @@
+import sqlite3
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Iterator, Optional
+
+# sqlalchemy is only imported to create tables, reading results (and importing this) doesn't need it
+if TYPE_CHECKING:
+    from sqlalchemy import Table
+
+
+def _create_table_sql(table: "Table") -> str:
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateTable
+    return str(CreateTable(table).compile(dialect=sqlite.dialect()))
+
+
+# A small table of the best row of every partition of the results table (ties: lowest id), with the same
+# columns as the results table so anything that shows result rows can show these.
+@dataclass
+class SummaryTable:
+    name: str
+    partition_by: list[str]
+    order_by: str # sql, best first
+    where: Optional[str] = None # sql, rows that can be picked
+
+    def schema(self, table: "Table") -> "Table":
+        from sqlalchemy import MetaData
+        return table.to_metadata(MetaData(), name=self.name)
+
+
+# Bulk loader for the simulation results table.
+# SQLModel sessions build ORM state for every row which is very slow for a few hundred thousand rows,
+# so this writes rows straight through sqlite3 with one prepared INSERT and executemany.
+# The table is created from the SQLModel table definition, so the schema is exactly what
+# SQLModel.metadata.create_all makes (and what app.js queries).
+class BulkResultWriter:
+    # path must not exist yet. indexes (name -> columns) and summary tables are only created once
+    # everything is written, building an index at the end is a lot faster than keeping it up to date row by row.
+    # replace: path is an existing results db instead, and rows replace the ones with the same id in it
+    # (refreshing part of a sweep). only the partitions of its summary tables that rows were written to are
+    # made again at the end
+    def __init__(self, path: str, table: "Table", page_size: int = 4096, chunk_size: int = 5000, indexes: Optional[dict[str, list[str]]] = None, summaries: Optional[list[SummaryTable]] = None, replace: bool = False):
+        self.path = path
+        self.table = table
+        self.chunk_size = chunk_size
+        self.indexes = indexes or {}
+        self.summaries = summaries or []
+        self.columns = [column.name for column in table.columns]
+        self.written = 0
+        self.replace = replace
+        # replace: the values of the columns every summary is partitioned by that were written
+        self.replaced_by = [column for column in self.summaries[0].partition_by if all(column in summary.partition_by for summary in self.summaries)] if self.summaries else []
+        self.replaced: set[tuple] = set()
+
+        self.connection = sqlite3.connect(path, isolation_level=None)
+
+        # page_size only applies before the first table is created
+        if not replace:
+            self.connection.execute(f"PRAGMA page_size = {int(page_size)}")
+        # nothing else reads the file while we load it, and a half written db gets rebuilt anyway
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute("PRAGMA locking_mode = EXCLUSIVE")
+        self.connection.execute("PRAGMA temp_store = MEMORY")
+        self.connection.execute("PRAGMA cache_size = -65536") # 64MB
+
+        if not replace:
+            self.connection.execute(_create_table_sql(table))
+
+        column_names = ", ".join(self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert_sql = f"INSERT {'OR REPLACE ' if replace else ''}INTO {table.name} ({column_names}) VALUES ({placeholders})"
+
+    # rows are dicts of column -> value (like MinionSimulationResult(**row) takes)
+    def write(self, rows: Iterator[dict]) -> int:
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+
+            self.write_chunk(chunk)
+            print(f"{self.written} combinations saved.")
+        return self.written
+
+    # one transaction per chunk
+    def write_chunk(self, chunk: list[dict]):
+        self.write_values([tuple(row[column] for column in self.columns) for row in chunk])
+
+    # write_chunk with the rows already as tuples of their values in column order
+    def write_values(self, chunk: list[tuple]):
+        self.connection.execute("BEGIN")
+        self.connection.executemany(self.insert_sql, chunk)
+        self.connection.execute("COMMIT")
+        self.written += len(chunk)
+        if self.replace and self.replaced_by:
+            positions = [self.columns.index(column) for column in self.replaced_by]
+            self.replaced.update(tuple(row[i] for i in positions) for row in chunk)
+
+    def create_indexes(self):
+        for name, columns in self.indexes.items():
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {self.table.name} ({', '.join(columns)})")
+
+    def create_summary_tables(self):
+        column_names = ", ".join(self.columns)
+        for summary in self.summaries:
+            conditions = [summary.where] if summary.where else []
+            parameters = []
+            exists = self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (summary.name,)).fetchone()
+            if self.replace and self.replaced_by and exists:
+                # the other partitions can't have changed
+                if not self.replaced:
+                    continue
+                keys = f"({', '.join(self.replaced_by)}) IN (VALUES {', '.join('(' + ', '.join('?' for _ in self.replaced_by) + ')' for _ in self.replaced)})"
+                parameters = [value for key in self.replaced for value in key]
+                self.connection.execute(f"DELETE FROM {summary.name} WHERE {keys}", parameters)
+                conditions.append(keys)
+            else:
+                self.connection.execute(f"DROP TABLE IF EXISTS {summary.name}")
+                self.connection.execute(_create_table_sql(summary.schema(self.table)))
+            ranked = f"SELECT {column_names}, ROW_NUMBER() OVER (PARTITION BY {', '.join(summary.partition_by)} ORDER BY {summary.order_by}, id) AS summary_rank FROM {self.table.name}"
+            if conditions:
+                ranked += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+            self.connection.execute(f"INSERT INTO {summary.name} ({column_names}) SELECT {column_names} FROM ({ranked}) WHERE summary_rank = 1 ORDER BY id", parameters)
+
+    # put the db back into a normal state for readers (sql.js downloads the whole file)
+    def close(self):
+        self.create_indexes()
+        self.create_summary_tables()
+        self.connection.execute("PRAGMA journal_mode = DELETE")
+        self.connection.execute("PRAGMA synchronous = FULL")
+        self.connection.execute("PRAGMA locking_mode = NORMAL")
+        self.connection.execute("ANALYZE")
+        self.connection.execute("VACUUM")
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.connection.close()
+
+
+# where: only count the rows with these values, like read_results
+def count_results(path: str, table: "Table", where: Optional[dict] = None) -> int:
+    where = where or {}
+    condition = " WHERE " + " AND ".join(f"{column} = ?" for column in where) if where else ""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return connection.execute(f"SELECT COUNT(*) FROM {table.name}{condition}", list(where.values())).fetchone()[0]
+    finally:
+        connection.close()
+
+
+# the columns of a results table in a db, in order (a db written before a column was added doesn't have it)
+def result_columns(path: str, table: "Table") -> list[str]:
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [row[1] for row in connection.execute(f"PRAGMA table_info({table.name})")]
+    finally:
+        connection.close()
+
+
+# every combination of values of these columns in a results table and how many rows have it, in the
+# order they first come up in by id
+def shard_keys(path: str, table: "Table", columns: list[str]) -> list[tuple[tuple, int]]:
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        names = ", ".join(columns)
+        query = f"SELECT {names}, COUNT(*) FROM {table.name} GROUP BY {names} ORDER BY MIN(id)"
+        return [(tuple(row[:-1]), row[-1]) for row in connection.execute(query)]
+    finally:
+        connection.close()
+
+
+# reads a results table back as row dicts in id order, a chunk at a time. where: only rows with these
+# values (column -> value)
+def read_results(path: str, table: "Table", chunk_size: int = 5000, where: Optional[dict] = None) -> Iterator[dict]:
+    columns = [column.name for column in table.columns]
+    where = where or {}
+    condition = " WHERE " + " AND ".join(f"{column} = ?" for column in where) if where else ""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = connection.execute(f"SELECT {', '.join(columns)} FROM {table.name}{condition} ORDER BY id", list(where.values()))
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for row in chunk:
+                yield dict(zip(columns, row))
+    finally:
+        connection.close()
@@ -0,0 +1,60 @@
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+# The table of the results dbs (and of the website's queries). It's in its own module so that importing
+# simulate.py doesn't import sqlmodel and sqlalchemy (a few hundred ms), only reading or writing a db does,
+# and so that the table is only ever defined once (SQLModel refuses a second definition).
+
+class MinionSimulationResult(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    minion: str
+    minion_level: int
+    
+    fuel: Optional[str]
+    hopper: Optional[str]
+    item_1: Optional[str]
+    item_2: Optional[str]
+    storagetype: Optional[str]
+    
+    mithril_infusion: bool
+    free_will: bool
+    postcard: bool 
+    beacon_boost_percent: int
+    pet_bonus_percent: int
+    crystal_bonus_percent: int
+    
+    seconds: int
+    percentage_boost: int
+    raw_item_drops: str # dict[str, int] # so we can store dict into sqlite as string
+    
+    in_inventory: str #dict[str, int]
+    sold_to_hopper: str #dict[str, int]
+    hopper_coins: int
+    cost_of_fuel: int
+    
+    coins_if_inventory_sell_order_to_bz: int 
+    coins_if_inventory_instant_sold_to_bz: int
+    coins_if_inventory_sold_to_npc: int
+    coins_if_inventory_sold_optimally: int
+    
+    profit_24h_if_inventory_sell_order_to_bz: int
+    profit_24h_if_inventory_instant_sold_to_bz: int
+    profit_24h_if_inventory_sold_to_npc: int
+    profit_24h_if_inventory_sold_optimally: int
+    profit_24h_only_hopper: int
+    
+    APR_if_inventory_sell_order_to_bz: int
+    APR_only_hopper: int
+    
+    inventory_full: bool
+    fuel_empty: bool
+    
+    minion_cost_total: int
+    minion_cost_recoverable: int
+    minion_cost_non_recoverable: int
+    
+    # an estimate of when the first item stops fitting (NULL if never), whatever the duration. it's not from the
+    # same model as inventory_full, so the two can disagree (see simulate.solve_inventory_fill)
+    seconds_until_full: Optional[int]
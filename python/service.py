@@ -0,0 +1,357 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import simulate
+from loaded import price_loaded_minion_run, run_loaded_minion
+from simulate import (
+    BEACON_PERCENT_BOOSTS,
+    FUEL_TYPES,
+    HOPPERS,
+    ITEMS,
+    MINIONS,
+    STORAGES,
+    UnloadedMinionSimulationSetup,
+    add_price_arguments,
+    inventory_timeline,
+    load_prices,
+    setup_inventory_fill,
+    setup_unloaded_minion_simulation,
+    simulate_unloaded_minion_setup,
+)
+
+
+# A small local HTTP/JSON service for "what does this exact setup earn in this long", for setups and
+# durations the sweep doesn't have (any level, any number of seconds). The prices stay loaded, and both
+# the compiled setups (everything but the duration) and the finished answers are kept in LRU caches.
+# mode=loaded simulates the minion on a loaded island instead (loaded.py), with pet and crystal bonuses.
+#
+#   GET  /simulate?minion=Clay&level=11&fuel=Catalyst&item_1=Flycatcher&item_2=Super%20Compactor%203000&seconds=90000
+#   POST /simulate  {"minion": "Clay", "fuel": "Catalyst", "item_1": ..., "item_2": ..., "seconds": 90000}
+#   GET  /timeline  same parameters: when the fuel runs out, the slots fill up and each item stops fitting,
+#                   the piecewise linear earnings curve (simulate.inventory_timeline) and the curve at seconds
+#   GET  /options   every name the parameters take
+#   GET  /metrics   request counts, latency percentiles, throughput and cache hit rates
+#   GET  /health
+#
+# Everything runs from a saved price snapshot (--snapshot/--max-age), so it needs no network at all;
+# SimulationService can also be used without the HTTP part.
+
+DEFAULT_PORT = 8765
+
+# parameter -> default. None: required (the simulation needs a fuel and both items, like every sweep row has)
+PARAMETERS = {
+    "minion": None,
+    "level": "max", # the minion's highest level
+    "fuel": None,
+    "hopper": "",
+    "item_1": None,
+    "item_2": None,
+    "storage": "",
+    "mithril_infusion": False,
+    "free_will": False,
+    "postcard": False,
+    "beacon_percent_boost": 0,
+    "pet_bonus_percent": 0,
+    "crystal_bonus_percent": 0,
+    "seconds": None,
+    "mode": "unloaded", # or "loaded", see loaded.py
+}
+MODES = ["unloaded", "loaded"]
+
+
+def _parse_bool(name: str, value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "yes"):
+        return True
+    if str(value).lower() in ("0", "false", "no", ""):
+        return False
+    raise ValueError(f"'{name}' has to be true or false, not {value!r}")
+
+
+def _parse_int(name: str, value, low: int, high: Optional[int] = None) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' has to be a whole number, not {value!r}")
+    if isinstance(value, float) and value != number:
+        raise ValueError(f"'{name}' has to be a whole number, not {value!r}")
+    if number < low or (high is not None and number > high):
+        raise ValueError(f"'{name}' has to be between {low} and {high}" if high is not None else f"'{name}' has to be at least {low}")
+    return number
+
+
+# keeps track of what the service did. latencies are the last window_size requests
+class ServiceMetrics:
+    def __init__(self, window_size: int = 10000):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests: dict[str, int] = {}
+        self.statuses: dict[int, int] = {}
+        self.latencies: deque[float] = deque(maxlen=window_size)
+        self.finished: deque[float] = deque(maxlen=window_size) # when, for the recent throughput
+
+    def record(self, endpoint: str, status: int, seconds: float):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.latencies.append(seconds)
+            self.finished.append(time.time())
+
+    def report(self) -> dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            finished = list(self.finished)
+            requests = dict(self.requests)
+            statuses = {str(status): count for status, count in sorted(self.statuses.items())}
+        now = time.time()
+        uptime = now - self.started
+        percentiles = {}
+        for percentile in [50, 90, 99]:
+            percentiles[f"p{percentile}_ms"] = round(latencies[min(len(latencies) - 1, len(latencies) * percentile // 100)] * 1000, 3) if latencies else None
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "requests": requests,
+            "statuses": statuses,
+            "latency": dict(percentiles, max_ms=round(latencies[-1] * 1000, 3) if latencies else None, window=len(latencies)),
+            "throughput": {
+                "requests_per_second": round(sum(requests.values()) / uptime, 2) if uptime else 0.0,
+                "last_minute_requests_per_second": round(sum(1 for when in finished if now - when <= 60) / min(60, uptime), 2) if uptime else 0.0,
+            },
+        }
+
+
+class SimulationService:
+    # the prices have to be loaded (simulate.load_prices) before anything is simulated
+    def __init__(self, cache_size: int = 4096, setup_cache_size: int = 1024):
+        self.minions = {minion.name: minion for minion in MINIONS}
+        self.fuels = {fuel.name: fuel for fuel in FUEL_TYPES if fuel}
+        self.hoppers = {hopper.name: hopper for hopper in HOPPERS if hopper}
+        self.items = {item.name: item for item in ITEMS if item}
+        self.storages = {storage.name: storage for storage in STORAGES if storage}
+        self.metrics = ServiceMetrics()
+        # keyed by names and numbers (parse's result), not by the minion data objects
+        self._setup = lru_cache(maxsize=setup_cache_size)(self._compile_setup)
+        self._answer = lru_cache(maxsize=cache_size)(self._simulate)
+        self._timeline = lru_cache(maxsize=cache_size)(self._solve_timeline)
+
+    def options(self) -> dict:
+        return {
+            "minions": {name: len(minion.levels) for name, minion in self.minions.items()},
+            "fuels": list(self.fuels),
+            "hoppers": list(self.hoppers),
+            "items": list(self.items),
+            "storages": list(self.storages),
+            "beacon_percent_boost": BEACON_PERCENT_BOOSTS,
+            "modes": MODES,
+            "parameters": {name: default for name, default in PARAMETERS.items()},
+        }
+
+    def _lookup(self, kind: str, names: dict, value, required: bool = False) -> Optional[str]:
+        if value in (None, "", "none"):
+            if required:
+                raise ValueError(f"'{kind}' is required, see /options")
+            return None
+        if value not in names:
+            raise ValueError(f"Unknown {kind} {value!r}, see /options")
+        return value
+
+    # request parameters -> the cache key: the configuration as names and numbers
+    def parse(self, params: dict) -> tuple:
+        unknown = [name for name in params if name not in PARAMETERS]
+        if unknown:
+            raise ValueError(f"Unknown parameters {unknown}, the parameters are {list(PARAMETERS)}")
+        values = dict(PARAMETERS, **params)
+        missing = [name for name, value in values.items() if value is None]
+        if missing:
+            raise ValueError(f"Missing parameters {missing}")
+
+        minion = self._lookup("minion", self.minions, values["minion"], required=True)
+        item_1 = self._lookup("item_1", self.items, values["item_1"], required=True)
+        item_2 = self._lookup("item_2", self.items, values["item_2"], required=True)
+        # the same rules generate_configurations has
+        for item in {item_1, item_2}:
+            if self.items[item].eligible_minions != ["all"] and minion not in self.items[item].eligible_minions:
+                raise ValueError(f"{item} can't be used in a {minion} minion")
+        if item_1 == item_2 and not self.items[item_1].can_stack:
+            raise ValueError(f"Only one {item_1} can be used")
+        max_level = len(self.minions[minion].levels)
+        level = max_level if values["level"] == "max" else _parse_int("level", values["level"], 1, max_level)
+        beacon_percent_boost = _parse_int("beacon_percent_boost", values["beacon_percent_boost"], 0)
+        if beacon_percent_boost not in BEACON_PERCENT_BOOSTS:
+            raise ValueError(f"'beacon_percent_boost' has to be one of {BEACON_PERCENT_BOOSTS}")
+        if values["mode"] not in MODES:
+            raise ValueError(f"'mode' has to be one of {MODES}")
+        return (
+            minion,
+            level,
+            self._lookup("fuel", self.fuels, values["fuel"], required=True),
+            self._lookup("hopper", self.hoppers, values["hopper"]),
+            item_1,
+            item_2,
+            self._lookup("storage", self.storages, values["storage"]),
+            _parse_bool("mithril_infusion", values["mithril_infusion"]),
+            _parse_bool("free_will", values["free_will"]),
+            _parse_bool("postcard", values["postcard"]),
+            beacon_percent_boost,
+            _parse_int("pet_bonus_percent", values["pet_bonus_percent"], 0),
+            _parse_int("crystal_bonus_percent", values["crystal_bonus_percent"], 0),
+            _parse_int("seconds", values["seconds"], 1),
+            values["mode"],
+        )
+
+    def _compile_setup(self, minion: str, level: int, fuel: Optional[str], hopper: Optional[str], item_1: Optional[str], item_2: Optional[str], storage: Optional[str], mithril_infusion: bool, free_will: bool, postcard: bool, beacon_percent_boost: int, pet_bonus_percent: int, crystal_bonus_percent: int) -> UnloadedMinionSimulationSetup:
+        def get(names: dict, name: Optional[str]):
+            return names[name] if name is not None else None
+        return setup_unloaded_minion_simulation(self.minions[minion], level, get(self.fuels, fuel), get(self.hoppers, hopper), get(self.items, item_1), get(self.items, item_2), get(self.storages, storage), mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent)
+
+    # the answer as json, so cached answers can't be changed by whoever gets them
+    def _simulate(self, configuration: tuple) -> bytes:
+        setup, seconds, mode = self._setup(*configuration[:13]), configuration[13], configuration[14]
+        answer = {"configuration": dict(zip(PARAMETERS, configuration))}
+        if mode == "loaded":
+            run = run_loaded_minion(setup, seconds)
+            answer["output"] = asdict(price_loaded_minion_run(setup, run))
+            answer["loaded"] = {"harvests": run.harvests, "events": run.events, "inventory_full_after_seconds": run.inventory_full_after_seconds, "stopped": run.stopped}
+        else:
+            output = simulate_unloaded_minion_setup(setup, seconds)
+            # the estimate, like the sweep stores it
+            output.seconds_until_full = setup_inventory_fill(setup).seconds_until_full()
+            answer["output"] = asdict(output)
+        return json.dumps(answer).encode()
+
+    def simulate(self, params: dict) -> bytes:
+        return self._answer(self.parse(params))
+
+    def _solve_timeline(self, configuration: tuple) -> bytes:
+        if configuration[14] != "unloaded":
+            raise ValueError("The timeline is of the unloaded calculation, leave out 'mode'")
+        timeline = inventory_timeline(self._setup(*configuration[:13]))
+        fill = timeline.fill
+        answer = {
+            "configuration": dict(zip(PARAMETERS, configuration)),
+            "timeline": {
+                "fuel_runs_out": timeline.fuel_runs_out,
+                "main_slots_full": fill.main_slots_full,
+                "storage_slots_full": fill.storage_slots_full,
+                "full": fill.full,
+                "seconds_until_full": fill.seconds_until_full(),
+                "stops_fitting": [{"seconds": seconds, "item": item, "as": form} for seconds, item, form in fill.stops_fitting],
+            },
+            "curve": asdict(timeline.curve),
+            "at": timeline.curve.at(configuration[13]),
+        }
+        return json.dumps(answer).encode()
+
+    def timeline(self, params: dict) -> bytes:
+        return self._timeline(self.parse(params))
+
+    def report(self) -> dict:
+        report = self.metrics.report()
+        report["caches"] = {}
+        for name, cached in [("results", self._answer), ("timelines", self._timeline), ("setups", self._setup)]:
+            info = cached.cache_info()
+            lookups = info.hits + info.misses
+            report["caches"][name] = {"hits": info.hits, "misses": info.misses, "hit_rate": round(info.hits / lookups, 4) if lookups else None, "size": info.currsize, "max_size": info.maxsize}
+        report["prices_last_updated"] = simulate.skyblock_items.last_updated
+        return report
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service: SimulationService = None # set by make_server
+    quiet = True
+
+    def _respond(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, params_from_body: bool):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        endpoint = url.path.rstrip("/") or "/"
+        try:
+            if endpoint in ("/simulate", "/timeline"):
+                if params_from_body:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    params = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(params, dict):
+                        raise ValueError("The body has to be a json object of parameters")
+                else:
+                    params = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+                status, body = 200, (self.service.simulate if endpoint == "/simulate" else self.service.timeline)(params)
+            elif params_from_body:
+                status, body = 405, json.dumps({"error": f"{endpoint} only takes GET"}).encode()
+            elif endpoint == "/metrics":
+                status, body = 200, json.dumps(self.service.report()).encode()
+            elif endpoint == "/options":
+                status, body = 200, json.dumps(self.service.options()).encode()
+            elif endpoint == "/health":
+                status, body = 200, b'{"status": "ok"}'
+            else:
+                status, body = 404, json.dumps({"error": f"No endpoint {endpoint}"}).encode()
+        except ValueError as e: # bad parameters or json
+            status, body = 400, json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            status, body = 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+        self._respond(status, body)
+        self.service.metrics.record(endpoint if status != 404 else "other", status, time.perf_counter() - start)
+
+    def do_GET(self):
+        self._handle(False)
+
+    def do_POST(self):
+        self._handle(True)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+# port 0 picks a free port (server.server_address has it)
+def make_server(service: SimulationService, host: str = "127.0.0.1", port: int = DEFAULT_PORT, quiet: bool = True) -> ThreadingHTTPServer:
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service, "quiet": quiet})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# the options of cli.py serve (and of running this file)
+def add_serve_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on, 0 for any free one (default: {DEFAULT_PORT})")
+    parser.add_argument("--cache-size", type=int, default=4096, help="answers to keep (default: 4096)")
+    parser.add_argument("--log", action="store_true", help="log every request")
+    add_price_arguments(parser)
+
+
+def serve(args: argparse.Namespace):
+    load_prices(args)
+    service = SimulationService(args.cache_size)
+    server = make_server(service, args.host, args.port, quiet=not args.log)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}/simulate (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve single minion setup simulations over local HTTP/JSON")
+    add_serve_arguments(parser)
+    serve(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,32 @@ FAQ:
 
 """
 
+import argparse
+import ast
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import copy
 from dataclasses import dataclass
+from itertools import islice
 import json
-from math import floor
-from typing import List, Optional
+from math import ceil, floor, inf
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional
 
-from sqlmodel import Field, SQLModel, Session, create_engine
-from bazaar import SkyblockItems
+import numpy as np
+from bazaar import SNAPSHOT_DIR, AuctionPriceCache, SBItem, SkyblockItems, load_price_snapshot
+from pricing import PriceVectors, QuantityMatrix
+from results_db import BulkResultWriter, SummaryTable, count_results, read_results, result_columns
+from query_bench import FILTER_COLUMNS, SORT_COLUMNS, UPGRADE_COLUMNS, format_report, run_bench
+from profiling import SweepProfile, format_profile
 import os
+import shutil
+import tempfile
+import time
+
+if TYPE_CHECKING:
+    from sqlalchemy import Table
 
 
 from minion_data import (
@@ -64,16 +81,40 @@ class MinionInventorySlot:
             return ""
         return f"{self.amount} {self.item}"
 
+# the inventory as two flat lists, one entry per slot: main inventory first, then storage (the order
+# slots get filled in). a slot is empty while its amount is 0, but it can still have an item: the
+# proportional fill below claims slots it doesn't end up filling, and those still count as that item's
+# slots when more of it is put in later.
+# slots never empty out, so the empty ones are kept as a sorted list of positions and every new item
+# takes slots from the front of it. an inventory has at most a few dozen slots, so the list scans and
+# removals are cheaper than keeping counts per item would be, and the slots stay exactly what they were
+# (test_inventory.py checks them against the old allocator).
 class MinionInventory:
     def __init__(self, slots:int, storage: None | MinionStorageType = None):
         self.slots: int = slots
-        self.items: list[MinionInventorySlot] = [MinionInventorySlot(item="", amount=0) for i in range(slots)]
-        if storage:
-            self.storage_slots: int = storage.inventory_slots
-            self.storage_items: list[MinionInventorySlot] = [MinionInventorySlot(item="", amount=0) for i in range(storage.inventory_slots)]
-        else:
-            self.storage_slots = 0
-            self.storage_items = []
+        self.storage_slots: int = storage.inventory_slots if storage else 0
+        
+        total_slots = self.slots + self.storage_slots
+        self.slot_items: list[str] = [""] * total_slots
+        self.slot_amounts: list[int] = [0] * total_slots
+        self.empty_slots: list[int] = list(range(total_slots))
+        self.item_slots: dict[str, list[int]] = {} # item -> its slots, in order
+
+    # gives the slots at positions (in order) to item, with the given amounts
+    def _claim_slots(self, positions: list[int], item: str, amounts: list[int]):
+        item_slots = self.item_slots.setdefault(item, [])
+        added = False
+        for position, amount in zip(positions, amounts):
+            previous = self.slot_items[position]
+            if previous != item:
+                if previous:
+                    self.item_slots[previous].remove(position)
+                self.slot_items[position] = item
+                item_slots.append(position)
+                added = True
+            self.slot_amounts[position] = amount
+        if added:
+            item_slots.sort()
 
     # tries to put item in inventory one stack at a time
     # each stack can only have 64 items
@@ -81,114 +122,84 @@ class MinionInventory:
     # if both are full return tuple with (item, amount)
     # if success return true
     def put_items_in_inventory(self, items:list[list[str, int]]) -> bool | dict[str, int]:
-        # Don't modify input array
-        items = copy.deepcopy(items)
+        names = [item[0] for item in items]
+        remaining = [item[1] for item in items]
         
         # Count empty slots
-        empty_main_slots = sum(1 for slot in self.items if slot.amount == 0)
-        empty_storage_slots = sum(1 for slot in self.storage_items if slot.amount == 0)
-        total_empty_slots = empty_main_slots + empty_storage_slots
-
+        total_empty_slots = len(self.empty_slots)
+        
         # First fill existing slots with matching items
-        for item in items:
-            # Try main inventory
-            for slot in self.items:
-                if slot.item == item[0] and slot.amount < 64:
-                    add = min(64 - slot.amount, item[1])
-                    slot.amount += add
-                    item[1] -= add
-                    
-            # Try storage
-            for slot in self.storage_items:
-                if slot.item == item[0] and slot.amount < 64:
-                    add = min(64 - slot.amount, item[1])
-                    slot.amount += add
-                    item[1] -= add
-
-        # Remove fully allocated items
-        items = [item for item in items if item[1] > 0]
+        for i, name in enumerate(names):
+            for position in self.item_slots.get(name, ()):
+                if remaining[i] <= 0:
+                    break
+                amount = self.slot_amounts[position]
+                if amount < 64:
+                    add = min(64 - amount, remaining[i])
+                    if amount == 0 and add > 0:
+                        self.empty_slots.remove(position)
+                    self.slot_amounts[position] = amount + add
+                    remaining[i] -= add
         
-        if not items:
+        # Remove fully allocated items
+        left = [i for i in range(len(names)) if remaining[i] > 0]
+        if not left:
             return True
-
+        
         # If we have enough slots, ensure one slot per item type
-        if total_empty_slots >= len(items):
-            # Initial allocation pass
-            for item in items:
-                allocated = False
-                
-                # Try main inventory first
-                for i, slot in enumerate(self.items):
-                    if slot.amount == 0 and not allocated:
-                        amount = min(64, item[1])
-                        self.items[i] = MinionInventorySlot(item[0], amount) 
-                        item[1] -= amount
-                        allocated = True
-                        break
-                        
-                # Try storage if needed
-                if not allocated:
-                    for i, slot in enumerate(self.storage_items):
-                        if slot.amount == 0 and not allocated:
-                            amount = min(64, item[1])
-                            self.storage_items[i] = MinionInventorySlot(item[0], amount)
-                            item[1] -= amount
-                            break
-
-        # Calculate remaining slots and items
-        empty_slots_remaining = sum(1 for slot in self.items if slot.amount == 0) + sum(1 for slot in self.storage_items if slot.amount == 0)
-        total_items_remaining = sum(item[1] for item in items)
-
+        # (the count is from before the matching slots above got filled)
+        if total_empty_slots >= len(left):
+            for i in left:
+                if not self.empty_slots:
+                    break
+                amount = min(64, remaining[i])
+                self._claim_slots([self.empty_slots.pop(0)], names[i], [amount])
+                remaining[i] -= amount
+        
         # Distribute remaining items proportionally 
         # TODO: something is wrong with this algorithm
         # it doesn't distribute items equally
+        empty_slots_remaining = len(self.empty_slots)
+        total_items_remaining = sum(remaining[i] for i in left)
         if total_items_remaining > 0:
-            for item in items:
-                if item[1] == 0:
+            for i in left:
+                if remaining[i] == 0:
                     continue
-                    
-                slots_for_item = round((item[1] / total_items_remaining) * empty_slots_remaining)
                 
-                # Fill main inventory
-                slots_used = 0
-                for i, slot in enumerate(self.items):
-                    if slot.amount == 0 and slots_used < slots_for_item:
-                        amount = min(64, item[1])
-                        self.items[i] = MinionInventorySlot(item[0], amount)
-                        item[1] -= amount
-                        slots_used += 1
-                        
-                # Fill storage
-                for i, slot in enumerate(self.storage_items):
-                    if slot.amount == 0 and slots_used < slots_for_item:
-                        amount = min(64, item[1])
-                        self.storage_items[i] = MinionInventorySlot(item[0], amount)
-                        item[1] -= amount
-                        slots_used += 1
-
+                slots_for_item = round((remaining[i] / total_items_remaining) * empty_slots_remaining)
+                
+                # the item gets the first slots_for_item empty slots: full stacks, then what's left, then
+                # nothing (those stay empty, but are claimed for the item)
+                claimed = self.empty_slots[:slots_for_item]
+                full_stacks = min(len(claimed), remaining[i] // 64)
+                amounts = [64] * full_stacks
+                if full_stacks < len(claimed):
+                    amounts += [remaining[i] - 64 * full_stacks] + [0] * (len(claimed) - full_stacks - 1)
+                self._claim_slots(claimed, names[i], amounts)
+                
+                filled = full_stacks + (1 if len(amounts) > full_stacks and amounts[full_stacks] > 0 else 0)
+                remaining[i] -= sum(amounts[:filled])
+                del self.empty_slots[:filled]
+        
         # Return remaining items or success
-        remaining = {item[0]: item[1] for item in items if item[1] > 0}
+        remaining = {names[i]: remaining[i] for i in left if remaining[i] > 0}
         return remaining if remaining else True
     
     def get_inventory_items(self) -> dict[str, int]:
         items = {}
-        for slot in self.items:
-            if slot.amount != 0:
-                if slot.item not in items:
-                    items[slot.item] = 0
-                items[slot.item] += slot.amount
-        for slot in self.storage_items:
-            if slot.amount != 0:
-                if slot.item not in items:
-                    items[slot.item] = 0
-                items[slot.item] += slot.amount
+        for item, amount in zip(self.slot_items, self.slot_amounts):
+            if amount != 0:
+                if item not in items:
+                    items[item] = 0
+                items[item] += amount
         
         return items
 
     def __repr__(self):
+        slots = [MinionInventorySlot(item, amount) for item, amount in zip(self.slot_items, self.slot_amounts)]
         if self.storage_slots != 0:
-            return f"{self.items} & {self.storage_items}"
-        return f"{self.items}"
+            return f"{slots[:self.slots]} & {slots[self.slots:]}"
+        return f"{slots}"
 
 
 
@@ -227,79 +238,104 @@ class MinionSimulationOutput:
     minion_cost_total: int
     # coins_per_day: int
     
-class MinionSimulationResult(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    minion: str
-    minion_level: int
-    
-    fuel: Optional[str]
-    hopper: Optional[str]
-    item_1: Optional[str]
-    item_2: Optional[str]
-    storagetype: Optional[str]
+    # when the first item stops fitting, whatever the duration (None if never). for an unloaded minion it's
+    # solve_inventory_fill's estimate, which doesn't come from the slots inventory_full does (the two can
+    # disagree, and with a compactor it's on the early side). simulate_unloaded_minion_setup leaves it at
+    # None, it's only worked out where it's stored (the batch engine, setup_inventory_fill). for a loaded
+    # one it's when it actually happened
+    seconds_until_full: None | int = None
     
-    mithril_infusion: bool
-    free_will: bool
-    postcard: bool 
-    beacon_boost_percent: int
-    pet_bonus_percent: int
-    crystal_bonus_percent: int
-    
-    seconds: int
-    percentage_boost: int
-    raw_item_drops: str # dict[str, int] # so we can store dict into sqlite as string
-    
-    in_inventory: str #dict[str, int]
-    sold_to_hopper: str #dict[str, int]
-    hopper_coins: int
-    cost_of_fuel: int
-    
-    coins_if_inventory_sell_order_to_bz: int 
-    coins_if_inventory_instant_sold_to_bz: int
-    coins_if_inventory_sold_to_npc: int
-    coins_if_inventory_sold_optimally: int
-    
-    profit_24h_if_inventory_sell_order_to_bz: int
-    profit_24h_if_inventory_instant_sold_to_bz: int
-    profit_24h_if_inventory_sold_to_npc: int
-    profit_24h_if_inventory_sold_optimally: int
-    profit_24h_only_hopper: int
-    
-    APR_if_inventory_sell_order_to_bz: int
-    APR_only_hopper: int
-    
-    inventory_full: bool
-    fuel_empty: bool
+
+# the results table (results_model.MinionSimulationResult), imported the first time a db is read or written
+def result_table() -> "Table":
+    from results_model import MinionSimulationResult
+    return MinionSimulationResult.__table__
+
+
+# simulate.MinionSimulationResult still works, it's just not imported up front
+def __getattr__(name: str):
+    if name == "MinionSimulationResult":
+        from results_model import MinionSimulationResult
+        return MinionSimulationResult
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# loaded in main() (or handed to sweep workers)
+skyblock_items: SkyblockItems = None
+
+# timers and counters of this run (--profile, see profiling.py), they do nothing unless it's started
+sweep_profile = SweepProfile()
+
+# the order the sweep goes through the minions in (the row ids depend on it). a copy, so everyone else
+# importing minion_data still gets MINIONS as it is
+SWEEP_MINIONS = MINIONS[::-1]
+
+# ASSUMPTION: you have 29 minion slots.
+# yes, the cap is 31 but that requires grinding slayer and nether and pelts
+# treat it as some extra cash
+MINION_COUNT = 29
+
+# everything about a minion setup that doesn't depend on how long it runs for
+@dataclass
+class UnloadedMinionSimulationSetup:
+    minion: MinionBase
+    minion_level: int
+    fuel: None | MinionFuelType
+    hopper: None | MinionHopperType
+    item_1: None | MinionItemType
+    item_2: None | MinionItemType
+    storage: None | MinionStorageType
+    beacon_percent_boost: int
     
-    minion_cost_total: int
-    minion_cost_recoverable: int
-    minion_cost_non_recoverable: int
+    outputs_per_cycle: dict[str, float]
+    outputs_per_cycle_not_multiplied: dict[str, float]
+    outputs_per_day: dict[str, float]
+    minion_speed_percentage: float
+    seconds_per_cycle: float
     
+    costs: "MinionSetupCosts"
+
 
-skyblock_items = SkyblockItems(only_bazaar=False)
+# the price dependent part of a minion setup
+@dataclass
+class MinionSetupCosts:
+    fuel_bz_buy_price: None | float
+    crystal_cost_24hrs_per_minion: float
+    
+    minion_cost_total: float
+    minion_cost_recoverable: float
+    minion_cost_non_recoverable: float
 
-MINIONS.reverse()
 
 # NOTE: this calculation is only valid while the island is UNLOADED
 # two main reason for this is corrupted soil
 # there are some weird interactions
 # A: catalyst works on corrupt soil/sulphur/frag BUT only when the island is unloaded (why????? if loaded you only get 1 each per kill)
 # B: compacted items get placed in inventory BEFORE corrupted fragments
+# (loaded.py simulates a loaded island)
 def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel: None | MinionFuelType, hopper: None | MinionHopperType, item_1:None | MinionItemType, item_2:None | MinionItemType, storage: None | MinionStorageType, mithril_infusion: bool, free_will: bool, postcard:bool, beacon_percent_boost: int, pet_bonus_percent: int, crystal_bonus_percent: int, seconds: int, minionInventory=None) -> MinionSimulationOutput:
+    setup = setup_unloaded_minion_simulation(minion, minion_level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent)
+    return simulate_unloaded_minion_setup(setup, seconds, minionInventory)
+
+
+# same as simulate_unloaded_minion_output, but for several durations at once
+# the duration-independent work (drops, upgrades, fuel, item prices, minion cost) only happens once
+# each duration gets its own empty inventory
+def simulate_unloaded_minion_output_multi(minion: MinionBase, minion_level: int, fuel: None | MinionFuelType, hopper: None | MinionHopperType, item_1:None | MinionItemType, item_2:None | MinionItemType, storage: None | MinionStorageType, mithril_infusion: bool, free_will: bool, postcard:bool, beacon_percent_boost: int, pet_bonus_percent: int, crystal_bonus_percent: int, seconds_list: list[int]) -> list[MinionSimulationOutput]:
+    setup = setup_unloaded_minion_simulation(minion, minion_level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent)
+    return [simulate_unloaded_minion_setup(setup, seconds) for seconds in seconds_list]
+
+
+def setup_unloaded_minion_simulation(minion: MinionBase, minion_level: int, fuel: None | MinionFuelType, hopper: None | MinionHopperType, item_1:None | MinionItemType, item_2:None | MinionItemType, storage: None | MinionStorageType, mithril_infusion: bool, free_will: bool, postcard:bool, beacon_percent_boost: int, pet_bonus_percent: int, crystal_bonus_percent: int) -> UnloadedMinionSimulationSetup:
+    
+    profile = minion.profile
     
-    outputs_per_cycle:dict[str, float] = {}
+    # minion drops
+    outputs_per_cycle:dict[str, float] = dict(profile.drops_per_cycle)
     outputs_per_cycle_not_multiplied:dict[str, float] = {}
     outputs_per_day:dict[str, float] = {}
     minion_speed_percentage = 100
     
-    # parse minion drops
-    for action in minion.actions:
-        if action.drops:
-            for drop in action.drops:
-                if drop.item not in outputs_per_cycle:
-                    outputs_per_cycle[drop.item] = 0
-                outputs_per_cycle[drop.item] += drop.amount * (drop.percentage/100)
-    
     
     # handle minion upgrades
     if mithril_infusion: minion_speed_percentage += 10
@@ -375,19 +411,18 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
             if "Sulphur" not in outputs_per_cycle:
                 outputs_per_cycle["Sulphur"] = 0
             
-            for action in minion.actions:
-                if action.drops:
-                    
-                    # SPECIAL CASE: slimes have a special calculation (do other minions?)
-                    # PENDING MORE TESTING...
-                    if minion.name == "Slime" and False:
+            # SPECIAL CASE: slimes have a special calculation (do other minions?)
+            # PENDING MORE TESTING...
+            if minion.name == "Slime" and False:
+                for action in minion.actions:
+                    if action.drops:
                         for drop in action.drops:
                             outputs_per_cycle["Corrupted Fragment"] += 1 * (drop.percentage / 100)
                             outputs_per_cycle["Sulphur"] += 1 * (drop.percentage / 100)
-                    # and everyone else gets 1
-                    else:
-                        outputs_per_cycle["Corrupted Fragment"] = 1
-                        outputs_per_cycle["Sulphur"] = 1
+            # and everyone else gets 1
+            elif profile.has_drops:
+                outputs_per_cycle["Corrupted Fragment"] = 1
+                outputs_per_cycle["Sulphur"] = 1
                         
         elif item.name == "Berberis Fuel Injector":
             # one berberis is generated every 5 minutes (300 seconds)
@@ -424,6 +459,103 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
             #         outputs_per_cycle[converted_item.output_item] = outputs_per_cycle[item] / converted_item.input_count
             #         del outputs_per_cycle[item]
             #         inventory_slots_required_for_crafting += 1
+    
+    seconds_per_cycle = (profile.seconds_per_action[minion_level-1]) * 2
+    
+    costs = price_minion_setup(minion, minion_level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost)
+    
+    setup = UnloadedMinionSimulationSetup(
+        minion=minion,
+        minion_level=minion_level,
+        fuel=fuel,
+        hopper=hopper,
+        item_1=item_1,
+        item_2=item_2,
+        storage=storage,
+        beacon_percent_boost=beacon_percent_boost,
+        outputs_per_cycle=outputs_per_cycle,
+        outputs_per_cycle_not_multiplied=outputs_per_cycle_not_multiplied,
+        outputs_per_day=outputs_per_day,
+        minion_speed_percentage=minion_speed_percentage,
+        seconds_per_cycle=seconds_per_cycle,
+        costs=costs,
+    )
+    return setup
+
+
+def price_minion_setup(minion: MinionBase, minion_level: int, fuel: None | MinionFuelType, hopper: None | MinionHopperType, item_1:None | MinionItemType, item_2:None | MinionItemType, storage: None | MinionStorageType, mithril_infusion: bool, free_will: bool, postcard:bool, beacon_percent_boost: int) -> MinionSetupCosts:
+    fuel_bz_buy_price = None
+    if fuel and fuel.duration_hours:
+        fuel_bz_buy_price = skyblock_items.search_by_name(fuel.name).bz_buy_price
+    
+    crystal_cost_24hrs_per_minion = 0
+    if beacon_percent_boost:
+        if beacon_percent_boost % 2 == 0:
+            crystal = skyblock_items.search_by_name("Power Crystal")
+        else:
+            crystal = skyblock_items.search_by_name("Scorched Power Crystal")
+        crystal_cost_24hrs_per_minion = (crystal.bz_sell_price / 2) / MINION_COUNT
+    
+    # generate minion cost taking into account minion level materials, items, hopper, and postcard
+    minion_cost_total = 0
+    minion_cost_recoverable = 0
+    minion_cost_non_recoverable = 0
+    
+    # Calculate setup cost for all level materials at once
+            
+    minion_cost_non_recoverable += minion.get_cumulative_level_costs(minion_level, skyblock_items)
+    
+    if fuel != None and fuel.duration_hours == None: 
+        item = skyblock_items.search_by_name(fuel.name)
+        if item.bz_sell_price == None:
+            skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable += item.lowest_price()
+        
+    if hopper: minion_cost_recoverable += skyblock_items.search_by_name(hopper.name).bz_sell_price
+    if item_1: minion_cost_recoverable += skyblock_items.search_by_name(item_1.name).bz_sell_price
+    if item_2: minion_cost_recoverable += skyblock_items.search_by_name(item_2.name).bz_sell_price
+    if storage: minion_cost_recoverable += skyblock_items.search_by_name(f"{storage.name} Storage").bz_sell_price
+    if mithril_infusion: minion_cost_non_recoverable += skyblock_items.search_by_name("Mithril Infusion").bz_sell_price
+    
+    # yes it's not a 100% chance but it's close enough and you recover the price by selling the postcard
+    if free_will: minion_cost_non_recoverable += skyblock_items.search_by_name("Free Will").bz_sell_price
+    
+    if postcard: 
+        item = skyblock_items.search_by_name("Postcard")
+        skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable += item.lowest_price() / MINION_COUNT # 80m / 29 minions
+        
+    if beacon_percent_boost > 0:
+        item = skyblock_items.search_by_name("Beacon V")
+        skyblock_items.attempt_fetch_auction_data(item)
+        minion_cost_recoverable += item.lowest_price() / MINION_COUNT
+    
+    # ignoring cost of pet and crystal here
+    
+    minion_cost_total = minion_cost_recoverable + minion_cost_non_recoverable
+    
+    return MinionSetupCosts(
+        fuel_bz_buy_price=fuel_bz_buy_price,
+        crystal_cost_24hrs_per_minion=crystal_cost_24hrs_per_minion,
+        minion_cost_total=minion_cost_total,
+        minion_cost_recoverable=minion_cost_recoverable,
+        minion_cost_non_recoverable=minion_cost_non_recoverable,
+    )
+
+
+def simulate_unloaded_minion_setup(setup: UnloadedMinionSimulationSetup, seconds: int, minionInventory=None) -> MinionSimulationOutput:
+    minion = setup.minion
+    fuel = setup.fuel
+    hopper = setup.hopper
+    item_1 = setup.item_1
+    item_2 = setup.item_2
+    
+    # copied because running out of fuel changes them
+    outputs_per_cycle = dict(setup.outputs_per_cycle)
+    outputs_per_cycle_not_multiplied = setup.outputs_per_cycle_not_multiplied
+    outputs_per_day = setup.outputs_per_day
+    minion_speed_percentage = setup.minion_speed_percentage
+    
     # some fuel calculation
     fuel_runs_out = False
     if fuel == None:
@@ -437,7 +569,7 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
     # calculate outputs for the time period
     item_drops = {}
     
-    seconds_per_cycle = (minion.levels[minion_level-1].seconds_per_action) * 2
+    seconds_per_cycle = setup.seconds_per_cycle
     
     if not fuel_runs_out:
         # the happy path
@@ -542,10 +674,8 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
     # put items into inventory
     if minionInventory is None:
         minionInventory = MinionInventory(
-            slots=minion.levels[minion_level-1].inventory_slots, 
-            storage=storage, )
-    
-    hopper_money = 0
+            slots=minion.profile.inventory_slots[setup.minion_level-1], 
+            storage=setup.storage, )
     
     compacted_item_drops_list = [[item, amount] for item, amount in compacted_item_drops.items()]
     not_put_in_inventory_1 = minionInventory.put_items_in_inventory(compacted_item_drops_list)
@@ -563,51 +693,32 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
         not_put_in_inventory = not_put_in_inventory_1
         
     
-    lost_items = {}
-    hopper_items = {}
-        
-    # if there are items that couldn't fit in the inventory
-    # then we need to see if they would be sold by hopper
-    if not_put_in_inventory != {}:
-        hopper_value = 0
+    inventory_full = not_put_in_inventory != {}
+    
+    return price_unloaded_minion_output(setup.costs, fuel, hopper, setup.beacon_percent_boost, seconds, minion_speed_percentage, raw_item_drops, minionInventory.get_inventory_items(), not_put_in_inventory, inventory_full, fuel_runs_out)
 
-        for item, amount in not_put_in_inventory.items():
-            sb_item = skyblock_items.search_by_name(item)
-            hopper_value += sb_item.npc_sell_price * amount
 
-        if hopper != None:
-            hopper_money = hopper_value * (hopper.sell_percentage / 100)
-            hopper_items = not_put_in_inventory
-        else:
-            lost_items = not_put_in_inventory
-    
-    cost_of_fuel = 0
+# how many fuel items get used up in that time (nothing for fuels that last forever)
+def fuel_items_used(fuel: None | MinionFuelType, seconds: int) -> dict[str, float]:
     if fuel and fuel.duration_hours:
-        sb_item = skyblock_items.search_by_name(fuel.name)
-        # calculate how many fuels would be used in this time period
-        # fuel.length_in_seconds is how long one fuel lasts
-        cost_of_fuel = (float(seconds) / float(fuel.duration_hours*60*60)) * sb_item.bz_buy_price
-    
-    # ASSUMPTION: you have 29 minion slots.
-    # yes, the cap is 31 but that requires grinding slayer and nether and pelts
-    # treat it as some extra cash
-    MINION_COUNT = 29
-    if beacon_percent_boost:
-        if beacon_percent_boost % 2 == 0:
-            crystal = skyblock_items.search_by_name("Power Crystal")
-        else:
-            crystal = skyblock_items.search_by_name("Scorched Power Crystal")
-        crystal_cost_24hrs_per_minion = (crystal.bz_sell_price / 2) / MINION_COUNT
-        cost_of_fuel += crystal_cost_24hrs_per_minion * (seconds / 86400)
-        
-    
-    # CALCULATE PRICE OF INVENTORY
+        return {fuel.name: float(seconds) / float(fuel.duration_hours*60*60)}
+    return {}
+
+
+@dataclass
+class InventoryValue:
+    sell_order_to_bz: float
+    instant_sold_to_bz: float
+    sold_to_npc: float
+    sold_optimally: float
+
+
+def value_inventory(inventory_items: dict[str, int]) -> InventoryValue:
     coins_if_inventory_sell_order_to_bz=0
     coins_if_inventory_instant_sold_to_bz=0
     coins_if_inventory_sold_to_npc=0
     coins_if_inventory_sold_optimally=0
     
-    inventory_items = minionInventory.get_inventory_items()
     for item in inventory_items:
         sb_item = skyblock_items.search_by_name(item)
         npc = sb_item.npc_sell_price * inventory_items[item]
@@ -625,54 +736,67 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
         coins_if_inventory_sell_order_to_bz += sell_order
         coins_if_inventory_sold_optimally += max(npc, instant_sell, sell_order)
     
-    # coins_per_day = int(((coins_if_inventory_sold_to_npc+hopper_money) / seconds) * 86400)
-    # generate profit per day
-    profit_24h_if_inventory_sold_to_npc = int(((coins_if_inventory_sold_to_npc+hopper_money-cost_of_fuel) / seconds) * 86400)
-    profit_24h_if_inventory_instant_sold_to_bz = int(((coins_if_inventory_instant_sold_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400)
-    profit_24h_if_inventory_sell_order_to_bz = int(((coins_if_inventory_sell_order_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400)
-    profit_24h_if_inventory_sold_optimally = int(((coins_if_inventory_sold_optimally+hopper_money-cost_of_fuel) / seconds) * 86400)
-    profit_24h_only_hopper = int((hopper_money-cost_of_fuel) / seconds * 86400)
-    
-    # some other stuff
-    inventory_full = not_put_in_inventory != {}
-    
-    # generate minion cost taking into account minion level materials, items, hopper, and postcard
-    minion_cost_total = 0
-    minion_cost_recoverable = 0
-    minion_cost_non_recoverable = 0
+    return InventoryValue(coins_if_inventory_sell_order_to_bz, coins_if_inventory_instant_sold_to_bz, coins_if_inventory_sold_to_npc, coins_if_inventory_sold_optimally)
+
+
+# npc value of the items that didn't fit in the inventory
+def value_hopper_items(not_put_in_inventory: dict[str, int]) -> float:
+    hopper_value = 0
+
+    for item, amount in not_put_in_inventory.items():
+        sb_item = skyblock_items.search_by_name(item)
+        hopper_value += sb_item.npc_sell_price * amount
     
-    # Calculate setup cost for all level materials at once
-            
-    minion_cost_non_recoverable += minion.get_cumulative_level_costs(minion_level, skyblock_items)
+    return hopper_value
+
+
+# everything that depends on prices, from the physical outputs of a simulation
+# (so a simulation can be repriced without simulating it again)
+def price_unloaded_minion_output(costs: MinionSetupCosts, fuel: None | MinionFuelType, hopper: None | MinionHopperType, beacon_percent_boost: int, seconds: int, minion_speed_percentage: float, raw_item_drops: dict[str, int], inventory_items: dict[str, int], not_put_in_inventory: dict[str, int], inventory_full: bool, fuel_runs_out: bool) -> MinionSimulationOutput:
+    hopper_money = 0
     
-    if fuel != None and fuel.duration_hours == None: 
-        item = skyblock_items.search_by_name(fuel.name)
-        if item.bz_sell_price == None:
-            skyblock_items.attempt_fetch_auction_data(item)
-        minion_cost_recoverable += item.lowest_price()
+    lost_items = {}
+    hopper_items = {}
         
-    if hopper: minion_cost_recoverable += skyblock_items.search_by_name(hopper.name).bz_sell_price
-    if item_1: minion_cost_recoverable += skyblock_items.search_by_name(item_1.name).bz_sell_price
-    if item_2: minion_cost_recoverable += skyblock_items.search_by_name(item_2.name).bz_sell_price
-    if storage: minion_cost_recoverable += skyblock_items.search_by_name(f"{storage.name} Storage").bz_sell_price
-    if mithril_infusion: minion_cost_non_recoverable += skyblock_items.search_by_name("Mithril Infusion").bz_sell_price
+    # if there are items that couldn't fit in the inventory
+    # then we need to see if they would be sold by hopper
+    if not_put_in_inventory != {}:
+        hopper_value = value_hopper_items(not_put_in_inventory)
+
+        if hopper != None:
+            hopper_money = hopper_value * (hopper.sell_percentage / 100)
+            hopper_items = not_put_in_inventory
+        else:
+            lost_items = not_put_in_inventory
     
-    # yes it's not a 100% chance but it's close enough and you recover the price by selling the postcard
-    if free_will: minion_cost_non_recoverable += skyblock_items.search_by_name("Free Will").bz_sell_price
+    cost_of_fuel = 0
+    if fuel and fuel.duration_hours:
+        # calculate how many fuels would be used in this time period
+        # fuel.length_in_seconds is how long one fuel lasts
+        cost_of_fuel = (float(seconds) / float(fuel.duration_hours*60*60)) * costs.fuel_bz_buy_price
     
-    if postcard: 
-        item = skyblock_items.search_by_name("Postcard")
-        skyblock_items.attempt_fetch_auction_data(item)
-        minion_cost_recoverable += item.lowest_price() / MINION_COUNT # 80m / 29 minions
+    if beacon_percent_boost:
+        cost_of_fuel += costs.crystal_cost_24hrs_per_minion * (seconds / 86400)
         
-    if beacon_percent_boost > 0:
-        item = skyblock_items.search_by_name("Beacon V")
-        skyblock_items.attempt_fetch_auction_data(item)
-        minion_cost_recoverable += item.lowest_price() / MINION_COUNT
     
-    # ignoring cost of pet and crystal here
+    # CALCULATE PRICE OF INVENTORY
+    inventory_value = value_inventory(inventory_items)
+    coins_if_inventory_sell_order_to_bz = inventory_value.sell_order_to_bz
+    coins_if_inventory_instant_sold_to_bz = inventory_value.instant_sold_to_bz
+    coins_if_inventory_sold_to_npc = inventory_value.sold_to_npc
+    coins_if_inventory_sold_optimally = inventory_value.sold_optimally
     
-    minion_cost_total = minion_cost_recoverable + minion_cost_non_recoverable
+    # coins_per_day = int(((coins_if_inventory_sold_to_npc+hopper_money) / seconds) * 86400)
+    # generate profit per day
+    profit_24h_if_inventory_sold_to_npc = int(((coins_if_inventory_sold_to_npc+hopper_money-cost_of_fuel) / seconds) * 86400)
+    profit_24h_if_inventory_instant_sold_to_bz = int(((coins_if_inventory_instant_sold_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400)
+    profit_24h_if_inventory_sell_order_to_bz = int(((coins_if_inventory_sell_order_to_bz+hopper_money-cost_of_fuel) / seconds) * 86400)
+    profit_24h_if_inventory_sold_optimally = int(((coins_if_inventory_sold_optimally+hopper_money-cost_of_fuel) / seconds) * 86400)
+    profit_24h_only_hopper = int((hopper_money-cost_of_fuel) / seconds * 86400)
+    
+    minion_cost_total = costs.minion_cost_total
+    minion_cost_recoverable = costs.minion_cost_recoverable
+    minion_cost_non_recoverable = costs.minion_cost_non_recoverable
     
     # generate cash / day
 
@@ -701,7 +825,7 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
         seconds=seconds,
         percentage_boost=minion_speed_percentage,
         raw_item_drops=raw_item_drops,
-        in_inventory=minionInventory.get_inventory_items(),
+        in_inventory=inventory_items,
         
         # lost_items=lost_items,
         sold_to_hopper=hopper_items,
@@ -740,6 +864,266 @@ def simulate_unloaded_minion_output(minion: MinionBase, minion_level: int, fuel:
             
     pass
 
+
+# ============== FILL TIMELINE ==============
+# when things happen to an unloaded minion, worked out from how fast it makes each item instead of simulating
+# fixed durations: the fuel running out, the minion's own slots filling up, the storage's, and every item
+# that stops fitting (from then on a hopper sells it, or it's lost). between those moments the coins it has
+# made go up in a straight line, so the earnings are a piecewise linear curve and any duration is a lookup.
+# production is continuous here: while the fuel lasts the fueled rates count, after that the unfueled ones
+# (the fixed durations only count the time after the fuel ran out, see simulate_unloaded_minion_setup), and
+# slots fill one stack at a time as the items come (MinionInventory shares out the empty slots instead).
+# so these times are estimates, a fixed duration's inventory_full can say otherwise
+
+# fuels that multiply the drops instead of speeding the minion up
+DROP_MULTIPLIERS = {"Tasty Cheese": 2, "Catalyst": 3, "Hyper Catalyst": 4}
+
+
+# (speed boost, drop multiplier) a fuel gives while it lasts, the same numbers setup_unloaded_minion_simulation uses
+def fuel_effect(minion: MinionBase, fuel: None | MinionFuelType) -> tuple[float, int]:
+    if fuel is None:
+        return 0, 1
+    if not fuel.special_case:
+        return fuel.percentage_boost, 1
+    if fuel.name == "Everburning Flame":
+        return 35 + (5 if minion.skill_type == "combat" else 0), 1
+    return 0, DROP_MULTIPLIERS.get(fuel.name, 1)
+
+
+# (compactor, super compactor), the same checks as simulate_unloaded_minion_setup
+def compactors(item_1: None | MinionItemType, item_2: None | MinionItemType) -> tuple[bool, bool]:
+    names = {item.name for item in (item_1, item_2) if item}
+    return "Compactor" in names, bool(names & {"Super Compactor 3000", "Dwarven Super Compactor 3000"})
+
+
+# what a dropped item ends up as in the inventory, from the dropped item to the most compacted one:
+# (item, how many dropped items one of it takes, how many of it stay behind at most (None: it isn't compacted))
+def compaction_forms(item: str, compactor: bool, super_compactor: bool) -> list[tuple[str, int, None | int]]:
+    forms = []
+    per_item = 1
+    while True:
+        # a super compactor compacts twice (enchanted iron -> enchanted iron blocks), a compactor once
+        if super_compactor and len(forms) < 2 and is_super_compactable(item):
+            recipe = convert_to_super_compacted(item)
+        elif compactor and not forms and is_compactable(item):
+            recipe = convert_to_compacted(item)
+        else:
+            forms.append((item, per_item, None))
+            return forms
+        forms.append((item, per_item, recipe.input_count - 1))
+        per_item *= recipe.input_count
+        item = recipe.output_item
+
+
+# items per second (while fueled, once the fuel ran out), from the per cycle/per day drops of a setup
+# (an item in several of them only gets the last one, like simulate_unloaded_minion_setup)
+def production_rates(outputs_per_cycle: dict[str, float], outputs_per_cycle_without_fuel: dict[str, float], outputs_per_cycle_not_multiplied: dict[str, float], outputs_per_day: dict[str, float], seconds_per_cycle: float, minion_speed_percentage: float, speed_without_fuel: float) -> tuple[dict[str, float], dict[str, float]]:
+    cycle = seconds_per_cycle / (minion_speed_percentage/100)
+    cycle_without_fuel = seconds_per_cycle / (speed_without_fuel/100)
+    
+    rates, rates_without_fuel = {}, {}
+    for item in outputs_per_cycle:
+        rates[item] = outputs_per_cycle[item] / cycle
+        rates_without_fuel[item] = outputs_per_cycle_without_fuel[item] / cycle_without_fuel
+    for item in outputs_per_cycle_not_multiplied:
+        rates[item] = outputs_per_cycle_not_multiplied[item] / cycle
+        rates_without_fuel[item] = outputs_per_cycle_not_multiplied[item] / cycle_without_fuel
+    for item in outputs_per_day:
+        rates[item] = rates_without_fuel[item] = outputs_per_day[item] / 86400
+    return rates, rates_without_fuel
+
+
+# when `amount` of an item has been made (inf if never)
+def _seconds_until_made(amount: float, rate: float, rate_without_fuel: float, fuel_seconds: None | float) -> float:
+    if fuel_seconds is None or amount <= rate * fuel_seconds:
+        return amount / rate if rate > 0 else inf
+    if rate_without_fuel <= 0:
+        return inf
+    return fuel_seconds + (amount - rate * fuel_seconds) / rate_without_fuel
+
+
+@dataclass
+class InventoryFill:
+    main_slots_full: None | float # every slot of the minion itself has something in it
+    storage_slots_full: None | float # and every slot of the storage (None without one)
+    full: None | float # the first item that doesn't fit anymore
+    # (seconds, dropped item, the form of it that doesn't fit) for every item that stops fitting, in order.
+    # from then on what the minion makes of that item goes to the hopper as that form
+    stops_fitting: list[tuple[float, str, str]]
+    
+    # in whole seconds, the stored (estimated) column
+    def seconds_until_full(self) -> None | int:
+        return None if self.full is None else ceil(self.full)
+
+
+# an item takes another slot once there's one more of it than its stacks of 64 hold. the forms of a dropped
+# item fill up in order (the leftovers first), so the slots of the inventory get taken in the order those
+# moments come. once a slot is needed and there's none left the item stops fitting, and the slots it already
+# has don't change anymore. leftovers of a compactor take the most slots they ever need (159 enchanted
+# mutton: 3), so with one `full` is the earliest something can stop fitting, without one it's exact
+def solve_inventory_fill(rates: dict[str, float], rates_without_fuel: dict[str, float], fuel_seconds: None | float, compactor: bool, super_compactor: bool, main_slots: int, storage_slots: int) -> InventoryFill:
+    slots = main_slots + storage_slots
+    
+    chains = [(item, compaction_forms(item, compactor, super_compactor)) for item in rates]
+    openings = []
+    for c, (item, forms) in enumerate(chains):
+        for f, (form, per_item, kept) in enumerate(forms):
+            # more than every slot of the inventory can't matter
+            stacks = slots + 1 if kept is None else min(slots + 1, -(-kept // 64))
+            for k in range(stacks):
+                seconds = _seconds_until_made((64*k + 1) * per_item, rates[item], rates_without_fuel[item], fuel_seconds)
+                if seconds == inf:
+                    break
+                openings.append((seconds, c, f))
+    openings.sort()
+    
+    taken = 0
+    main_slots_full, storage_slots_full, full = None, None, None
+    stopped: set[int] = set()
+    stops_fitting = []
+    for seconds, c, f in openings:
+        if c in stopped:
+            continue
+        if taken < slots:
+            taken += 1
+            if taken == main_slots:
+                main_slots_full = seconds
+            if storage_slots and taken == slots:
+                storage_slots_full = seconds
+        else:
+            stopped.add(c)
+            item, forms = chains[c]
+            stops_fitting.append((seconds, item, forms[f][0]))
+            if full is None:
+                full = seconds
+    
+    return InventoryFill(main_slots_full, storage_slots_full, full, stops_fitting)
+
+
+@dataclass
+class EarningsCurve:
+    # one piece per entry, the first one starts at 0 and the last one goes on forever
+    starts: list[float]
+    inventory: list[float] # what the inventory is worth instant sold to the bazaar, at the start of the piece
+    hopper: list[float] # coins the hopper made by then
+    costs: list[float] # fuel and beacon crystals used up by then
+    inventory_per_second: list[float]
+    hopper_per_second: list[float]
+    costs_per_second: float
+    
+    # coins after running for `seconds` (no re-simulating, just finding the piece)
+    def at(self, seconds: float) -> dict[str, float]:
+        i = bisect_right(self.starts, seconds) - 1
+        since = seconds - self.starts[i]
+        inventory = self.inventory[i] + self.inventory_per_second[i] * since
+        hopper = self.hopper[i] + self.hopper_per_second[i] * since
+        costs = self.costs[i] + self.costs_per_second * since
+        profit_24h = (inventory + hopper - costs) / seconds * 86400 if seconds else 0.0
+        return {"seconds": seconds, "inventory": inventory, "hopper": hopper, "costs": costs, "profit_24h": profit_24h}
+
+
+# the earnings curve of a fill: pieces start at 0, when the fuel runs out and whenever an item stops fitting
+def earnings_curve(fill: InventoryFill, rates: dict[str, float], rates_without_fuel: dict[str, float], fuel_seconds: None | float, compactor: bool, super_compactor: bool, hopper: None | MinionHopperType, costs_per_second: float) -> EarningsCurve:
+    hopper_percentage = hopper.sell_percentage if hopper != None else 0
+    
+    # coins per dropped item while it fits (as its most compacted form) and once it doesn't (hopper)
+    inventory_value: dict[str, float] = {}
+    for item in rates:
+        form, per_item, _ = compaction_forms(item, compactor, super_compactor)[-1]
+        bz_sell_price = skyblock_items.search_by_name(form).bz_sell_price
+        inventory_value[item] = (bz_sell_price or 0) / per_item
+    hopper_value: dict[str, float] = {}
+    for _, item, form in fill.stops_fitting:
+        per_item = next(per_item for name, per_item, _ in compaction_forms(item, compactor, super_compactor) if name == form)
+        hopper_value[item] = skyblock_items.search_by_name(form).npc_sell_price * (hopper_percentage / 100) / per_item
+    
+    starts = sorted({0.0} | ({fuel_seconds} if fuel_seconds else set()) | {seconds for seconds, _, _ in fill.stops_fitting})
+    curve = EarningsCurve([], [], [], [], [], [], costs_per_second)
+    inventory, hopper_coins = 0.0, 0.0
+    for start in starts:
+        if curve.starts:
+            since = start - curve.starts[-1]
+            inventory += curve.inventory_per_second[-1] * since
+            hopper_coins += curve.hopper_per_second[-1] * since
+        
+        stopped = {item for seconds, item, _ in fill.stops_fitting if seconds <= start}
+        fueled = fuel_seconds is None or start < fuel_seconds
+        inventory_per_second, hopper_per_second = 0.0, 0.0
+        for item in rates:
+            rate = rates[item] if fueled else rates_without_fuel[item]
+            if item in stopped:
+                hopper_per_second += rate * hopper_value[item]
+            else:
+                inventory_per_second += rate * inventory_value[item]
+        
+        curve.starts.append(start)
+        curve.inventory.append(inventory)
+        curve.hopper.append(hopper_coins)
+        curve.costs.append(costs_per_second * start)
+        curve.inventory_per_second.append(inventory_per_second)
+        curve.hopper_per_second.append(hopper_per_second)
+    return curve
+
+
+@dataclass
+class InventoryTimeline:
+    fuel_runs_out: None | float
+    fill: InventoryFill
+    curve: EarningsCurve
+
+
+# how long the fuel of a setup lasts (None if forever), you always put in 64 of them
+def fuel_seconds(fuel: None | MinionFuelType) -> None | float:
+    if fuel and fuel.duration_hours:
+        return (fuel.duration_hours * 60*60) * 64
+    return None
+
+
+# items per second of a setup, see production_rates
+def setup_production_rates(setup: UnloadedMinionSimulationSetup) -> tuple[dict[str, float], dict[str, float]]:
+    boost, multiplier = fuel_effect(setup.minion, setup.fuel)
+    outputs_per_cycle_without_fuel = {item: amount / multiplier for item, amount in setup.outputs_per_cycle.items()} if multiplier != 1 else setup.outputs_per_cycle
+    return production_rates(setup.outputs_per_cycle, outputs_per_cycle_without_fuel, setup.outputs_per_cycle_not_multiplied, setup.outputs_per_day, setup.seconds_per_cycle, setup.minion_speed_percentage, setup.minion_speed_percentage - boost)
+
+
+def _setup_inventory_fill(setup: UnloadedMinionSimulationSetup, rates: dict[str, float], rates_without_fuel: dict[str, float]) -> InventoryFill:
+    storage_slots = setup.storage.inventory_slots if setup.storage else 0
+    return solve_inventory_fill(rates, rates_without_fuel, fuel_seconds(setup.fuel), *compactors(setup.item_1, setup.item_2), setup.minion.profile.inventory_slots[setup.minion_level-1], storage_slots)
+
+
+def setup_inventory_fill(setup: UnloadedMinionSimulationSetup) -> InventoryFill:
+    return _setup_inventory_fill(setup, *setup_production_rates(setup))
+
+
+def inventory_timeline(setup: UnloadedMinionSimulationSetup) -> InventoryTimeline:
+    rates, rates_without_fuel = setup_production_rates(setup)
+    fill = _setup_inventory_fill(setup, rates, rates_without_fuel)
+    
+    # fuel and crystals are paid for as they're used, like price_unloaded_minion_output
+    costs_per_second = 0.0
+    if setup.fuel and setup.fuel.duration_hours:
+        costs_per_second += setup.costs.fuel_bz_buy_price / float(setup.fuel.duration_hours*60*60)
+    if setup.beacon_percent_boost:
+        costs_per_second += setup.costs.crystal_cost_24hrs_per_minion / 86400
+    
+    curve = earnings_curve(fill, rates, rates_without_fuel, fuel_seconds(setup.fuel), *compactors(setup.item_1, setup.item_2), setup.hopper, costs_per_second)
+    return InventoryTimeline(fuel_seconds(setup.fuel), fill, curve)
+
+
+# what the batch engine (batch.py), the upper bounds (bounds.py) and repricing price with
+_price_vectors: PriceVectors = None
+
+# price vectors for the current skyblock_items
+def get_price_vectors() -> PriceVectors:
+    global _price_vectors
+    if _price_vectors is None or _price_vectors.skyblock_items is not skyblock_items:
+        sweep_profile.count("price vectors cache miss")
+        _price_vectors = PriceVectors(skyblock_items)
+    else:
+        sweep_profile.count("price vectors cache hit")
+    return _price_vectors
+
+
 @dataclass
 class MinionCombinationSimulationResults:
     minion: str
@@ -763,10 +1147,28 @@ class MinionCombinationSimulationResults:
         return json.dumps(self, default=lambda k: k.__dict__, indent=4)
 
 
-simulation_outputs: list[MinionSimulationResult] = []
-id: int = 0
+# the grid of the sweep, next to MINIONS, FUEL_TYPES, ITEMS, STORAGES and HOPPERS. a SweepSpec picks a
+# subset of it (see SWEEP SPEC below)
+UPGRADE_CHOICES = [False, True] # mithril infusion, free will, postcard
+BEACON_PERCENT_BOOSTS = [0, 10, 11]
+#TIME_INCREMENTS = [60*5, 60*60, 60*60*6, 60*60*12, 60*60*24, 60*60*48, 60*60*24*7, 60*60*24*14, 60*60*24*365]
+TIME_INCREMENTS = [60*60, 60*60*24, 60*60*48, 60*60*24*7, 60*60*24*14, 60*60*24*124]
 
-for minion in MINIONS:
+
+def minion_levels(minion: MinionBase) -> list[int]:
+    # if the final level requires non-cash grind then we should also show the t11 version
+    # for now only sheep minion
+    if minion.name == "Sheep":
+        return [len(minion.levels)-1, len(minion.levels)]
+    
+    # if minion.name == "Magma Cube":
+    #     levels = [7, 9, 12]
+    return [len(minion.levels)]
+
+
+# every configuration of one minion that the sweep simulates, as simulate_unloaded_minion_output_batch configurations
+# the order here decides the row ids, so don't reorder the loops. levels: only those levels (level_configurations)
+def generate_configurations(minion: MinionBase, levels: Optional[list[int]] = None) -> Iterator[tuple]:
     
         
     for fuel in FUEL_TYPES:
@@ -802,22 +1204,7 @@ for minion in MINIONS:
                 
                 for storage in STORAGES:
                     
-                    
-                    # if the final level requires non-cash grind then we should also show the t11 version
-                    # for now only sheep minion
-                    levels = [len(minion.levels)]
-                    if minion.name == "Sheep":
-                        levels = [len(minion.levels)-1, len(minion.levels)]
-                        
-                    # if minion.name == "Magma Cube":
-                    #     levels = [7, 9, 12]
-                    
-                    # if 7 not in levels:
-                    #     levels.append(7)
-                    # if 9 not in levels:
-                    #     levels.append(9)
-                    
-                    for level in levels:
+                    for level in minion_levels(minion) if levels is None else levels:
                         
                         
                         for pet_bonus_percent in [0]: #, True]: // pet bonus don't work offline
@@ -837,117 +1224,729 @@ for minion in MINIONS:
                                 # crystal_bonus_percent = minion.crystal_bonus_percentage
                                 
                                 
-                                for mithril_infusion in [False, True]:
-                                    for free_will in [False, True]:
-                                        for postcard in [False, True]:
-                                            for beacon_percent_boost in [0, 10, 11]:
+                                for mithril_infusion in UPGRADE_CHOICES:
+                                    for free_will in UPGRADE_CHOICES:
+                                        for postcard in UPGRADE_CHOICES:
+                                            for beacon_percent_boost in BEACON_PERCENT_BOOSTS:
                                                 
                                                 for hopper in HOPPERS:
-                                            
-                                                    #time_increments = [60*5, 60*60, 60*60*6, 60*60*12, 60*60*24, 60*60*48, 60*60*24*7, 60*60*24*14, 60*60*24*365]
-                                                    
-                                                    time_increments = [60*60, 60*60*24, 60*60*48, 60*60*24*7, 60*60*24*14, 60*60*24*124]
                                                     
-                                                    for seconds in time_increments:
-                                                        sim = simulate_unloaded_minion_output(minion, level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus, seconds)
-                                                        
-                                                        a = MinionSimulationResult(
-                                                            id=id,
-                                                            minion=minion.name,
-                                                            minion_level=level,
-                                                            fuel=fuel.name if fuel else None,
-                                                            hopper=hopper.name if hopper else None,
-                                                            item_1=item_1.name if item_1 else None,
-                                                            item_2=item_2.name if item_2 else None,
-                                                            storagetype=storage.name if storage else None,
-                                                            mithril_infusion=mithril_infusion,
-                                                            free_will=free_will,
-                                                            postcard=postcard,
-                                                            beacon_boost_percent=beacon_percent_boost,
-                                                            pet_bonus_percent=pet_bonus_percent,
-                                                            crystal_bonus_percent=crystal_bonus_percent,
-                                                            
-                                                            seconds=seconds,
-                                                            percentage_boost=sim.percentage_boost,
-                                                            raw_item_drops=str(sim.raw_item_drops),
-                                                            in_inventory=str(sim.in_inventory),
-                                                            sold_to_hopper=str(sim.sold_to_hopper),
-                                                            hopper_coins=sim.hopper_coins,
-                                                            coins_if_inventory_sell_order_to_bz=sim.coins_if_inventory_sell_order_to_bz,
-                                                            coins_if_inventory_instant_sold_to_bz=sim.coins_if_inventory_instant_sold_to_bz,
-                                                            coins_if_inventory_sold_to_npc=sim.coins_if_inventory_sold_to_npc,
-                                                            coins_if_inventory_sold_optimally=sim.coins_if_inventory_sold_optimally,
-                                                            profit_24h_if_inventory_sell_order_to_bz=sim.profit_24h_if_inventory_sell_order_to_bz,
-                                                            profit_24h_if_inventory_instant_sold_to_bz=sim.profit_24h_if_inventory_instant_sold_to_bz,
-                                                            profit_24h_if_inventory_sold_to_npc=sim.profit_24h_if_inventory_sold_to_npc,
-                                                            profit_24h_if_inventory_sold_optimally=sim.profit_24h_if_inventory_sold_optimally,
-                                                            profit_24h_only_hopper=sim.profit_24h_only_hopper,
-                                                            APR_if_inventory_sell_order_to_bz=sim.APR_if_inventory_sell_order_to_bz,
-                                                            APR_only_hopper=sim.APR_only_hopper,
-                                                            cost_of_fuel=sim.cost_of_fuel,
-                                                            inventory_full=sim.inventory_full,
-                                                            fuel_empty=sim.fuel_empty,
-                                                            minion_cost_total=sim.minion_cost_total,
-                                                            minion_cost_non_recoverable=sim.minion_cost_non_recoverable,
-                                                            minion_cost_recoverable=sim.minion_cost_recoverable,
-                                                        )
-                                                        id+=1
-                                                        if id % 5000 == 0:
-                                                            print(f"{id} combinations generated.")
-                                                        
-                                                        simulation_outputs.append(a)
+                                                    for seconds in TIME_INCREMENTS:
+                                                        yield (minion, level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus, seconds)
                                                         
                                                         # m.time_combinations.append(sim)
                                         
                                                     
                                                     # print(json.dumps(m, default=lambda k: k.__dict__, indent=4))
                                                     # input()
-                            
 
-print(f"{len(simulation_outputs)} combinations generated.")
+
+# how many configurations generate_configurations has inside its level loop, for one fuel, items and storage
+def configurations_per_level() -> int:
+    return len(UPGRADE_CHOICES) ** 3 * len(BEACON_PERCENT_BOOSTS) * len(HOPPERS) * len(TIME_INCREMENTS)
 
 
-# decrease size of db we send to client
-if True:
-    for s in simulation_outputs:
-        s.raw_item_drops = ""
-        s.in_inventory = ""
-        s.sold_to_hopper = ""
+# (position in generate_configurations(minion), configuration) of one level, without going through the other levels.
+# the level loop is inside the fuel, item and storage loops, so the level comes in runs of configurations_per_level()
+def level_configurations(minion: MinionBase, level: int) -> Iterator[tuple[int, tuple]]:
+    levels = minion_levels(minion)
+    run = configurations_per_level()
+    offset = levels.index(level) * run
+    for i, configuration in enumerate(generate_configurations(minion, [level])):
+        yield i // run * len(levels) * run + offset + i % run, configuration
+
+
+# ============== SWEEP SPEC ==============
+# A JSON or TOML file that picks part of the grid to sweep, like refreshing one minion after its data
+# changed. Every key is optional and lists the values to keep (left out: all of them):
+#   {"minions": ["Clay"], "fuels": ["Catalyst", "Hyper Catalyst"], "seconds": [86400]}
+# keys: minions, levels, fuels, items (both item slots), storages, hoppers, mithril_infusion, free_will,
+# postcard, beacon_percent_boost, seconds. names are display names, null (or "none", toml has no null)
+# means no fuel/storage/hopper.
+# A spec only selects, configurations keep the row ids they have in the full sweep, so refreshed rows
+# replace their old versions (see save_results).
+
+def _name(x) -> Optional[str]:
+    return x.name if x else None
+
+
+# spec key -> every value the sweep has
+def sweep_grid() -> dict[str, list]:
+    return {
+        "minions": [minion.name for minion in SWEEP_MINIONS],
+        "levels": sorted({level for minion in SWEEP_MINIONS for level in minion_levels(minion)}),
+        "fuels": [_name(fuel) for fuel in FUEL_TYPES],
+        "items": [_name(item) for item in ITEMS],
+        "storages": [_name(storage) for storage in STORAGES],
+        "hoppers": [_name(hopper) for hopper in HOPPERS],
+        "mithril_infusion": UPGRADE_CHOICES,
+        "free_will": UPGRADE_CHOICES,
+        "postcard": UPGRADE_CHOICES,
+        "beacon_percent_boost": BEACON_PERCENT_BOOSTS,
+        "seconds": TIME_INCREMENTS,
+    }
+
+
+@dataclass
+class SweepSpec:
+    # None: everything
+    minions: Optional[list[str]] = None
+    levels: Optional[list[int]] = None
+    fuels: Optional[list[Optional[str]]] = None
+    items: Optional[list[Optional[str]]] = None
+    storages: Optional[list[Optional[str]]] = None
+    hoppers: Optional[list[Optional[str]]] = None
+    mithril_infusion: Optional[list[bool]] = None
+    free_will: Optional[list[bool]] = None
+    postcard: Optional[list[bool]] = None
+    beacon_percent_boost: Optional[list[int]] = None
+    seconds: Optional[list[int]] = None
+    
+    @staticmethod
+    def from_dict(data: dict) -> "SweepSpec":
+        grid = sweep_grid()
+        unknown = [key for key in data if key not in grid]
+        if unknown:
+            raise ValueError(f"Unknown sweep spec keys {unknown}, the keys are {list(grid)}")
         
+        spec = {}
+        for key, values in data.items():
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"Sweep spec '{key}' has to be a list of values (leave it out for all of them)")
+            values = [None if value == "none" else value for value in values]
+            for value in values:
+                # bools are ints to python, don't let 1 pass for True or the other way around
+                if value not in grid[key] or isinstance(value, bool) != isinstance(grid[key][0], bool):
+                    raise ValueError(f"Sweep spec '{key}': {value!r} isn't in the sweep, pick from {grid[key]}")
+            spec[key] = values
+        return SweepSpec(**spec)
+    
+    @staticmethod
+    def load(path: str) -> "SweepSpec":
+        if path.endswith(".toml"):
+            import tomllib
+            with open(path, "rb") as f:
+                return SweepSpec.from_dict(tomllib.load(f))
+        with open(path) as f:
+            return SweepSpec.from_dict(json.load(f))
+    
+    def selects_values(self, minion: str, level: int, fuel: Optional[str], hopper: Optional[str], item_1: Optional[str], item_2: Optional[str], storage: Optional[str], mithril_infusion: bool, free_will: bool, postcard: bool, beacon_percent_boost: int, seconds: int) -> bool:
+        checks = [
+            (self.minions, minion),
+            (self.levels, level),
+            (self.fuels, fuel),
+            (self.hoppers, hopper),
+            (self.items, item_1),
+            (self.items, item_2),
+            (self.storages, storage),
+            (self.mithril_infusion, mithril_infusion),
+            (self.free_will, free_will),
+            (self.postcard, postcard),
+            (self.beacon_percent_boost, beacon_percent_boost),
+            (self.seconds, seconds),
+        ]
+        return all(allowed is None or value in allowed for allowed, value in checks)
+    
+    def selects(self, configuration: tuple) -> bool:
+        c = configuration
+        return self.selects_values(c[0].name, c[1], _name(c[2]), _name(c[3]), _name(c[4]), _name(c[5]), _name(c[6]), c[7], c[8], c[9], c[10], c[13])
+    
+    # a row of the results db (booleans are 0/1 there, which compare equal to False/True)
+    def selects_row(self, row: dict) -> bool:
+        return self.selects_values(row["minion"], row["minion_level"], row["fuel"], row["hopper"], row["item_1"], row["item_2"], row["storagetype"], row["mithril_infusion"], row["free_will"], row["postcard"], row["beacon_boost_percent"], row["seconds"])
 
-# print("Saving to json...")
 
-# filepath = "data/sheep_minion_combinations.json"
-# with open(filepath, 'w') as fi:
-#     json.dump(simulation_outputs, fi, default=lambda k: k.__dict__, indent=4)
-    
-# print(f"Saved to {filepath}.")
+# (id, configuration) of the sweep, or of the part of it spec picks. ids are the row ids of the full sweep
+def sweep_configurations(spec: Optional[SweepSpec] = None) -> Iterator[tuple[int, tuple]]:
+    # a spec that only picks minions doesn't have to look at every configuration
+    filtered = spec is not None and spec != SweepSpec(minions=spec.minions)
+    id = 0
+    for minion in SWEEP_MINIONS:
+        # only counted, so the ids of the next minion stay right
+        skip = spec is not None and spec.minions is not None and minion.name not in spec.minions
+        for configuration in generate_configurations(minion):
+            if not skip and (not filtered or spec.selects(configuration)):
+                yield id, configuration
+            id += 1
+
+
+# str(items), remembered in strings (by id, so only while the dicts are alive)
+def _item_string(items: dict, strings: Optional[dict[int, str]]) -> str:
+    if strings is None:
+        return str(items)
+    key = id(items)
+    if key not in strings:
+        strings[key] = str(items)
+    return strings[key]
+
+
+# strings: optional cache for outputs that share their item dicts (see batch.MinionSimulationBatch.to_outputs)
+def simulation_result_row(id: int, configuration: tuple, sim: MinionSimulationOutput, strings: Optional[dict[int, str]] = None) -> dict:
+    minion, level, fuel, hopper, item_1, item_2, storage, mithril_infusion, free_will, postcard, beacon_percent_boost, pet_bonus_percent, crystal_bonus_percent, seconds = configuration
+    return dict(
+        id=id,
+        minion=minion.name,
+        minion_level=level,
+        fuel=fuel.name if fuel else None,
+        hopper=hopper.name if hopper else None,
+        item_1=item_1.name if item_1 else None,
+        item_2=item_2.name if item_2 else None,
+        storagetype=storage.name if storage else None,
+        mithril_infusion=mithril_infusion,
+        free_will=free_will,
+        postcard=postcard,
+        beacon_boost_percent=beacon_percent_boost,
+        pet_bonus_percent=pet_bonus_percent,
+        crystal_bonus_percent=crystal_bonus_percent,
+        
+        seconds=seconds,
+        percentage_boost=sim.percentage_boost,
+        raw_item_drops=_item_string(sim.raw_item_drops, strings),
+        in_inventory=_item_string(sim.in_inventory, strings),
+        sold_to_hopper=_item_string(sim.sold_to_hopper, strings),
+        hopper_coins=sim.hopper_coins,
+        coins_if_inventory_sell_order_to_bz=sim.coins_if_inventory_sell_order_to_bz,
+        coins_if_inventory_instant_sold_to_bz=sim.coins_if_inventory_instant_sold_to_bz,
+        coins_if_inventory_sold_to_npc=sim.coins_if_inventory_sold_to_npc,
+        coins_if_inventory_sold_optimally=sim.coins_if_inventory_sold_optimally,
+        profit_24h_if_inventory_sell_order_to_bz=sim.profit_24h_if_inventory_sell_order_to_bz,
+        profit_24h_if_inventory_instant_sold_to_bz=sim.profit_24h_if_inventory_instant_sold_to_bz,
+        profit_24h_if_inventory_sold_to_npc=sim.profit_24h_if_inventory_sold_to_npc,
+        profit_24h_if_inventory_sold_optimally=sim.profit_24h_if_inventory_sold_optimally,
+        profit_24h_only_hopper=sim.profit_24h_only_hopper,
+        APR_if_inventory_sell_order_to_bz=sim.APR_if_inventory_sell_order_to_bz,
+        APR_only_hopper=sim.APR_only_hopper,
+        cost_of_fuel=sim.cost_of_fuel,
+        inventory_full=sim.inventory_full,
+        fuel_empty=sim.fuel_empty,
+        minion_cost_total=sim.minion_cost_total,
+        minion_cost_non_recoverable=sim.minion_cost_non_recoverable,
+        minion_cost_recoverable=sim.minion_cost_recoverable,
+        seconds_until_full=sim.seconds_until_full,
+    )
+
+
+# ============== PARALLEL SWEEP ==============
+# the sweep is split into shards of (minion, level), and those into chunks of at most SHARD_SIZE
+# configurations so nothing ever holds the whole sweep in memory. row ids come from the position of the
+# configuration in the full sweep, so the output is the same no matter how many workers run it
+
+SHARD_SIZE = 5000
+
+@dataclass
+class SweepShard:
+    minion_index: int
+    minion_level: int
+    first_id: int # id of the minion's first configuration
+    start: int # range of the minion's configurations at this level (that the spec picks)
+    stop: int
+    spec: Optional[SweepSpec] = None
+
+
+def sweep_shards(spec: Optional[SweepSpec] = None) -> list[SweepShard]:
+    shards = []
+    first_id = 0
+    for minion_index, minion in enumerate(SWEEP_MINIONS):
+        level_counts: dict[int, int] = {}
+        count = 0
+        for configuration in generate_configurations(minion):
+            if spec is None or spec.selects(configuration):
+                level_counts[configuration[1]] = level_counts.get(configuration[1], 0) + 1
+            count += 1
+        for level, level_count in level_counts.items():
+            for start in range(0, level_count, SHARD_SIZE):
+                shards.append(SweepShard(minion_index, level, first_id, start, min(start + SHARD_SIZE, level_count), spec))
+        first_id += count
+    return shards
+
+
+def init_sweep_worker(items: SkyblockItems, profiling: bool = False, trace_memory: bool = False):
+    # price data is loaded once in the main process and handed to every worker
+    global skyblock_items
+    skyblock_items = items
+    if profiling:
+        sweep_profile.start(trace_memory)
+
+
+def simulate_shard(shard: SweepShard) -> list[dict]:
+    from batch import simulate_unloaded_minion_output_batch # batch.py imports this module
+    
+    minion = SWEEP_MINIONS[shard.minion_index]
+    ids = []
+    configurations = []
+    position = 0
+    with sweep_profile.stage("configurations"):
+        for id, configuration in level_configurations(minion, shard.minion_level):
+            if shard.spec is not None and not shard.spec.selects(configuration):
+                continue
+            if shard.start <= position < shard.stop:
+                ids.append(shard.first_id + id)
+                configurations.append(configuration)
+            position += 1
+            if position >= shard.stop:
+                break
+    sweep_profile.count("configurations simulated", len(configurations))
+    
+    with sweep_profile.stage("batch"):
+        batch = simulate_unloaded_minion_output_batch(configurations)
+    with sweep_profile.stage("outputs"):
+        outputs = batch.to_outputs()
+    # plain dicts, BulkResultWriter never makes ORM objects out of them
+    with sweep_profile.stage("rows"):
+        strings = {}
+        return [simulation_result_row(id, configuration, sim, strings) for id, configuration, sim in zip(ids, configurations, outputs)]
+
+
+# rows as tuples of their values in result_table() column order, which is how the sweep hands them on to
+# the dbs: pickling them back from the workers and inserting them is a lot cheaper than with dicts
+def result_values(rows: Iterable[dict]) -> Iterator[tuple]:
+    columns = [column.name for column in result_table().columns]
+    for row in rows:
+        yield tuple(row[column] for column in columns)
+
+
+# simulate_shard in a worker process: its rows (as result_values), and what its profile counted meanwhile
+def simulate_shard_in_worker(shard: SweepShard) -> tuple[list[tuple], dict]:
+    values = list(result_values(simulate_shard(shard)))
+    count_item_lookups(skyblock_items)
+    return values, sweep_profile.take()
+
+
+# every item the sweep prices by its auction price: the postcard, the beacon and fuels that last forever
+# (see generate_configurations), minus whatever is on the bazaar
+def auction_items_needed(items: SkyblockItems) -> list[SBItem]:
+    names = ["Postcard", "Beacon V"]
+    has_combat_minion = any(minion.skill_type == "combat" for minion in MINIONS)
+    for fuel in FUEL_TYPES:
+        if fuel and fuel.duration_hours == None:
+            if fuel.name == "Everburning Flame" and not has_combat_minion:
+                continue
+            names.append(fuel.name)
+    
+    needed = []
+    for name in names:
+        item = items.search_by_name(name)
+        if item.bz_sell_price == None:
+            needed.append(item)
+    return needed
+
+
+# fetch every auction-only price the sweep can need up front (cached on disk), so the simulation never
+# waits on the network
+def resolve_auction_prices(items: SkyblockItems, cache: Optional[AuctionPriceCache] = None):
+    with sweep_profile.stage("auction prices"):
+        items.fetch_auction_prices(auction_items_needed(items), cache)
+
+
+# yields rows in shard order. at most 2 shards per worker are in flight so results can't pile up
+# while the writer catches up
+def run_sweep(workers: int = 1, spec: Optional[SweepSpec] = None) -> Iterator[tuple]:
+    shards = sweep_shards(spec)
+    
+    if workers <= 1:
+        for shard in shards:
+            yield from result_values(simulate_shard(shard))
+        return
+    
+    def finished(future) -> list[tuple]:
+        rows, taken = future.result()
+        sweep_profile.merge(taken)
+        return rows
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_sweep_worker, initargs=(skyblock_items, sweep_profile.enabled, sweep_profile.trace_memory)) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(simulate_shard_in_worker, shard))
+            if len(pending) >= workers * 2:
+                yield from finished(pending.popleft())
+        while pending:
+            yield from finished(pending.popleft())
+
+
+# decrease size of db we send to client. rows as result_values
+def trim_item_columns(rows: Iterator[tuple]) -> Iterator[tuple]:
+    columns = [column.name for column in result_table().columns]
+    trimmed = [columns.index(name) for name in ["raw_item_drops", "in_inventory", "sold_to_hopper"]]
+    for row in rows:
+        row = list(row)
+        for i in trimmed:
+            row[i] = ""
+        yield tuple(row)
+
+
+# ============== REPRICING ==============
+# drops, inventory contents, hopper overflow and fuel running out only depend on minion data, so the
+# full (untrimmed) rows of the last sweep are kept in CACHE_DB_PATH. when only prices changed the
+# coin/profit/APR/cost columns are recomputed from those rows instead of simulating everything again
+
+CACHE_DB_PATH = "data/minion_simulation_cache.db"
+RESULTS_DB_PATH = "data/sheep_minion_combinations.db"
+SHARD_DIR = "data/sheep_minion_combinations" # what the website loads, see columnar.py
+SHARD_BY = ["minion", "seconds"]
+
+# indexes of the published db, shaped like the queries app.js builds (query_bench.py reports their plans):
+# one per column the page can sort by, so ORDER BY ... LIMIT 50 walks an index until it has 50 matching
+# rows instead of sorting everything, and one over the filter columns for narrow filters (a minion or two,
+# one timescale) and counts, which it covers
+RESULT_INDEXES = {f"ix_result_{column}": [column] for column in SORT_COLUMNS}
+RESULT_INDEXES["ix_result_filters"] = FILTER_COLUMNS
+
+# the best row per minion, timescale and set of upgrades, which is what the page shows by default. these
+# tables (and their columnar copies) are a few hundred rows, so it can show them without loading any shards
+SUMMARY_PARTITION = ["minion", "seconds"] + list(UPGRADE_COLUMNS.values())
+SUMMARY_TABLES = [
+    SummaryTable("MinionBestProfit", SUMMARY_PARTITION, "profit_24h_if_inventory_instant_sold_to_bz DESC"),
+    SummaryTable("MinionBestAPR", SUMMARY_PARTITION, "APR_if_inventory_sell_order_to_bz DESC"),
+    SummaryTable("MinionCheapestProfitable", SUMMARY_PARTITION, "minion_cost_total ASC", "profit_24h_if_inventory_instant_sold_to_bz > 0"),
+]
+
+
+# the columns reprice_rows recomputes
+PRICE_COLUMNS = ["hopper_coins", "coins_if_inventory_sell_order_to_bz", "coins_if_inventory_instant_sold_to_bz", "coins_if_inventory_sold_to_npc", "coins_if_inventory_sold_optimally", "profit_24h_if_inventory_sell_order_to_bz", "profit_24h_if_inventory_instant_sold_to_bz", "profit_24h_if_inventory_sold_to_npc", "profit_24h_if_inventory_sold_optimally", "profit_24h_only_hopper", "APR_if_inventory_sell_order_to_bz", "APR_only_hopper", "cost_of_fuel", "minion_cost_total", "minion_cost_recoverable", "minion_cost_non_recoverable"]
 
-try:
-    if os.path.exists("data/sheep_minion_combinations.db"):
-        os.remove("data/sheep_minion_combinations.db")
-except Exception as e:
-    print(f"Couldn't remove database: {e}")
-    input("Hit any key to try again:")
+
+def reprice_rows(rows: Iterator[dict], chunk_size: int = SHARD_SIZE) -> Iterator[dict]:
+    from batch import price_unloaded_minion_batch # batch.py imports this module
+    
+    minions = {minion.name: minion for minion in MINIONS}
+    fuels = {fuel.name: fuel for fuel in FUEL_TYPES if fuel}
+    hoppers = {hopper.name: hopper for hopper in HOPPERS if hopper}
+    items = {item.name: item for item in ITEMS if item}
+    storages = {storage.name: storage for storage in STORAGES if storage}
+    prices = get_price_vectors()
+    
+    # rows come in sweep order (seconds changes fastest), so only the last setup's costs are kept
+    costs_key, costs = None, None
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        
+        # the same item dicts show up over and over and literal_eval is slow, so they're only parsed once
+        parsed: dict[str, dict[str, int]] = {}
+        def parse(text: str) -> dict[str, int]:
+            if text not in parsed:
+                parsed[text] = ast.literal_eval(text)
+            return parsed[text]
+        
+        setup_costs, fuel_items, hopper_sell_percentage = [], [], []
+        for row in chunk:
+            fuel = fuels[row["fuel"]] if row["fuel"] else None
+            hopper = hoppers[row["hopper"]] if row["hopper"] else None
+            
+            key = (row["minion"], row["minion_level"], row["fuel"], row["hopper"], row["item_1"], row["item_2"], row["storagetype"], row["mithril_infusion"], row["free_will"], row["postcard"], row["beacon_boost_percent"])
+            if key != costs_key:
+                costs_key = key
+                minion = minions[row["minion"]]
+                item_1 = items[row["item_1"]] if row["item_1"] else None
+                item_2 = items[row["item_2"]] if row["item_2"] else None
+                storage = storages[row["storagetype"]] if row["storagetype"] else None
+                costs = price_minion_setup(minion, row["minion_level"], fuel, hopper, item_1, item_2, storage, bool(row["mithril_infusion"]), bool(row["free_will"]), bool(row["postcard"]), row["beacon_boost_percent"])
+            
+            setup_costs.append(costs)
+            fuel_items.append(fuel_items_used(fuel, row["seconds"]))
+            hopper_sell_percentage.append(hopper.sell_percentage if hopper else 0)
+        
+        # raw drops aren't priced at all, the row just keeps its stored text
+        priced = price_unloaded_minion_batch(
+            prices,
+            np.array([row["seconds"] for row in chunk], dtype=np.int64),
+            QuantityMatrix.from_dicts([parse(row["in_inventory"]) for row in chunk]),
+            QuantityMatrix.from_dicts([parse(row["sold_to_hopper"]) for row in chunk]),
+            QuantityMatrix.from_dicts(fuel_items, dtype=np.float64),
+            np.array(hopper_sell_percentage, dtype=np.float64),
+            np.array([row["beacon_boost_percent"] for row in chunk], dtype=np.int64),
+            np.array([costs.crystal_cost_24hrs_per_minion for costs in setup_costs], dtype=np.float64),
+            np.array([costs.minion_cost_recoverable for costs in setup_costs], dtype=np.float64),
+            np.array([costs.minion_cost_non_recoverable for costs in setup_costs], dtype=np.float64),
+        )
+        
+        columns = {name: priced[name].tolist() for name in PRICE_COLUMNS}
+        for i, row in enumerate(chunk):
+            new_row = dict(row)
+            for name in PRICE_COLUMNS:
+                new_row[name] = columns[name][i]
+            yield new_row
+
+
+def remove_database(path: str):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except Exception as e:
+        print(f"Couldn't remove database: {e}")
+        input("Hit any key to try again:")
+        
+        os.remove(path)
+
+
+# writes the trimmed rows (as result_values) to the published db, and every row to the cache db if there is one.
+# replace: both dbs exist and the rows replace the ones with their ids (a --spec refresh)
+# either way the writing happens in copies next to the dbs (new ones, or copies of the existing ones for
+# replace) that are only moved over them once they're finished, so a run that fails or is stopped on the
+# way leaves the last published db (and cache) as they were
+def save_results(rows: Iterator[tuple], results_path: str, cache_path: Optional[str] = None, chunk_size: int = SHARD_SIZE, replace: bool = False) -> int:
+    table = result_table()
+    rows = iter(rows)
+    paths = [path for path in [results_path, cache_path] if path]
+    written_paths = {path: path + ".partial" for path in paths}
+    for path in paths:
+        remove_database(written_paths[path])
+    
+    try:
+        if replace:
+            for path in paths:
+                shutil.copyfile(path, written_paths[path])
+        written = _write_results(rows, table, written_paths[results_path], written_paths.get(cache_path), chunk_size, replace)
+    except BaseException:
+        for path in paths:
+            if os.path.exists(written_paths[path]):
+                os.remove(written_paths[path])
+        raise
+    
+    for path in paths:
+        os.replace(written_paths[path], path)
+    return written
+
+
+def _write_results(rows: Iterator[tuple], table: "Table", results_path: str, cache_path: Optional[str], chunk_size: int, replace: bool) -> int:
+    # what isn't spent making or inserting rows is creating the dbs, the indexes, the summary tables and VACUUM
+    with sweep_profile.stage("db finalize"), BulkResultWriter(results_path, table, indexes=RESULT_INDEXES, summaries=SUMMARY_TABLES, replace=replace) as results, (BulkResultWriter(cache_path, table, replace=replace) if cache_path else nullcontext()) as cache:
+        while True:
+            # the sweep runs in here (or waits on its workers), its own stages are counted separately
+            with sweep_profile.stage("producing rows"):
+                chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with sweep_profile.stage("db write"):
+                if cache:
+                    cache.write_values(chunk)
+                results.write_values(list(trim_item_columns(chunk)))
+            sweep_profile.count("rows written", len(chunk))
+            print(f"{results.written} combinations saved.")
+    return results.written
+
+
+# ============== PLANNING ==============
+# what a sweep (or the part of it a spec picks) is going to do before it runs: how many rows, and roughly
+# how long simulating and inserting them takes, timed on a few of its shards with the loaded prices
+# (sample_shards=0 only counts)
+
+@dataclass
+class SweepPlan:
+    rows: int
+    rows_per_minion: dict[str, int]
+    shards: int
+    sampled_rows: int
+    seconds_per_row: float # simulating and inserting (into both dbs), on the sampled shards
+    
+    @property
+    def estimated_seconds(self) -> float:
+        return self.rows * self.seconds_per_row
+
+
+def plan_sweep(spec: Optional[SweepSpec] = None, sample_shards: int = 3) -> SweepPlan:
+    shards = sweep_shards(spec)
+    rows_per_minion: dict[str, int] = {}
+    for shard in shards:
+        name = SWEEP_MINIONS[shard.minion_index].name
+        rows_per_minion[name] = rows_per_minion.get(name, 0) + shard.stop - shard.start
+    
+    # spread over the plan, the minions don't all cost the same per row
+    sample = shards[::max(1, len(shards) // sample_shards)][:sample_shards] if sample_shards else []
+    elapsed = 0.0
+    sampled_rows = 0
+    table = result_table()
+    if sample:
+        with tempfile.TemporaryDirectory() as directory, BulkResultWriter(os.path.join(directory, "results.db"), table) as results, BulkResultWriter(os.path.join(directory, "cache.db"), table) as cache:
+            for shard in sample:
+                start = time.perf_counter()
+                rows = list(result_values(simulate_shard(shard)))
+                cache.write_values(rows)
+                results.write_values(list(trim_item_columns(rows)))
+                elapsed += time.perf_counter() - start
+                sampled_rows += len(rows)
+    
+    return SweepPlan(
+        rows=sum(rows_per_minion.values()),
+        rows_per_minion=rows_per_minion,
+        shards=len(shards),
+        sampled_rows=sampled_rows,
+        seconds_per_row=elapsed / sampled_rows if sampled_rows else 0.0,
+    )
+
+
+def format_plan(plan: SweepPlan) -> str:
+    per_minion = ", ".join(f"{name} {rows}" for name, rows in plan.rows_per_minion.items())
+    lines = [f"Plan: {plan.rows} combinations in {plan.shards} shards ({per_minion or 'nothing'})"]
+    if plan.sampled_rows:
+        lines.append(f"Estimated {plan.estimated_seconds:.1f}s to simulate and save them ({plan.seconds_per_row * 1e6:.0f}us per row on {plan.sampled_rows} sampled rows, indexes and the website export come on top)")
+    return "\n".join(lines)
+
+
+# the price options of every entry point
+def add_price_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--snapshot", help=f"price snapshot to use (default: the newest one in {SNAPSHOT_DIR})")
+    parser.add_argument("--max-age", type=float, default=60, help="max age in minutes of the newest snapshot and of cached auction prices (default: 60)")
+    parser.add_argument("--fetch", action="store_true", help="fetch and save a new price snapshot instead")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", action="store_true", help="time the stages of the run and print a report at the end")
+    parser.add_argument("--profile-json", help="also write the profile report to this file (implies --profile)")
+    parser.add_argument("--trace-memory", action="store_true", help="also track the peak of python allocations with tracemalloc (slow, implies --profile)")
+
+
+def start_profile(args: argparse.Namespace):
+    if args.profile or args.profile_json or args.trace_memory:
+        sweep_profile.start(args.trace_memory)
+
+
+# the lookups since the last call, as profile counters
+def count_item_lookups(items: SkyblockItems):
+    sweep_profile.count("item lookup hit", items.lookup_hits)
+    sweep_profile.count("item lookup fallback", items.lookup_fallbacks)
+    sweep_profile.count("item lookup miss", items.lookup_misses)
+    items.lookup_hits = items.lookup_fallbacks = items.lookup_misses = 0
+
+
+def finish_profile(args: argparse.Namespace):
+    if not sweep_profile.enabled:
+        return
+    count_item_lookups(skyblock_items)
+    report = sweep_profile.report()
+    print(format_profile(report))
+    if args.profile_json:
+        with open(args.profile_json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved profile to {args.profile_json}.")
+
+
+# sets skyblock_items from the add_price_arguments options, auction prices included
+def load_prices(args: argparse.Namespace):
+    global skyblock_items
+    
+    with sweep_profile.stage("price snapshot"):
+        try:
+            snapshot = load_price_snapshot(args.snapshot, args.max_age, args.fetch)
+        except ValueError as e:
+            raise SystemExit(f"{e} (--fetch)")
+        skyblock_items = SkyblockItems(only_bazaar=False, snapshot=snapshot)
+    cache = AuctionPriceCache(max_age_minutes=args.max_age)
+    resolve_auction_prices(skyblock_items, cache)
+    sweep_profile.count("auction cache hit", cache.hits)
+    sweep_profile.count("auction cache miss", cache.misses)
+
+
+# the sharded columnar copy of the results db and its summary tables. keys: only the shards of these
+# SHARD_BY values changed (see columnar.export_sharded)
+def export_web_data(results_path: str, directory: str, keys: Optional[set[tuple]] = None):
+    from columnar import export_sharded
+    
+    table = result_table()
+    manifest = export_sharded(results_path, table, directory, SHARD_BY, [summary.schema(table) for summary in SUMMARY_TABLES], keys)
+    size = sum(shard["bytes"] for shard in manifest["shards"])
+    print(f"Saved {len(manifest['shards'])} shards ({size} bytes) and {len(manifest['summaries'])} summaries to {directory}.")
+
+
+# the options of cli.py simulate (and of running this file)
+def add_sweep_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1). at the current grid sizes more workers don't make the sweep faster, writing the dbs and the web export take most of the time")
+    parser.add_argument("--reprice", action="store_true", help=f"only recompute prices from the last sweep in {CACHE_DB_PATH}")
+    parser.add_argument("--spec", help="json or toml sweep spec: only simulate that part of the sweep, and replace those rows in the existing dbs")
+    parser.add_argument("--plan", action="store_true", help="only print how many rows the sweep (or --spec) has and how long it should take")
+    add_price_arguments(parser)
+    add_profile_arguments(parser)
+
+
+# dbs written before a column was added to the results table can't be refreshed or repriced
+def check_result_columns(path: str):
+    columns = result_columns(path, result_table())
+    missing = [column.name for column in result_table().columns if column.name not in columns]
+    if missing:
+        raise SystemExit(f"{path} is from before the {', '.join(missing)} column(s), run a full sweep (without --spec or --reprice) first.")
+
+
+def run(args: argparse.Namespace):
+    spec = None
+    if args.spec:
+        if args.reprice:
+            raise SystemExit("--reprice reprices the whole cached sweep, it doesn't take a --spec")
+        try:
+            spec = SweepSpec.load(args.spec)
+        except ValueError as e:
+            raise SystemExit(f"{args.spec}: {e}")
+    
+    start_profile(args)
+    load_prices(args)
+    
+    if spec or args.plan:
+        # only --plan times a few shards, before a refresh the counts are enough
+        print(format_plan(plan_sweep(spec, sample_shards=3 if args.plan else 0)))
+        if args.plan:
+            return
+    
+    # print("Saving to json...")
+    
+    # filepath = "data/sheep_minion_combinations.json"
+    # with open(filepath, 'w') as fi:
+    #     json.dump(simulation_outputs, fi, default=lambda k: k.__dict__, indent=4)
+        
+    # print(f"Saved to {filepath}.")
+    
+    # a spec refreshes its rows in the dbs of the last full sweep, it never makes a db of only its rows
+    refresh = spec is not None
+    if refresh:
+        for path in [RESULTS_DB_PATH, CACHE_DB_PATH]:
+            if not os.path.exists(path):
+                raise SystemExit(f"There is no {path} to refresh, run a full sweep (without --spec) first.")
+        expected = sum(1 for _ in sweep_configurations())
+        for path in [RESULTS_DB_PATH, CACHE_DB_PATH]:
+            check_result_columns(path)
+            if count_results(path, result_table()) != expected:
+                raise SystemExit(f"{path} doesn't have the {expected} rows of the current sweep, run a full sweep (without --spec) first.")
+    
+    if args.reprice:
+        if not os.path.exists(CACHE_DB_PATH):
+            raise SystemExit(f"No cached simulation at {CACHE_DB_PATH}, run a full sweep first.")
+        check_result_columns(CACHE_DB_PATH)
+    
+    # everything is checked, from here on save_results only swaps in the new dbs once they're written
+    if args.reprice:
+        print("Repricing cached simulation and saving to database...")
+        
+        # the cache only has to hold the physical outputs, so it's left as is
+        written = save_results(result_values(reprice_rows(read_results(CACHE_DB_PATH, result_table()))), RESULTS_DB_PATH)
+    elif refresh:
+        print("Simulating and replacing in database...")
+        
+        written = save_results(run_sweep(args.workers, spec), RESULTS_DB_PATH, CACHE_DB_PATH, replace=True)
+    else:
+        print("Simulating and saving to database...")
+        
+        written = save_results(run_sweep(args.workers, spec), RESULTS_DB_PATH, CACHE_DB_PATH)
     
-    os.remove("data/sheep_minion_combinations.db")
+    print(f"{written} combinations generated.")
+    print("Saved to database.")
+    with sweep_profile.stage("query report"):
+        print(format_report(run_bench(RESULTS_DB_PATH)))
     
+    with sweep_profile.stage("web export"):
+        # SHARD_BY is (minion, seconds)
+        keys = {(configuration[0].name, configuration[13]) for _, configuration in sweep_configurations(spec)} if refresh else None
+        export_web_data(RESULTS_DB_PATH, SHARD_DIR, keys)
     
-engine = create_engine("sqlite:///data/sheep_minion_combinations.db")
-SQLModel.metadata.create_all(engine)
+    finish_profile(args)
 
-print("Saving to database...")
 
-try:
-    with Session(engine) as session:
-        session.add_all(simulation_outputs)
-        session.commit()
-except Exception as e:
-    print(f"Couldn't save database: {e}")
-    input("Hit any key to try again:")
-    
-    with Session(engine) as session:
-        session.add_all(simulation_outputs)
-        session.commit()
+def main():
+    parser = argparse.ArgumentParser(description="Simulate every minion combination and save them to data/sheep_minion_combinations.db (and sharded for the website)")
+    add_sweep_arguments(parser)
+    run(parser.parse_args())
+
 
-print("Saved to database.")
\ No newline at end of file
+if __name__ == "__main__":
+    # batch.py and bounds.py import simulate and read its skyblock_items, so run as that module and not as __main__
+    import simulate
+    simulate.main()
@@ -142,14 +142,19 @@ def generate_simulation_combinations() -> list[MinionSimulationCombination]:
     return out
                                      
                                      
-# Start timing
-start_time = time.time()
+def main():
+    # Start timing
+    start_time = time.time()
 
-simulation_combinations = generate_simulation_combinations()
+    simulation_combinations = generate_simulation_combinations()
 
-# End timing
-end_time = time.time()
-elapsed_time = end_time - start_time
+    # End timing
+    end_time = time.time()
+    elapsed_time = end_time - start_time
 
-print(f"Total combinations: {len(simulation_combinations)}")
-print(f"Time taken: {elapsed_time:.2f} seconds")
\ No newline at end of file
+    print(f"Total combinations: {len(simulation_combinations)}")
+    print(f"Time taken: {elapsed_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
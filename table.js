@@ -1,12 +1,21 @@
-async function initDatabase() {
-    const SQL = await initSqlJs({ locateFile: file => `https://cdnjs.cloudflare.com/ajax/libs/sql.js/1.6.2/${file}` });
-    let db_path = "";
+function dataPath(file) {
     if (window.location.pathname == "/table.html") { // localhost
-        db_path = "/data/sheep_minion_combinations.db"
+        return "/data/" + file
     } else { // server
-        db_path = window.location.pathname + "/../data/sheep_minion_combinations.db"
+        return window.location.pathname + "/../data/" + file
+    }
+}
+
+async function initDatabase() {
+    // the sharded columnar copy (see columnar.js), only the shards of the shown timescales get downloaded
+    try {
+        return await loadShardedTable(dataPath("sheep_minion_combinations"));
+    } catch (e) {
+        console.log(`${e}, loading the sqlite database instead`);
     }
-    const response = await fetch(db_path);
+
+    const SQL = await initSqlJs({ locateFile: file => `https://cdnjs.cloudflare.com/ajax/libs/sql.js/1.6.2/${file}` });
+    const response = await fetch(dataPath("sheep_minion_combinations.db"));
     const buffer = await response.arrayBuffer();
     return new SQL.Database(new Uint8Array(buffer));
 }
@@ -59,7 +68,51 @@ document.addEventListener("DOMContentLoaded", async () => {
     });
 });
 
-function updateTable(db, filters, budget, frequency) {
+function minionMatches(minionTypes, minion, level) {
+    if (minionTypes.length == 0 || minionTypes.includes("all")) {
+        return true;
+    }
+    return minionTypes.some(type => {
+        if (type.includes('-t')) {
+            const [minionName, tier] = type.split('-t');
+            return minion == minionName && level == tier;
+        }
+        return minion == type;
+    });
+}
+
+// the row the query in updateTable picks, straight from the columns (ties: lowest id)
+function bestColumnar(tables, filters) {
+    let best = null;
+    tables.forEach(table => {
+        const minion = table.column("minion");
+        const level = table.column("minion_level");
+        const seconds = table.column("seconds");
+        const cost = table.column("minion_cost_total");
+        const instantSellProfit = table.column("profit_24h_if_inventory_instant_sold_to_bz");
+        const hopperProfit = table.column("profit_24h_only_hopper");
+        const ids = table.column("id");
+        for (let i = 0; i < table.rows; i++) {
+            if (cost[i] > filters.budget || seconds[i] != filters.frequency || !minionMatches(filters.minionTypes, minion[i], level[i])) {
+                continue;
+            }
+            const value = Math.max(instantSellProfit[i], hopperProfit[i]);
+            if (!best || value > best.value || (value == best.value && ids[i] < best.id)) {
+                best = { table: table, row: i, value: value, id: ids[i] };
+            }
+        }
+    });
+    return { values: best ? [best.table.row(best.row)] : [] };
+}
+
+async function updateTable(db, filters, budget, frequency) {
+    if (db instanceof ShardedTable) {
+        const minions = filters.minionTypes.includes("all") ? [] : filters.minionTypes.map(type => type.split('-t')[0]);
+        const tables = await db.tables({ minion: minions, seconds: [filters.frequency] });
+        renderTable(bestColumnar(tables, filters), budget, frequency);
+        return;
+    }
+
     let query = "SELECT * FROM MinionSimulationResult WHERE 1=1";
 
     if (filters.minionTypes.length > 0 && !filters.minionTypes.includes("all")) {
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# the modules import each other by name (from simulate import ...), like when run from python/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"))
+
+import simulate
+from benchmark import load_fixture_prices
+
+
+# the benchmark fixture's prices, so nothing needs the network
+@pytest.fixture(scope="session", autouse=True)
+def fixture_prices():
+    simulate.skyblock_items = load_fixture_prices()
+    return simulate.skyblock_items
+
+
+# the fixture's prices a quarter higher, for checking what changes (and what doesn't) when prices move
+@pytest.fixture(scope="session")
+def other_prices():
+    items = load_fixture_prices()
+    for item in items.items:
+        for price in ["bz_sell_price", "bz_buy_price", "npc_sell_price", "auction_average_buy_price"]:
+            if getattr(item, price) is not None and item.sb_id != "coins":
+                setattr(item, price, getattr(item, price) * 1.25)
+    return items
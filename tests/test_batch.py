@@ -0,0 +1,33 @@
+import random
+from dataclasses import asdict
+
+import pytest
+
+from batch import _simulate_with_fill_estimate, simulate_unloaded_minion_output_batch
+from simulate import MINIONS, generate_configurations
+
+
+# every minion, a few hundred configurations of each, so most batch groups and the scalar fallback come up
+@pytest.fixture(scope="module")
+def sampled_configurations():
+    rng = random.Random(0)
+    configurations = []
+    for minion in MINIONS:
+        configurations += rng.sample(list(generate_configurations(minion)), 300)
+    return configurations
+
+
+def test_batch_matches_scalar(sampled_configurations):
+    outputs = simulate_unloaded_minion_output_batch(sampled_configurations).to_outputs()
+    assert len(outputs) == len(sampled_configurations)
+    for configuration, output in zip(sampled_configurations, outputs):
+        expected = _simulate_with_fill_estimate(configuration)
+        assert asdict(output) == asdict(expected), configuration
+        assert type(output.seconds_until_full) == type(expected.seconds_until_full)
+
+
+def test_batch_keeps_order(sampled_configurations):
+    configurations = sampled_configurations[:500]
+    forwards = simulate_unloaded_minion_output_batch(configurations).to_outputs()
+    backwards = simulate_unloaded_minion_output_batch(configurations[::-1]).to_outputs()
+    assert [asdict(output) for output in forwards] == [asdict(output) for output in backwards[::-1]]
@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bazaar import AuctionPriceCache, PriceSnapshot, SBItem, SkyblockItems, fetch_auction_average, list_snapshots, load_price_snapshot
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python")
+
+# active auctions by tag, what the stand-in coflnet serves
+AUCTIONS = {
+    "POSTCARD": [{"price": 100}, {"price": 200}, {"price": 301}],
+    "BEACON_5": [{"price": 5000000}],
+    "NOTHING_LISTED": [],
+}
+
+
+# a local stand-in for sky.coflnet.com's active auctions overview, remembering the paths it was asked for
+@pytest.fixture
+def coflnet():
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            parts = self.path.split("/")
+            if len(parts) == 7 and parts[1:4] == ["api", "auctions", "tag"] and parts[5:] == ["active", "overview"] and parts[4] in AUCTIONS:
+                status, body = 200, json.dumps(AUCTIONS[parts[4]]).encode()
+            else:
+                status, body = 404, b"[]"
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requested
+    server.shutdown()
+    server.server_close()
+
+
+# a snapshot with one bazaar item and one that isn't on the bazaar, minutes_old minutes ago
+def _snapshot(minutes_old: float = 0) -> PriceSnapshot:
+    last_updated = int((time.time() - minutes_old * 60) * 1000)
+    quick_status = {"productId": "CLAY_BALL", "sellPrice": 2.5, "sellVolume": 100, "sellMovingWeek": 1000, "sellOrders": 3, "buyPrice": 3.1, "buyVolume": 200, "buyMovingWeek": 2000, "buyOrders": 4}
+    return PriceSnapshot(
+        last_updated=last_updated,
+        items={"success": True, "items": [{"name": "Clay", "id": "CLAY_BALL", "npc_sell_price": 3}, {"name": "Postcard", "id": "POSTCARD"}]},
+        bazaar={"success": True, "lastUpdated": last_updated, "products": {"CLAY_BALL": {"product_id": "CLAY_BALL", "sell_summary": [{"amount": 10, "pricePerUnit": 2.5, "orders": 1}], "buy_summary": [], "quick_status": quick_status}}},
+    )
+
+
+def test_price_snapshot_save_and_load(tmp_path):
+    snapshot = _snapshot()
+    path = snapshot.save(str(tmp_path))
+    assert os.path.basename(path) == f"snapshot-{snapshot.last_updated}.json.gz"
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert json.load(f)["lastUpdated"] == snapshot.last_updated
+    assert PriceSnapshot.load(path) == snapshot
+
+    items = SkyblockItems(only_bazaar=False, snapshot=PriceSnapshot.load(path))
+    assert items.last_updated == snapshot.last_updated
+    assert items.search_by_name("Clay").bz_sell_price == 2.5
+    assert items.search_by_sb_id("POSTCARD").bz_sell_price is None
+
+
+# without a snapshot SkyblockItems would go to the network, so that has to be asked for
+def test_skyblock_items_needs_a_snapshot_or_fetch():
+    with pytest.raises(ValueError, match="snapshot or fetch=True"):
+        SkyblockItems()
+    with pytest.raises(ValueError, match="snapshot or fetch=True"):
+        SkyblockItems(snapshot=_snapshot(), fetch=True)
+
+
+# oldest first by their timestamps, not by name (snapshot-999 is older than snapshot-1000)
+def test_list_snapshots(tmp_path):
+    directory = str(tmp_path / "snapshots")
+    assert list_snapshots(directory) == []
+    for last_updated in [1000, 999, 20000]:
+        PriceSnapshot(last_updated, {}, {}).save(directory)
+    # half written and other files are left out
+    for name in ["snapshot-30000.json.gz.tmp", "notes.txt"]:
+        with open(os.path.join(directory, name), "w"):
+            pass
+    assert [os.path.basename(path) for path in list_snapshots(directory)] == ["snapshot-999.json.gz", "snapshot-1000.json.gz", "snapshot-20000.json.gz"]
+
+
+def test_load_price_snapshot(tmp_path):
+    directory = str(tmp_path / "snapshots")
+    with pytest.raises(ValueError, match="No price snapshots"):
+        load_price_snapshot(directory=directory)
+
+    old = _snapshot(minutes_old=120)
+    old_path = old.save(directory)
+    new = _snapshot(minutes_old=30)
+    new.save(directory)
+    assert load_price_snapshot(directory=directory) == new
+    assert load_price_snapshot(max_age_minutes=60, directory=directory) == new
+    with pytest.raises(ValueError, match="minutes old"):
+        load_price_snapshot(max_age_minutes=10, directory=directory)
+    # a path is loaded whatever its age
+    assert load_price_snapshot(old_path, max_age_minutes=10, directory=directory) == old
+
+
+# an item with no prices yet
+def _item(name: str, sb_id: str) -> SBItem:
+    return SBItem(name, sb_id, None, None, None, None, None)
+
+
+def _items() -> list[SBItem]:
+    return [_item("Postcard", "POSTCARD"), _item("Beacon V", "BEACON_5")]
+
+
+def test_fetch_auction_prices(coflnet, fixture_prices, tmp_path):
+    url, requested = coflnet
+    items = _items()
+    cache = AuctionPriceCache(str(tmp_path / "auction_prices.json"))
+    fixture_prices.fetch_auction_prices(items, cache, workers=2, base_url=url)
+    assert [item.auction_average_buy_price for item in items] == [200, 5000000]
+    assert sorted(requested) == ["/api/auctions/tag/BEACON_5/active/overview", "/api/auctions/tag/POSTCARD/active/overview"]
+
+    # saved, so a second run asks for nothing
+    requested.clear()
+    items = _items()
+    fixture_prices.fetch_auction_prices(items, AuctionPriceCache(cache.path), base_url=url)
+    assert [item.auction_average_buy_price for item in items] == [200, 5000000]
+    assert requested == []
+
+
+def test_fetch_auction_prices_fails_on_missing_item(coflnet, fixture_prices, tmp_path):
+    url, _ = coflnet
+    with pytest.raises(ValueError, match="Nothing"):
+        fixture_prices.fetch_auction_prices([_item("Nothing", "NOTHING")], AuctionPriceCache(str(tmp_path / "auction_prices.json")), base_url=url)
+
+
+# the prices that were fetched are still cached, and every item that failed is named
+def test_fetch_auction_prices_partial_failure(coflnet, fixture_prices, tmp_path):
+    url, requested = coflnet
+    items = [_item("Postcard", "POSTCARD"), _item("Nothing", "NOTHING"), _item("Beacon V", "BEACON_5"), _item("Nothing Listed", "NOTHING_LISTED")]
+    cache = AuctionPriceCache(str(tmp_path / "auction_prices.json"))
+    with pytest.raises(ValueError, match="'Nothing', 'Nothing Listed'$"):
+        fixture_prices.fetch_auction_prices(items, cache, workers=2, base_url=url)
+    assert [item.auction_average_buy_price for item in items] == [200, None, 5000000, None]
+    assert len(requested) == 4
+
+    saved = AuctionPriceCache(cache.path)
+    assert {sb_id: saved.get(sb_id) for sb_id in ["POSTCARD", "NOTHING", "BEACON_5", "NOTHING_LISTED"]} == {"POSTCARD": 200, "NOTHING": None, "BEACON_5": 5000000, "NOTHING_LISTED": None}
+
+
+# no active auctions is a failed fetch, not a division by zero
+def test_fetch_auction_average_no_auctions(coflnet):
+    import requests
+
+    url, _ = coflnet
+    with requests.Session() as session:
+        with pytest.raises(ValueError, match="Nothing Listed"):
+            fetch_auction_average(session, _item("Nothing Listed", "NOTHING_LISTED"), url)
+        assert fetch_auction_average(session, _item("Postcard", "POSTCARD"), url) == 200
+
+
+# COFLNET_URL is read when bazaar is imported, so this needs a fresh interpreter
+def test_coflnet_url_environment_variable(coflnet, tmp_path):
+    url, requested = coflnet
+    script = (
+        "import sys\n"
+        "from bazaar import AuctionPriceCache, SBItem\n"
+        "from benchmark import load_fixture_prices\n"
+        "item = SBItem('Postcard', 'POSTCARD', None, None, None, None, None)\n"
+        "load_fixture_prices().fetch_auction_prices([item], AuctionPriceCache(sys.argv[1]))\n"
+        "print(item.auction_average_buy_price)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, str(tmp_path / "auction_prices.json")], cwd=PYTHON_DIR, env=dict(os.environ, COFLNET_URL=url), capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "200"
+    assert requested == ["/api/auctions/tag/POSTCARD/active/overview"]
@@ -0,0 +1,164 @@
+import json
+import os
+import random
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table
+
+import columnar
+import simulate
+from columnar import MANIFEST, read_columnar_header, read_columnar_rows, read_sharded_rows, write_columnar
+from results_db import read_results
+from simulate import SHARD_BY, SUMMARY_TABLES, SweepSpec, export_web_data, result_table, run_sweep, save_results, sweep_configurations
+
+TABLE = Table(
+    "things", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("flag", Boolean),
+    Column("maybe_flag", Boolean),
+    Column("level", Integer),
+    Column("maybe_level", Integer),
+    Column("boost", Integer),
+    Column("coins", Integer),
+    Column("profit", Float),
+    Column("item", String),
+)
+
+
+def _rows(count: int) -> list[dict]:
+    rng = random.Random(count)
+    return [{
+        "id": i,
+        "name": rng.choice(["Sheep", "Slime", "Clay", None]),
+        "flag": rng.random() < 0.5,
+        # the None only turns up after the first chunk, so the earlier chunks get turned into indexes too
+        "maybe_flag": None if i == count - 1 else rng.random() < 0.5,
+        "level": rng.randint(1, 12),
+        "maybe_level": rng.choice([1, 11, 12, None]),
+        # an int column with floats in it, like percentage_boost
+        "boost": rng.choice([0, 10, 12.5]),
+        "coins": rng.choice([7, 100000, 2500000]),
+        "profit": rng.random() * 1e6,
+        "item": None,
+    } for i in range(count)]
+
+
+def _write(tmp_path, rows: list[dict]) -> tuple[str, dict]:
+    path = str(tmp_path / "things.col")
+    write_columnar(path, TABLE, iter(rows))
+    with open(path, "rb") as f:
+        header, _ = read_columnar_header(f.read())
+    return path, {spec["name"]: spec for spec in header["columns"]}
+
+
+def test_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "CHUNK_SIZE", 100)
+    rows = _rows(1000)
+    path, specs = _write(tmp_path, rows)
+    
+    assert {name: spec["encoding"] for name, spec in specs.items()} == {
+        "id": "sequence", "name": "dictionary", "flag": "bitmap", "maybe_flag": "dictionary", "level": "plain",
+        "maybe_level": "dictionary", "boost": "dictionary", "coins": "dictionary", "profit": "dictionary", "item": "constant",
+    }
+    read = list(read_columnar_rows(path))
+    assert read == rows
+    # equal isn't enough, True == 1 (a column with floats in it does come back all floats)
+    for row, original in zip(read, rows):
+        assert {name: type(value) for name, value in row.items() if name != "boost"} == {name: type(value) for name, value in original.items() if name != "boost"}
+    assert {type(row["boost"]) for row in read} == {float}
+
+
+def test_round_trip_single_row(tmp_path):
+    rows = _rows(1)
+    path, specs = _write(tmp_path, rows)
+    
+    assert all(spec["encoding"] == "constant" for name, spec in specs.items() if name != "id")
+    read = list(read_columnar_rows(path))
+    assert read == rows
+    assert [type(value) for value in read[0].values()] == [type(value) for value in rows[0].values()]
+
+
+def test_round_trip_empty(tmp_path):
+    path, _ = _write(tmp_path, [])
+    assert list(read_columnar_rows(path)) == []
+
+
+SPEC = SweepSpec(minions=["Clay", "Sheep"], fuels=["Catalyst", "Enchanted Lava Bucket"], beacon_percent_boost=[0, 11], seconds=[3600, 86400])
+REFRESH = SweepSpec(minions=["Clay"], fuels=["Catalyst"], beacon_percent_boost=[0, 11], seconds=[86400])
+
+
+def _manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+# the shards (and summaries) hold exactly what the db does
+def _assert_export_matches(results: str, directory: str):
+    table = result_table()
+    manifest = _manifest(directory)
+    rows = list(read_results(results, table))
+    assert manifest["rows"] == len(rows) == sum(shard["rows"] for shard in manifest["shards"])
+    assert list(read_sharded_rows(directory)) == rows
+    for shard in manifest["shards"]:
+        assert all(row[column] == shard["key"][column] for row in read_columnar_rows(os.path.join(directory, shard["file"])) for column in SHARD_BY)
+    
+    assert list(manifest["summaries"]) == [summary.name for summary in SUMMARY_TABLES]
+    for summary in SUMMARY_TABLES:
+        summary_rows = list(read_columnar_rows(os.path.join(directory, manifest["summaries"][summary.name]["file"])))
+        assert summary_rows
+        assert summary_rows == list(read_results(results, summary.schema(table)))
+
+
+def test_export_sharded(tmp_path):
+    results, directory = str(tmp_path / "results.db"), str(tmp_path / "shards")
+    save_results(run_sweep(1, SPEC), results)
+    export_web_data(results, directory)
+    
+    assert sorted(tuple(shard["key"][column] for column in SHARD_BY) for shard in _manifest(directory)["shards"]) == [("Clay", 3600), ("Clay", 86400), ("Sheep", 3600), ("Sheep", 86400)]
+    _assert_export_matches(results, directory)
+    
+    # a full export again clears out what was there
+    with open(os.path.join(directory, "shard_999.col"), "wb"):
+        pass
+    export_web_data(results, directory)
+    assert sorted(os.listdir(directory)) == sorted([MANIFEST] + [shard["file"] for shard in _manifest(directory)["shards"]] + [summary["file"] for summary in _manifest(directory)["summaries"].values()])
+
+
+# a refresh only writes its own shards again, and ends up with what a full export of the refreshed db gives
+def test_update_shards(tmp_path, monkeypatch, other_prices):
+    results, directory = str(tmp_path / "results.db"), str(tmp_path / "shards")
+    with monkeypatch.context() as patch:
+        patch.setattr(simulate, "skyblock_items", other_prices)
+        save_results(run_sweep(1, SPEC), results)
+    export_web_data(results, directory)
+    before = _manifest(directory)
+    shard = next(shard for shard in before["shards"] if shard["key"] == {"minion": "Clay", "seconds": 86400})
+    old_rows = list(read_columnar_rows(os.path.join(directory, shard["file"])))
+    
+    written = []
+    write = columnar.write_columnar
+    monkeypatch.setattr(columnar, "write_columnar", lambda path, *args: written.append(os.path.basename(path)) or write(path, *args))
+    save_results(run_sweep(1, REFRESH), results, replace=True)
+    keys = {(configuration[0].name, configuration[13]) for _, configuration in sweep_configurations(REFRESH)}
+    assert keys == {("Clay", 86400)}
+    export_web_data(results, directory, keys)
+    
+    assert sorted(written) == sorted([shard["file"]] + [f"{summary.name}.col" for summary in SUMMARY_TABLES])
+    _assert_export_matches(results, directory)
+    assert list(read_columnar_rows(os.path.join(directory, shard["file"]))) != old_rows # the prices did change something
+    
+    full = str(tmp_path / "full")
+    export_web_data(results, full)
+    assert _manifest(directory) == _manifest(full)
+    for name in os.listdir(full):
+        with open(os.path.join(directory, name), "rb") as a, open(os.path.join(full, name), "rb") as b:
+            assert a.read() == b.read(), name
+    
+    # keys the manifest doesn't have (or no manifest at all): a full export
+    written.clear()
+    export_web_data(results, directory, {("Oak", 86400)})
+    assert len(written) == len(before["shards"]) + len(SUMMARY_TABLES)
+    _assert_export_matches(results, directory)
+    empty = str(tmp_path / "empty")
+    export_web_data(results, empty, keys)
+    assert _manifest(empty) == _manifest(full)
@@ -0,0 +1,54 @@
+import gzip
+import json
+import os
+from dataclasses import asdict
+
+import pytest
+
+from batch import simulate_unloaded_minion_output_batch
+from minion_data import FUEL_TYPES, ITEMS, MINIONS, STORAGES
+from simulate import HOPPERS, simulate_unloaded_minion_output
+
+# simulate_unloaded_minion_output of the original, one-configuration-at-a-time simulator (before the batch
+# engine, the inventory and pricing rewrites) at the fixture prices, for 2000 random configurations: half
+# on the sweep grid, half off it (any level, pet and crystal bonuses, odd durations). Configurations are
+# by name, outputs as asdict gave them (without seconds_until_full, which didn't exist yet).
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "unloaded_outputs.json.gz")
+
+
+@pytest.fixture(scope="module")
+def golden() -> list[tuple[tuple, dict]]:
+    def by_name(options: list) -> dict:
+        return {option.name: option for option in options if option is not None}
+    minions, fuels, hoppers, items, storages = by_name(MINIONS), by_name(FUEL_TYPES), by_name(HOPPERS), by_name(ITEMS), by_name(STORAGES)
+    
+    def get(names: dict, name):
+        return names[name] if name is not None else None
+    
+    with gzip.open(GOLDEN_PATH, "rt", encoding="utf-8") as f:
+        cases = json.load(f)
+    golden = []
+    for case in cases:
+        minion, level, fuel, hopper, item_1, item_2, storage, *rest = case["configuration"]
+        configuration = (minions[minion], level, get(fuels, fuel), get(hoppers, hopper), get(items, item_1), get(items, item_2), get(storages, storage), *rest)
+        golden.append((configuration, case["output"]))
+    return golden
+
+
+def _assert_matches(output, expected: dict, configuration: tuple):
+    actual = asdict(output)
+    del actual["seconds_until_full"]
+    assert actual == expected, configuration
+    # ints stay ints and floats floats, the db columns and the website depend on it
+    assert {name: type(value) for name, value in actual.items()} == {name: type(value) for name, value in expected.items()}, configuration
+
+
+def test_scalar_matches_golden(golden):
+    for configuration, expected in golden:
+        _assert_matches(simulate_unloaded_minion_output(*configuration), expected, configuration)
+
+
+def test_batch_matches_golden(golden):
+    outputs = simulate_unloaded_minion_output_batch([configuration for configuration, _ in golden]).to_outputs()
+    for (configuration, expected), output in zip(golden, outputs):
+        _assert_matches(output, expected, configuration)
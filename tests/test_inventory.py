@@ -0,0 +1,161 @@
+import copy
+import random
+from dataclasses import dataclass
+
+import pytest
+
+from minion_data import MinionStorageType
+from simulate import MinionInventory
+
+
+# MinionInventory as it was before it kept its slots as flat lists: the reference it has to match,
+# slot for slot (including the slots the proportional fill claims without filling)
+@dataclass
+class OldSlot:
+    item: str
+    amount: int
+
+    def __repr__(self):
+        if self.amount == 0:
+            return ""
+        return f"{self.amount} {self.item}"
+
+
+class OldInventory:
+    def __init__(self, slots: int, storage=None):
+        self.slots = slots
+        self.items = [OldSlot(item="", amount=0) for i in range(slots)]
+        if storage:
+            self.storage_slots = storage.inventory_slots
+            self.storage_items = [OldSlot(item="", amount=0) for i in range(storage.inventory_slots)]
+        else:
+            self.storage_slots = 0
+            self.storage_items = []
+
+    def put_items_in_inventory(self, items):
+        items = copy.deepcopy(items)
+
+        empty_main_slots = sum(1 for slot in self.items if slot.amount == 0)
+        empty_storage_slots = sum(1 for slot in self.storage_items if slot.amount == 0)
+        total_empty_slots = empty_main_slots + empty_storage_slots
+
+        for item in items:
+            for slot in self.items:
+                if slot.item == item[0] and slot.amount < 64:
+                    add = min(64 - slot.amount, item[1])
+                    slot.amount += add
+                    item[1] -= add
+            for slot in self.storage_items:
+                if slot.item == item[0] and slot.amount < 64:
+                    add = min(64 - slot.amount, item[1])
+                    slot.amount += add
+                    item[1] -= add
+
+        items = [item for item in items if item[1] > 0]
+        if not items:
+            return True
+
+        if total_empty_slots >= len(items):
+            for item in items:
+                allocated = False
+                for i, slot in enumerate(self.items):
+                    if slot.amount == 0 and not allocated:
+                        amount = min(64, item[1])
+                        self.items[i] = OldSlot(item[0], amount)
+                        item[1] -= amount
+                        allocated = True
+                        break
+                if not allocated:
+                    for i, slot in enumerate(self.storage_items):
+                        if slot.amount == 0 and not allocated:
+                            amount = min(64, item[1])
+                            self.storage_items[i] = OldSlot(item[0], amount)
+                            item[1] -= amount
+                            break
+
+        empty_slots_remaining = sum(1 for slot in self.items if slot.amount == 0) + sum(1 for slot in self.storage_items if slot.amount == 0)
+        total_items_remaining = sum(item[1] for item in items)
+
+        if total_items_remaining > 0:
+            for item in items:
+                if item[1] == 0:
+                    continue
+                slots_for_item = round((item[1] / total_items_remaining) * empty_slots_remaining)
+                slots_used = 0
+                for i, slot in enumerate(self.items):
+                    if slot.amount == 0 and slots_used < slots_for_item:
+                        amount = min(64, item[1])
+                        self.items[i] = OldSlot(item[0], amount)
+                        item[1] -= amount
+                        slots_used += 1
+                for i, slot in enumerate(self.storage_items):
+                    if slot.amount == 0 and slots_used < slots_for_item:
+                        amount = min(64, item[1])
+                        self.storage_items[i] = OldSlot(item[0], amount)
+                        item[1] -= amount
+                        slots_used += 1
+
+        remaining = {item[0]: item[1] for item in items if item[1] > 0}
+        return remaining if remaining else True
+
+    def get_inventory_items(self):
+        items = {}
+        for slot in self.items + self.storage_items:
+            if slot.amount != 0:
+                if slot.item not in items:
+                    items[slot.item] = 0
+                items[slot.item] += slot.amount
+        return items
+
+    def __repr__(self):
+        if self.storage_slots != 0:
+            return f"{self.items} & {self.storage_items}"
+        return f"{self.items}"
+
+
+# puts every call's items into both, and checks after each that they agree on everything
+def _assert_same(slots: int, storage, calls: list[list[list]]):
+    old, new = OldInventory(slots, storage), MinionInventory(slots, storage)
+    for items in calls:
+        before = copy.deepcopy(items)
+        assert new.put_items_in_inventory(items) == old.put_items_in_inventory(items)
+        assert items == before # neither changes what it's given
+        assert list(new.get_inventory_items().items()) == list(old.get_inventory_items().items())
+        assert list(zip(new.slot_items, new.slot_amounts)) == [(slot.item, slot.amount) for slot in old.items + old.storage_items]
+        assert repr(new) == repr(old)
+    return new
+
+
+STORAGE = MinionStorageType("Medium", 9)
+
+
+def test_full():
+    # exactly full: every slot a stack of 64
+    new = _assert_same(3, STORAGE, [[["Clay", 64 * 8], ["Sand", 64 * 4]]])
+    assert sum(new.slot_amounts) == 64 * 12 and new.put_items_in_inventory([["Clay", 1]]) == {"Clay": 1}
+
+
+def test_partial():
+    # some slots left, and later calls top up the stacks that aren't full yet (in storage too)
+    _assert_same(5, STORAGE, [[["Clay", 10], ["Sand", 100]], [["Clay", 60], ["Sand", 1]], [["Gravel", 64], ["Clay", 200]], [["Sand", 0]]])
+    _assert_same(2, None, [[["Clay", 1]], [["Clay", 63]], [["Clay", 64]]])
+
+
+@pytest.mark.parametrize("storage", [None, STORAGE])
+def test_overflow(storage):
+    # more than fits: what didn't fit comes back, and claimed but empty slots take more of their item later
+    _assert_same(4, storage, [[["Clay", 1000], ["Sand", 30], ["Gravel", 5]], [["Sand", 500], ["Gravel", 1]], [["Clay", 64], ["Iron", 3]]])
+    # more item types than empty slots: no slot per item first
+    _assert_same(2, storage, [[["A", 5], ["B", 300], ["C", 7]], [["D", 1]]])
+
+
+def test_random():
+    rng = random.Random(0)
+    names = ["A", "B", "C", "D", "E"]
+    for _ in range(2000):
+        storage = rng.choice([None, MinionStorageType("Storage", rng.randint(1, 27))])
+        calls = [
+            [[rng.choice(names), rng.choice([0, 1, rng.randint(1, 64), rng.randint(1, 500), rng.randint(1, 5000)])] for _ in range(rng.randint(0, 4))]
+            for _ in range(rng.randint(1, 5))
+        ]
+        _assert_same(rng.randint(1, 15), storage, calls)
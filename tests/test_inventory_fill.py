@@ -0,0 +1,113 @@
+import pytest
+
+from minion_data import FUEL_TYPES, ITEMS, MINIONS, STORAGES
+from simulate import HOPPERS, EarningsCurve, InventoryFill, inventory_timeline, setup_unloaded_minion_simulation, simulate_unloaded_minion_setup, solve_inventory_fill
+
+
+# an item takes slot k+1 once 64k+1 of it have been made
+def test_one_item():
+    fill = solve_inventory_fill({"A": 1.0}, {"A": 1.0}, None, False, False, 2, 1)
+    assert fill == InventoryFill(main_slots_full=65, storage_slots_full=129, full=193, stops_fitting=[(193, "A", "A")])
+    assert fill.seconds_until_full() == 193
+
+
+def test_without_storage():
+    fill = solve_inventory_fill({"A": 0.5}, {"A": 0.5}, None, False, False, 2, 0)
+    assert fill == InventoryFill(main_slots_full=130, storage_slots_full=None, full=258, stops_fitting=[(258, "A", "A")])
+
+
+def test_never_full():
+    fill = solve_inventory_fill({"A": 0.0}, {"A": 0.0}, None, False, False, 1, 0)
+    assert fill == InventoryFill(main_slots_full=None, storage_slots_full=None, full=None, stops_fitting=[])
+    assert fill.seconds_until_full() is None
+
+
+# 100 made by the time the fuel runs out at 50s, the 29 more the third slot needs take 29s at the unfueled rate
+def test_fuel_runs_out():
+    fill = solve_inventory_fill({"A": 2.0}, {"A": 1.0}, 50, False, False, 2, 0)
+    assert fill == InventoryFill(main_slots_full=32.5, storage_slots_full=None, full=79, stops_fitting=[(79, "A", "A")])
+
+
+# once an item doesn't fit it keeps its slots, the other items can still fill theirs
+def test_items_stop_fitting_in_order():
+    fill = solve_inventory_fill({"A": 1.0, "B": 0.5}, {"A": 1.0, "B": 0.5}, None, False, False, 2, 0)
+    # A: 1, 65, 129  B: 2, 130, 258
+    assert fill == InventoryFill(main_slots_full=2, storage_slots_full=None, full=65, stops_fitting=[(65, "A", "A"), (130, "B", "B")])
+    fill = solve_inventory_fill({"A": 1.0, "B": 0.5}, {"A": 1.0, "B": 0.5}, None, False, False, 3, 0)
+    assert fill == InventoryFill(main_slots_full=65, storage_slots_full=None, full=129, stops_fitting=[(129, "A", "A"), (130, "B", "B")])
+
+
+# the up to 159 clay balls a super compactor leaves take 3 slots (at 1, 65 and 129 made), enchanted clay
+# balls (160 each) one more every 64 of them
+def test_compacted():
+    fill = solve_inventory_fill({"CLAY_BALL": 1.0}, {"CLAY_BALL": 1.0}, None, False, True, 2, 0)
+    assert fill == InventoryFill(main_slots_full=65, storage_slots_full=None, full=129, stops_fitting=[(129, "CLAY_BALL", "CLAY_BALL")])
+    fill = solve_inventory_fill({"CLAY_BALL": 1.0}, {"CLAY_BALL": 1.0}, None, False, True, 4, 1)
+    assert fill == InventoryFill(main_slots_full=160, storage_slots_full=65 * 160, full=129 * 160, stops_fitting=[(129 * 160, "CLAY_BALL", "ENCHANTED_CLAY_BALL")])
+    # a compactor leaves up to 3, which fit in one slot
+    fill = solve_inventory_fill({"CLAY_BALL": 1.0}, {"CLAY_BALL": 1.0}, None, True, False, 1, 0)
+    assert fill == InventoryFill(main_slots_full=1, storage_slots_full=None, full=4, stops_fitting=[(4, "CLAY_BALL", "CLAY")])
+
+
+def test_curve_at():
+    curve = EarningsCurve(starts=[0.0, 10.0], inventory=[0.0, 50.0], hopper=[0.0, 0.0], costs=[0.0, 10.0], inventory_per_second=[5.0, 0.0], hopper_per_second=[0.0, 2.0], costs_per_second=1.0)
+    assert curve.at(4) == {"seconds": 4, "inventory": 20.0, "hopper": 0.0, "costs": 4.0, "profit_24h": 16 / 4 * 86400}
+    assert curve.at(10) == {"seconds": 10, "inventory": 50.0, "hopper": 0.0, "costs": 10.0, "profit_24h": 40 / 10 * 86400}
+    assert curve.at(30) == {"seconds": 30, "inventory": 50.0, "hopper": 40.0, "costs": 30.0, "profit_24h": 60 / 30 * 86400}
+    assert curve.at(0)["profit_24h"] == 0.0
+
+
+def _setup(minion: str, fuel: str, item_1: str, item_2: str, storage: bool, hopper: bool, beacon_percent_boost: int):
+    minion = next(m for m in MINIONS if m.name == minion)
+    return setup_unloaded_minion_simulation(
+        minion, len(minion.levels), next(f for f in FUEL_TYPES if f.name == fuel), HOPPERS[0] if hopper else None,
+        next(i for i in ITEMS if i.name == item_1), next(i for i in ITEMS if i.name == item_2), STORAGES[-1] if storage else None,
+        True, True, False, beacon_percent_boost, 0, 0,
+    )
+
+
+# no compactors: the curve and the fixed durations only differ in rounding (the fixed durations floor the
+# drops, and share the slots out a bit differently once it's full)
+SETUPS = [
+    ("Slime", "Plasma Bucket", "Minion Expander", "Flycatcher", True, True, 0),
+    ("Oak", "Hamster Wheel", "Flycatcher", "Flycatcher", False, True, 10),
+    ("Sheep", "Plasma Bucket", "Flycatcher", "Minion Expander", True, True, 11),
+    ("Tarantula", "Foul Flesh", "Flycatcher", "Minion Expander", False, False, 0),
+]
+
+
+@pytest.mark.parametrize("setup", SETUPS)
+def test_curve_matches_simulation(setup):
+    setup = _setup(*setup)
+    timeline = inventory_timeline(setup)
+    for seconds in [3600, 86400, 604800, 1209600, 10713600]:
+        # after the fuel ran out the fixed durations only count the time since then
+        if timeline.fuel_runs_out is not None and seconds > timeline.fuel_runs_out:
+            continue
+        output = simulate_unloaded_minion_setup(setup, seconds)
+        at = timeline.curve.at(seconds)
+        assert at["inventory"] == pytest.approx(output.coins_if_inventory_instant_sold_to_bz, rel=5e-3), seconds
+        assert at["hopper"] == pytest.approx(output.hopper_coins, rel=5e-3, abs=1), seconds
+        assert at["costs"] == pytest.approx(output.cost_of_fuel, rel=1e-3, abs=1), seconds
+        assert at["profit_24h"] == pytest.approx(output.profit_24h_if_inventory_instant_sold_to_bz, rel=5e-3, abs=1), seconds
+        assert output.inventory_full == (seconds >= timeline.fill.full)
+
+
+@pytest.mark.parametrize("setup", SETUPS)
+def test_curve_breakpoints(setup):
+    setup = _setup(*setup)
+    timeline = inventory_timeline(setup)
+    fill, curve = timeline.fill, timeline.curve
+    expected = {0.0} | {seconds for seconds, _, _ in fill.stops_fitting}
+    if timeline.fuel_runs_out is not None:
+        expected.add(timeline.fuel_runs_out)
+    assert curve.starts == sorted(expected)
+    assert fill.full == fill.stops_fitting[0][0]
+    # nothing goes to the hopper before something stops fitting, and the inventory stops growing once everything has
+    assert curve.at(fill.full)["hopper"] == 0
+    last_stop = fill.stops_fitting[-1][0]
+    assert curve.at(last_stop * 2)["inventory"] == pytest.approx(curve.at(last_stop)["inventory"])
+    # the pieces join up
+    for start in curve.starts[1:]:
+        for name in ["inventory", "hopper", "costs"]:
+            assert curve.at(start - 1e-6)[name] == pytest.approx(curve.at(start)[name])
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from loaded import price_loaded_minion_run, run_loaded_minion
+from simulate import MINIONS, generate_configurations, setup_unloaded_minion_simulation
+
+
+# random setups (any level, with and without a hopper or storage) and how long to run them for
+def _sampled_runs(count: int) -> list[tuple]:
+    rng = random.Random(0)
+    configurations = [configuration for minion in MINIONS for configuration in generate_configurations(minion)]
+    runs = []
+    for _ in range(count):
+        configuration = list(rng.choice(configurations))
+        configuration[1] = rng.randint(1, len(configuration[0].levels))
+        if rng.random() < 0.3:
+            configuration[3] = None
+        if rng.random() < 0.3:
+            configuration[6] = None
+        configuration[11] = rng.choice([0, 10, 30])
+        configuration[12] = rng.choice([0, 10])
+        seconds = rng.choice([3600, 86400, 86400 * 7, 86400 * 30, rng.randint(1, 86400 * 30)])
+        runs.append((tuple(configuration[:13]), seconds))
+    return runs
+
+
+# skipping events jumps over harvests that can't change anything, so it has to end up where stepping does
+@pytest.mark.parametrize("configuration,seconds", _sampled_runs(40))
+def test_skip_events_matches_stepping(configuration, seconds):
+    setup = setup_unloaded_minion_simulation(*configuration)
+    skipped = run_loaded_minion(setup, seconds)
+    stepped = run_loaded_minion(setup, seconds, skip_events=False)
+    assert skipped.events <= stepped.events
+    skipped_fields, stepped_fields = dict(vars(skipped)), dict(vars(stepped))
+    del skipped_fields["events"], stepped_fields["events"]
+    assert skipped_fields == stepped_fields
+    assert price_loaded_minion_run(setup, skipped) == price_loaded_minion_run(setup, stepped)
@@ -0,0 +1,24 @@
+import pytest
+
+from bounds import METRIC_INVENTORY_PRICES
+from optimize import brute_force_top_k, top_k
+
+
+def _ids(ranked: dict) -> dict:
+    return {bucket: [id for id, _ in members] for bucket, members in ranked.items()}
+
+
+# the bounds only let top_k skip work, they must never change the answer
+@pytest.mark.parametrize("metric", list(METRIC_INVENTORY_PRICES))
+@pytest.mark.parametrize("k", [1, 3, 50])
+def test_top_k_matches_brute_force(metric, k):
+    ranked, simulated, total = top_k(k, metric, ["Clay", "Sheep"])
+    assert _ids(ranked) == _ids(brute_force_top_k(k, metric, ["Clay", "Sheep"]))
+    assert simulated <= total
+
+
+def test_top_k_every_minion():
+    metric = next(iter(METRIC_INVENTORY_PRICES))
+    ranked, simulated, total = top_k(3, metric)
+    assert _ids(ranked) == _ids(brute_force_top_k(3, metric))
+    assert simulated < total
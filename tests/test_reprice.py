@@ -0,0 +1,36 @@
+import sqlite3
+
+import simulate
+from results_db import read_results
+from simulate import SweepSpec, reprice_rows, result_table, result_values, run_sweep, save_results
+
+SPEC = SweepSpec(minions=["Clay", "Sheep"], beacon_percent_boost=[0, 11], seconds=[3600, 10713600])
+
+
+def _rows(path: str) -> list[tuple]:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(f"SELECT * FROM {result_table().name} ORDER BY id").fetchall()
+    finally:
+        connection.close()
+
+
+# a cache db simulated at the other prices, repriced at the fixture's, is what simulating at the fixture's gives
+def test_reprice_matches_fresh_sweep(tmp_path, monkeypatch, other_prices):
+    old_results, cache = str(tmp_path / "old_results.db"), str(tmp_path / "cache.db")
+    with monkeypatch.context() as patch:
+        patch.setattr(simulate, "skyblock_items", other_prices)
+        save_results(run_sweep(1, SPEC), old_results, cache)
+    
+    repriced = list(result_values(reprice_rows(read_results(cache, result_table()), chunk_size=1000)))
+    # the sweep goes level by level, the db by id (and has 0/1 for booleans, which compare equal)
+    fresh = sorted(run_sweep(1, SPEC))
+    assert len(repriced) == len(fresh)
+    assert repriced == fresh
+    assert repriced != _rows(cache) # the prices did change something
+    
+    # and the published dbs are the same
+    repriced_results, fresh_results = str(tmp_path / "repriced.db"), str(tmp_path / "fresh.db")
+    save_results(iter(repriced), repriced_results)
+    save_results(iter(fresh), fresh_results)
+    assert _rows(repriced_results) == _rows(fresh_results)
@@ -0,0 +1,88 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+import pytest
+
+from service import SimulationService, make_server
+
+PARAMS = {"minion": "Clay", "fuel": "Catalyst", "item_1": "Flycatcher", "item_2": "Super Compactor 3000", "storage": "XX-Large", "seconds": "90000"}
+
+
+@pytest.fixture(scope="module")
+def base_url(fixture_prices):
+    server = make_server(SimulationService(), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+# (status, parsed json body)
+def _request(url: str, body: dict = None) -> tuple[int, dict]:
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_simulate(base_url):
+    status, answer = _request(f"{base_url}/simulate?{urlencode(PARAMS)}")
+    assert status == 200
+    assert answer["configuration"]["minion"] == "Clay"
+    assert answer["output"]["seconds_until_full"] is not None
+
+    # the same answer whether the parameters come in the query or as a json body
+    assert _request(f"{base_url}/simulate", PARAMS) == (200, answer)
+
+
+def test_simulate_loaded(base_url):
+    status, answer = _request(f"{base_url}/simulate?{urlencode(dict(PARAMS, mode='loaded'))}")
+    assert status == 200
+    assert answer["loaded"]["harvests"] > 0
+
+
+def test_timeline(base_url):
+    status, answer = _request(f"{base_url}/timeline?{urlencode(PARAMS)}")
+    assert status == 200
+    assert answer["timeline"]["seconds_until_full"] is not None
+
+
+@pytest.mark.parametrize("params", [
+    dict(PARAMS, minion="Nothing"),
+    dict(PARAMS, level="0"),
+    dict(PARAMS, seconds="soon"),
+    dict(PARAMS, beacon_percent_boost="7"),
+    dict(PARAMS, colour="red"),
+    {name: value for name, value in PARAMS.items() if name != "minion"},
+    dict(PARAMS, item_1="Super Compactor 3000"),
+])
+def test_bad_parameters(base_url, params):
+    status, answer = _request(f"{base_url}/simulate?{urlencode(params)}")
+    assert status == 400
+    assert answer["error"]
+
+
+def test_bad_body(base_url):
+    status, _ = _request(f"{base_url}/simulate", ["Clay"])
+    assert status == 400
+
+
+def test_timeline_only_unloaded(base_url):
+    status, _ = _request(f"{base_url}/timeline?{urlencode(dict(PARAMS, mode='loaded'))}")
+    assert status == 400
+
+
+def test_other_endpoints(base_url):
+    assert _request(f"{base_url}/health") == (200, {"status": "ok"})
+    status, options = _request(f"{base_url}/options")
+    assert status == 200 and "Clay" in options["minions"]
+    assert _request(f"{base_url}/nothing")[0] == 404
+    assert _request(f"{base_url}/options", {})[0] == 405
+    _request(f"{base_url}/simulate?{urlencode(PARAMS)}")
+    status, metrics = _request(f"{base_url}/metrics")
+    assert status == 200 and metrics["caches"]["results"]["size"] > 0
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+import simulate
+from simulate import SUMMARY_TABLES, SweepSpec, generate_configurations, level_configurations, minion_levels, plan_sweep, result_table, run_sweep, save_results, simulate_shard, sweep_configurations, sweep_shards
+
+
+def test_from_dict():
+    spec = SweepSpec.from_dict({"minions": ["Clay"], "fuels": ["Catalyst"], "storages": ["none", "XX-Large"], "postcard": [True], "seconds": [86400]})
+    assert spec == SweepSpec(minions=["Clay"], fuels=["Catalyst"], storages=[None, "XX-Large"], postcard=[True], seconds=[86400])
+    assert SweepSpec.from_dict({}) == SweepSpec()
+
+
+@pytest.mark.parametrize("data,message", [
+    ({"minion": ["Clay"]}, "Unknown sweep spec keys"),
+    ({"minions": "Clay"}, "has to be a list"),
+    ({"minions": []}, "has to be a list"),
+    ({"minions": ["Nothing"]}, "isn't in the sweep"),
+    ({"seconds": [1]}, "isn't in the sweep"),
+    ({"postcard": [1]}, "isn't in the sweep"),
+    ({"beacon_percent_boost": [True]}, "isn't in the sweep"),
+])
+def test_from_dict_errors(data, message):
+    with pytest.raises(ValueError, match=message):
+        SweepSpec.from_dict(data)
+
+
+def test_load_json_and_toml(tmp_path):
+    json_path = tmp_path / "spec.json"
+    json_path.write_text(json.dumps({"minions": ["Clay", "Sheep"], "storages": [None, "XX-Large"], "mithril_infusion": [False]}))
+    toml_path = tmp_path / "spec.toml"
+    toml_path.write_text('minions = ["Clay", "Sheep"]\nstorages = ["none", "XX-Large"]\nmithril_infusion = [false]\n')
+    expected = SweepSpec(minions=["Clay", "Sheep"], storages=[None, "XX-Large"], mithril_infusion=[False])
+    assert SweepSpec.load(str(json_path)) == expected
+    assert SweepSpec.load(str(toml_path)) == expected
+
+
+def test_selects():
+    spec = SweepSpec(minions=["Clay"], items=["Flycatcher"], storages=[None], beacon_percent_boost=[10], seconds=[3600])
+    picked = [configuration for _, configuration in sweep_configurations(SweepSpec(minions=["Clay"])) if spec.selects(configuration)]
+    assert picked
+    for configuration in picked:
+        assert configuration[0].name == "Clay"
+        # both item slots have to be one of the items
+        assert configuration[4].name == configuration[5].name == "Flycatcher"
+        assert configuration[6] is None and configuration[10] == 10 and configuration[13] == 3600
+
+
+# a spec keeps the ids the configurations have in the full sweep
+def test_sweep_configurations_keep_their_ids():
+    spec = SweepSpec(minions=["Sheep", "Clay"], levels=[11], storages=[None], seconds=[86400, 604800])
+    expected = [(id, configuration) for id, configuration in sweep_configurations() if spec.selects(configuration)]
+    assert expected
+    assert list(sweep_configurations(spec)) == expected
+    assert list(sweep_configurations(SweepSpec(minions=["Clay"]))) == [(id, configuration) for id, configuration in sweep_configurations() if configuration[0].name == "Clay"]
+
+
+# one level of a minion, with the positions its configurations have among all of them
+def test_level_configurations():
+    for minion in simulate.SWEEP_MINIONS:
+        configurations = list(enumerate(generate_configurations(minion)))
+        for level in minion_levels(minion):
+            assert list(level_configurations(minion, level)) == [(i, configuration) for i, configuration in configurations if configuration[1] == level]
+
+
+# shards of a level only go through that level, and still give every row its id from the full sweep
+def test_shards_keep_their_ids(monkeypatch):
+    monkeypatch.setattr(simulate, "SHARD_SIZE", 20)
+    spec = SweepSpec(minions=["Sheep", "Clay"], fuels=["Catalyst"], items=["Flycatcher", "Minion Expander"], beacon_percent_boost=[0], seconds=[3600])
+    shards = sweep_shards(spec)
+    assert len({(shard.minion_index, shard.minion_level) for shard in shards}) == 3 < len(shards)
+    
+    rows = [row for shard in shards for row in simulate_shard(shard)]
+    expected = {id: (c[0].name, c[1], c[2].name, c[4].name, c[5].name, c[6] and c[6].name, c[7], c[8], c[9], c[13]) for id, c in sweep_configurations(spec)}
+    assert {row["id"]: (row["minion"], row["minion_level"], row["fuel"], row["item_1"], row["item_2"], row["storagetype"], row["mithril_infusion"], row["free_will"], row["postcard"], row["seconds"]) for row in rows} == expected
+    assert len(rows) == len(expected)
+
+
+def test_plan_sweep():
+    spec = SweepSpec(minions=["Clay", "Sheep"], fuels=["Catalyst"])
+    counted = plan_sweep(spec, sample_shards=0)
+    configurations = [configuration for _, configuration in sweep_configurations(spec)]
+    assert counted.rows == len(configurations)
+    assert counted.rows_per_minion == {"Clay": sum(c[0].name == "Clay" for c in configurations), "Sheep": sum(c[0].name == "Sheep" for c in configurations)}
+    assert counted.sampled_rows == 0 and counted.estimated_seconds == 0
+    
+    timed = plan_sweep(spec, sample_shards=2)
+    assert timed.rows == counted.rows and timed.shards == counted.shards
+    assert 0 < timed.sampled_rows <= timed.rows
+    assert timed.estimated_seconds > 0
+
+
+# every table of a results db (the results and any summaries) as rows in id order, and its indexes
+def _db_contents(path: str) -> dict:
+    connection = sqlite3.connect(path)
+    try:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        contents = {name: connection.execute(f"SELECT * FROM {name} ORDER BY id").fetchall() for name in tables}
+        contents["indexes"] = sorted(row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'"))
+        return contents
+    finally:
+        connection.close()
+
+
+# Clay stands in for the full sweep: its rows at the other prices, and then part of them refreshed at
+# the fixture prices. That has to give the dbs a full run of those same rows gives
+@pytest.fixture(scope="module")
+def clay_rows(fixture_prices, other_prices) -> tuple[list[tuple], list[tuple]]:
+    spec = SweepSpec(minions=["Clay"])
+    try:
+        simulate.skyblock_items = other_prices
+        old = list(run_sweep(1, spec))
+    finally:
+        simulate.skyblock_items = fixture_prices
+    return old, list(run_sweep(1, spec))
+
+
+REFRESH = SweepSpec(minions=["Clay"], fuels=["Catalyst"], seconds=[86400, 10713600])
+
+
+def test_refresh(tmp_path, clay_rows):
+    old, new = clay_rows
+    refreshed = {id for id, _ in sweep_configurations(REFRESH)}
+    results, cache = str(tmp_path / "results.db"), str(tmp_path / "cache.db")
+    save_results(iter(old), results, cache)
+    
+    assert save_results(run_sweep(1, REFRESH), results, cache, replace=True) == len(refreshed)
+    assert not os.path.exists(results + ".partial") and not os.path.exists(cache + ".partial")
+    
+    expected_results, expected_cache = str(tmp_path / "expected_results.db"), str(tmp_path / "expected_cache.db")
+    save_results((new_row if new_row[0] in refreshed else old_row for old_row, new_row in zip(old, new)), expected_results, expected_cache)
+    contents = _db_contents(results)
+    assert all(summary.name in contents for summary in SUMMARY_TABLES)
+    assert contents == _db_contents(expected_results)
+    assert _db_contents(cache) == _db_contents(expected_cache)
+
+
+# stopped half way (an error, Ctrl+C), a refresh leaves the dbs as they were
+def test_refresh_stopped(tmp_path, clay_rows):
+    old, _ = clay_rows
+    results, cache = str(tmp_path / "results.db"), str(tmp_path / "cache.db")
+    save_results(iter(old), results, cache)
+    before = {path: open(path, "rb").read() for path in [results, cache]}
+    
+    def stopped():
+        for i, row in enumerate(run_sweep(1, REFRESH)):
+            if i == 300:
+                raise KeyboardInterrupt
+            yield row
+    
+    with pytest.raises(KeyboardInterrupt):
+        save_results(stopped(), results, cache, chunk_size=100, replace=True)
+    assert {path: open(path, "rb").read() for path in [results, cache]} == before
+    assert not os.path.exists(results + ".partial") and not os.path.exists(cache + ".partial")